@@ -0,0 +1,254 @@
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, Column, Integer, String, Float, MetaData, Table, delete, func, insert, select
+
+cache_metadata = MetaData()
+
+cache_entries = Table(
+    'activity_cache', cache_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('filter_key', String, nullable=False, index=True),
+    Column('activity_key', String, nullable=False),
+    Column('payload', String, nullable=False),
+    Column('created_at', Float, nullable=False, index=True),
+)
+
+
+def normalize_filters(filters):
+    """
+    Build a stable cache key from a filters dictionary.
+
+    :param filters: Dictionary of filters for the request
+    :type filters: dict or None
+    :return: Canonical JSON representation of the filters
+    :rtype: str
+    """
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    return json.dumps({key: str(value) for key, value in filters.items()}, sort_keys=True)
+
+
+class MemoryCacheTier:
+    def __init__(self, max_entries=256, ttl=3600):
+        """
+        Initialize an in-memory LRU cache tier.
+
+        :param max_entries: Maximum number of filter keys kept in memory
+        :type max_entries: int
+        :param ttl: Seconds after which a filter key's activities expire
+        :type ttl: float
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, filter_key):
+        """
+        Get the cached activities for a filter key.
+
+        :param filter_key: Normalized filters
+        :type filter_key: str
+        :return: List of cached activities, empty if missing or expired
+        :rtype: list of dict
+        """
+        with self.lock:
+            entry = self.entries.get(filter_key)
+            if entry is None:
+                return []
+            created_at, activities = entry
+            if time.monotonic() - created_at > self.ttl:
+                del self.entries[filter_key]
+                return []
+            self.entries.move_to_end(filter_key)
+            return list(activities.values())
+
+    def add(self, filter_key, activity):
+        """
+        Add an activity under a filter key, evicting the least recently used key if full.
+
+        :param filter_key: Normalized filters
+        :type filter_key: str
+        :param activity: Activity data returned by the API
+        :type activity: dict
+        """
+        with self.lock:
+            entry = self.entries.get(filter_key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                entry = (time.monotonic(), {})
+                self.entries[filter_key] = entry
+            entry[1][activity.get("key")] = activity
+            self.entries.move_to_end(filter_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class SqliteCacheTier:
+    def __init__(self, db_name, max_entries=10000, ttl=86400):
+        """
+        Initialize an on-disk cache tier stored in an SQLite file.
+
+        :param db_name: SQLite cache file name
+        :type db_name: str
+        :param max_entries: Maximum number of cached activities kept on disk
+        :type max_entries: int
+        :param ttl: Seconds after which cached activities expire
+        :type ttl: float
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.engine = create_engine(f'sqlite:///{db_name}')
+        cache_metadata.create_all(self.engine)
+
+    def get(self, filter_key):
+        """
+        Get the cached activities for a filter key.
+
+        :param filter_key: Normalized filters
+        :type filter_key: str
+        :return: List of cached activities, empty if missing or expired
+        :rtype: list of dict
+        """
+        query = select(cache_entries.c.payload).where(
+            cache_entries.c.filter_key == filter_key,
+            cache_entries.c.created_at >= time.time() - self.ttl)
+        with self.engine.connect() as connection:
+            return [json.loads(payload) for payload in connection.execute(query).scalars()]
+
+    def add(self, filter_key, activity):
+        """
+        Add an activity under a filter key and evict expired or surplus rows.
+
+        :param filter_key: Normalized filters
+        :type filter_key: str
+        :param activity: Activity data returned by the API
+        :type activity: dict
+        """
+        now = time.time()
+        with self.engine.begin() as connection:
+            connection.execute(delete(cache_entries).where(
+                cache_entries.c.filter_key == filter_key,
+                cache_entries.c.activity_key == str(activity.get("key"))))
+            connection.execute(insert(cache_entries).values(
+                filter_key=filter_key, activity_key=str(activity.get("key")),
+                payload=json.dumps(activity), created_at=now))
+            connection.execute(delete(cache_entries).where(cache_entries.c.created_at < now - self.ttl))
+
+            # Size-based eviction drops the oldest rows beyond the limit
+            surplus = connection.execute(select(func.count()).select_from(cache_entries)).scalar() - self.max_entries
+            if surplus > 0:
+                oldest = select(cache_entries.c.id).order_by(cache_entries.c.created_at).limit(surplus)
+                connection.execute(delete(cache_entries).where(cache_entries.c.id.in_(oldest)))
+
+
+class ActivityCache:
+    def __init__(self, memory_tier=None, disk_tier=None, min_pool_size=10):
+        """
+        Initialize a two-tier activity cache.
+
+        A filter key is served from the cache once at least ``min_pool_size`` distinct activities
+        are known for it; until then lookups are misses so the pool keeps growing from the network.
+
+        :param memory_tier: In-memory tier, a default MemoryCacheTier if None
+        :type memory_tier: MemoryCacheTier or None
+        :param disk_tier: Optional on-disk tier
+        :type disk_tier: SqliteCacheTier or None
+        :param min_pool_size: Number of distinct activities required before serving hits
+        :type min_pool_size: int
+        """
+        self.memory_tier = memory_tier if memory_tier is not None else MemoryCacheTier()
+        self.disk_tier = disk_tier
+        self.min_pool_size = min_pool_size
+        # Lookups run on the worker threads of concurrent fetches
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, filters):
+        """
+        Return a random cached activity matching the filters.
+
+        :param filters: Dictionary of filters for the request
+        :type filters: dict or None
+        :return: A cached activity or None on a miss
+        :rtype: dict or None
+        """
+        filter_key = normalize_filters(filters)
+        activities = self.memory_tier.get(filter_key)
+        if len(activities) < self.min_pool_size and self.disk_tier is not None:
+            # Promote the disk tier's pool into memory
+            disk_activities = self.disk_tier.get(filter_key)
+            for activity in disk_activities:
+                self.memory_tier.add(filter_key, activity)
+            activities = self.memory_tier.get(filter_key)
+
+        if len(activities) >= self.min_pool_size:
+            with self.lock:
+                self.hits += 1
+            return random.choice(activities)
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def store(self, filters, activity):
+        """
+        Store an activity fetched from the network.
+
+        :param filters: Dictionary of filters used for the request
+        :type filters: dict or None
+        :param activity: Activity data returned by the API
+        :type activity: dict
+        """
+        filter_key = normalize_filters(filters)
+        self.memory_tier.add(filter_key, activity)
+        if self.disk_tier is not None:
+            self.disk_tier.add(filter_key, activity)
+
+    def stats(self):
+        """
+        Get the hit and miss counters.
+
+        :return: Dictionary with hits, misses and hit ratio
+        :rtype: dict
+        """
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+
+
+class CachingHttpRequestHandler:
+    def __init__(self, http_handler, cache=None):
+        """
+        Wrap an HTTP handler with an activity cache.
+
+        :param http_handler: Object for handling HTTP requests
+        :type http_handler: HttpRequestHandler
+        :param cache: Activity cache, a default ActivityCache if None
+        :type cache: ActivityCache or None
+        """
+        self.http_handler = http_handler
+        self.cache = cache if cache is not None else ActivityCache()
+
+    def get(self, url, params=None):
+        """
+        Serve a GET request from the cache, falling back to the wrapped handler.
+
+        :param url: The URL to send the GET request to.
+        :type url: str
+        :param params: (Optional) Dictionary of query parameters.
+        :type params: dict or None
+        :return: JSON response or None if the request failed.
+        :rtype: dict or None
+        """
+        activity = self.cache.lookup(params)
+        if activity is not None:
+            return activity
+
+        response = self.http_handler.get(url, params=params)
+        if isinstance(response, dict) and "error" not in response:
+            self.cache.store(params, response)
+        return response
@@ -0,0 +1,129 @@
+import csv
+import json
+from collections import namedtuple
+
+ACTIVITY_FIELDS = ("activity", "type", "participants", "price", "link", "key", "accessibility")
+FIELDS = ("id",) + ACTIVITY_FIELDS
+FORMATS = ("jsonl", "csv")
+# Binary formats handled by the columnar module, which needs pyarrow
+COLUMNAR_FORMATS = ("parquet", "arrow")
+EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+
+def format_activity(activity):
+    """
+    Format an activity the way Activity.__str__ does, for ORM objects and plain rows alike.
+
+    :param activity: Object exposing the activity columns as attributes
+    :type activity: Activity or sqlalchemy.engine.Row or ActivityRecord
+    :return: String representation of the activity.
+    :rtype: str
+    """
+    return (
+        f"Activity(id={activity.id}, "
+        f"activity='{activity.activity}', "
+        f"type='{activity.type}', "
+        f"participants={activity.participants}, "
+        f"price={activity.price}, "
+        f"accessibility={activity.accessibility}, "
+        f"link='{activity.link}')")
+
+
+class ActivityRecord(namedtuple('ActivityRecord', FIELDS)):
+    """
+    Lightweight, immutable activity read from the database without the ORM.
+
+    Carries the same fields as Activity and prints the same way, at a fraction of the memory
+    and construction cost of a mapped instance.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return format_activity(self)
+
+
+def detect_format(path, output_format=None):
+    """
+    Pick the serialization format from an explicit choice or the file extension.
+
+    :param path: File path, "-" for standard input or output
+    :type path: str
+    :param output_format: Explicit format, "jsonl", "csv", "parquet" or "arrow"
+    :type output_format: str or None
+    :return: Format name
+    :rtype: str
+    """
+    if output_format:
+        return output_format
+    for extension, name in EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return name
+    return "jsonl"
+
+
+def _csv_activity(row):
+    """
+    Keep the known columns of a CSV row, treating empty cells as missing.
+
+    Values stay strings; validate_activity converts them to the column types, so a bad cell
+    rejects its record rather than the whole file.
+
+    :param row: Row read by csv.DictReader
+    :type row: dict
+    :return: Activity data
+    :rtype: dict
+    """
+    return {name: None if value == "" else value for name, value in row.items() if name in FIELDS}
+
+
+def read_activities(stream, input_format="jsonl"):
+    """
+    Lazily read activities from a JSON Lines or CSV stream.
+
+    A JSON Lines line that does not parse is yielded as the raw string, which validation
+    rejects, so it ends up in the quarantine table instead of aborting the read.
+
+    :param stream: Text stream to read from
+    :type stream: io.TextIOBase
+    :param input_format: "jsonl" or "csv"
+    :type input_format: str
+    :return: Generator of activity data dictionaries, or strings for unparsable lines
+    :rtype: generator of dict or str
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(stream):
+            yield _csv_activity(row)
+    else:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield line.rstrip("\r\n")
+
+
+def write_activities(stream, activities, output_format="jsonl"):
+    """
+    Write activity rows to a stream as JSON Lines or CSV, one row at a time.
+
+    :param stream: Text stream to write to
+    :type stream: io.TextIOBase
+    :param activities: Iterable of activity rows
+    :type activities: iterable of sqlalchemy.engine.Row
+    :param output_format: "jsonl" or "csv"
+    :type output_format: str
+    :return: Number of rows written
+    :rtype: int
+    """
+    written = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for activity in activities:
+            writer.writerow(activity._asdict())
+            written += 1
+    else:
+        for activity in activities:
+            stream.write(json.dumps(activity._asdict()) + "\n")
+            written += 1
+    return written
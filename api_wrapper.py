@@ -1,9 +1,93 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import REGISTRY
+from throttling import RequestCoalescer, TokenBucket
 
 URL = 'https://www.boredapi.com/api/activity'
 
 
+def parse_retry_after(value, default):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    :param value: Header value
+    :type value: str or None
+    :param default: Seconds to use if the header is missing or malformed
+    :type default: float
+    :return: Seconds to wait
+    :rtype: float
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
 class HttpRequestHandler:
+    def __init__(self, pool_connections=10, pool_maxsize=10, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+                 rate=None, burst=None, coalesce=False):
+        """
+        Initialize an HTTP handler backed by a pooled keep-alive session.
+
+        With ``rate`` set, requests are spaced out by a token bucket that also pauses when the
+        server answers 429 with a Retry-After header. With ``coalesce``, concurrent requests for
+        the same URL and parameters share one in-flight call and its response.
+
+        :param pool_connections: Number of per-host connection pools to cache
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of connections kept alive per host
+        :type pool_maxsize: int
+        :param connect_timeout: Seconds to wait for a connection to be established
+        :type connect_timeout: float
+        :param read_timeout: Seconds to wait for the server to send a response
+        :type read_timeout: float
+        :param retries: Number of retries on connection errors and retryable status codes
+        :type retries: int
+        :param backoff_factor: Exponential backoff factor applied between retries
+        :type backoff_factor: float
+        :param status_forcelist: HTTP status codes that trigger a retry
+        :type status_forcelist: tuple of int
+        :param rate: (Optional) Maximum sustained requests per second
+        :type rate: float or None
+        :param burst: (Optional) Maximum number of requests sent back to back
+        :type burst: float or None
+        :param coalesce: Share one in-flight request between identical concurrent requests
+        :type coalesce: bool
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.limiter = TokenBucket(rate, burst) if rate else None
+        self.coalescer = RequestCoalescer() if coalesce else None
+        # Shared by every thread sending requests through this handler
+        self.lock = threading.Lock()
+        self.rate_limited = 0
+        self.failures = 0
+
+        # Reusing one session keeps TCP/TLS connections alive between calls; 429 responses are
+        # left to get() so that Retry-After pauses every caller rather than one thread
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff_factor, status_forcelist=status_forcelist,
+                      allowed_methods=frozenset(['GET']), raise_on_status=False,
+                      respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
     def get(self, url, params=None):
         """
         Send an HTTP GET request to the specified URL with optional query parameters.
@@ -16,19 +100,102 @@ class HttpRequestHandler:
         :rtype: dict or None
         """
 
-        # Processing HTTP GET request with parameters
-        response = requests.get(url, params=params)
-        return response.json() if response.status_code == 200 else None
+        with REGISTRY.timer("http.get"):
+            if self.coalescer is not None:
+                return self.coalescer.run(RequestCoalescer.request_key(url, params), lambda: self._get(url, params))
+            return self._get(url, params)
+
+    def _get(self, url, params=None):
+        """
+        Send one rate-limited GET request, waiting out 429 responses.
+
+        :param url: The URL to send the GET request to.
+        :type url: str
+        :param params: (Optional) Dictionary of query parameters.
+        :type params: dict or None
+        :return: JSON response from the GET request or None if the response status code is not 200.
+        :rtype: dict or None
+        """
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            # Processing HTTP GET request with parameters over the pooled session
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                self._count_failure()
+                return None
+
+            if response.status_code != 429:
+                if response.status_code != 200:
+                    self._count_failure()
+                    return None
+                try:
+                    return response.json()
+                except ValueError:
+                    # A proxy or maintenance page can answer 200 with a body that is not JSON
+                    self._count_failure()
+                    return None
+
+            with self.lock:
+                self.rate_limited += 1
+            REGISTRY.increment("http.rate_limited")
+            delay = parse_retry_after(response.headers.get('Retry-After'), self.backoff_factor * (2 ** attempt))
+            if self.limiter is not None:
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+        self._count_failure()
+        return None
+
+    def _count_failure(self):
+        """
+        Count a request that returned no activity.
+        """
+        with self.lock:
+            self.failures += 1
+        REGISTRY.increment("http.failures")
+
+    def stats(self):
+        """
+        Get the request metrics, including rate limiter wait time and coalesced requests.
+
+        :return: Dictionary of metrics
+        :rtype: dict
+        """
+        with self.lock:
+            stats = {"rate_limited": self.rate_limited, "failures": self.failures}
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        if self.coalescer is not None:
+            stats["coalescer"] = self.coalescer.stats()
+        return stats
+
+    def close(self):
+        """
+        Close the underlying session and release pooled connections.
+        """
+        self.session.close()
 
 
 class ApiWrapper:
-    def __init__(self, http_handler):
+    def __init__(self, http_handler, cache=None, url=URL):
         """
         Initialize an object for working with the API.
 
         :param http_handler: Object for handling HTTP requests
         :type http_handler: HttpRequestHandler
+        :param cache: (Optional) Activity cache placed in front of the HTTP handler
+        :type cache: ActivityCache or None
+        :param url: (Optional) Activity endpoint, the public Bored API by default
+        :type url: str
         """
+        self.url = url
+        if cache is not None:
+            from activity_cache import CachingHttpRequestHandler
+            http_handler = CachingHttpRequestHandler(http_handler, cache)
         self.http_handler = http_handler
 
     def get_random_activity(self, filters=None):
@@ -43,8 +210,8 @@ class ApiWrapper:
 
         # If a filters dictionary is provided, use it to create query parameters
         if filters:
-            response = self.http_handler.get(URL, params=filters)
+            response = self.http_handler.get(self.url, params=filters)
         else:
-            response = self.http_handler.get(URL)
+            response = self.http_handler.get(self.url)
 
         return response
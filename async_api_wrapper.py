@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+
+from api_wrapper import URL
+
+
+class AsyncHttpRequestHandler:
+    def __init__(self, max_connections=100, max_keepalive_connections=20, connect_timeout=3.05, read_timeout=10,
+                 retries=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504)):
+        """
+        Initialize a non-blocking HTTP handler backed by a pooled keep-alive client.
+
+        :param max_connections: Maximum number of concurrent connections
+        :type max_connections: int
+        :param max_keepalive_connections: Maximum number of idle connections kept alive
+        :type max_keepalive_connections: int
+        :param connect_timeout: Seconds to wait for a connection to be established
+        :type connect_timeout: float
+        :param read_timeout: Seconds to wait for the server to send a response
+        :type read_timeout: float
+        :param retries: Number of retries on connection errors and retryable status codes
+        :type retries: int
+        :param backoff_factor: Exponential backoff factor applied between retries
+        :type backoff_factor: float
+        :param status_forcelist: HTTP status codes that trigger a retry
+        :type status_forcelist: tuple of int
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = status_forcelist
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    async def get(self, url, params=None):
+        """
+        Send an HTTP GET request to the specified URL with optional query parameters.
+
+        :param url: The URL to send the GET request to.
+        :type url: str
+        :param params: (Optional) Dictionary of query parameters.
+        :type params: dict or None
+        :return: JSON response from the GET request or None if the response status code is not 200.
+        :rtype: dict or None
+        """
+
+        # Retry connection errors and retryable statuses with exponential backoff
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.HTTPError:
+                continue
+            if response.status_code not in self.status_forcelist:
+                if response.status_code != 200:
+                    return None
+                try:
+                    return response.json()
+                except ValueError:
+                    # A proxy or maintenance page can answer 200 with a body that is not JSON
+                    return None
+        return None
+
+    async def close(self):
+        """
+        Close the underlying client and release pooled connections.
+        """
+        await self.client.aclose()
+
+
+class AsyncApiWrapper:
+    def __init__(self, http_handler, url=URL):
+        """
+        Initialize an object for working with the API from an event loop.
+
+        :param http_handler: Object for handling non-blocking HTTP requests
+        :type http_handler: AsyncHttpRequestHandler
+        :param url: (Optional) Activity endpoint, the public Bored API by default
+        :type url: str
+        """
+        self.url = url
+        self.http_handler = http_handler
+
+    async def get_random_activity(self, filters=None):
+        """
+        Get a random activity considering the specified filters.
+
+        :param filters: Dictionary of filters for the request
+        :type filters: dict or None
+        :return: Information about a random activity
+        :rtype: dict
+        """
+
+        # If a filters dictionary is provided, use it to create query parameters
+        if filters:
+            response = await self.http_handler.get(self.url, params=filters)
+        else:
+            response = await self.http_handler.get(self.url)
+
+        return response
@@ -0,0 +1,130 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import upsert_activity_statement
+from migrations import ensure_schema_connection
+from models import Activity, QuarantinedActivity
+from sqlite_profiles import apply_pragmas, resolve_pragmas
+from validation import quarantine_row, validate_activity
+
+
+class AsyncDatabase:
+    def __init__(self, db_name, profile=None, pragmas=None):
+        """
+        Initialize an object for working with the database from an event loop.
+
+        The schema is created lazily on first use, since it requires awaiting the engine.
+
+        :param db_name: SQLite database file name
+        :type db_name: str
+        :param profile: Name of the SQLite pragma profile, "durable" or "throughput"
+        :type profile: str or None
+        :param pragmas: Pragmas overriding the profile's values
+        :type pragmas: dict or None
+        """
+        self.engine = create_async_engine(f'sqlite+aiosqlite:///{db_name}')
+        apply_pragmas(self.engine.sync_engine, resolve_pragmas(profile, pragmas))
+        self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+
+    async def _ensure_schema(self):
+        """
+        Create the tables on first use.
+        """
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if not self._schema_ready:
+                async with self.engine.begin() as connection:
+                    await connection.run_sync(ensure_schema_connection)
+                self._schema_ready = True
+
+    async def save_activity(self, activity_data):
+        """
+        Save an activity to the database, or to the quarantine table if it fails validation.
+
+        :param activity_data: Activity data to be saved
+        :type activity_data: dict or None
+        :return: True if the activity was saved, False if it was quarantined
+        :rtype: bool
+        """
+        await self._ensure_schema()
+        row, reason = validate_activity(activity_data)
+        async with self.engine.begin() as connection:
+            if row is None:
+                await connection.execute(QuarantinedActivity.__table__.insert(), quarantine_row(activity_data, reason))
+                return False
+            await connection.execute(upsert_activity_statement(), row)
+        return True
+
+    async def save_activities(self, activities, batch_size=500):
+        """
+        Save many activities to the database in batched transactions, quarantining invalid ones.
+
+        :param activities: Iterable of activity data dictionaries to be saved
+        :type activities: iterable of dict
+        :param batch_size: Number of activities committed per transaction
+        :type batch_size: int
+        :return: Number of activities saved
+        :rtype: int
+        """
+        await self._ensure_schema()
+        saved = 0
+        batch = []
+        rejected = []
+        for activity_data in activities:
+            row, reason = validate_activity(activity_data)
+            if row is None:
+                rejected.append(quarantine_row(activity_data, reason))
+            else:
+                batch.append(row)
+            if len(batch) + len(rejected) >= batch_size:
+                saved += await self._upsert_batch(batch, rejected)
+                batch = []
+                rejected = []
+        if batch or rejected:
+            saved += await self._upsert_batch(batch, rejected)
+        return saved
+
+    async def _upsert_batch(self, rows, rejected=()):
+        """
+        Upsert a batch of activity rows in a single transaction.
+
+        :param rows: Activity rows keyed by column name
+        :type rows: list of dict
+        :param rejected: Quarantine rows of the payloads of the batch that failed validation
+        :type rejected: list of dict
+        :return: Number of activity rows written
+        :rtype: int
+        """
+        # RETURNING batches the rows into multi-row VALUES statements, see Database.bulk_save_activities
+        saved = 0
+        async with self.engine.begin() as connection:
+            if rows:
+                result = await connection.execute(upsert_activity_statement().returning(Activity.id), rows)
+                saved = len(result.all())
+            if rejected:
+                await connection.execute(QuarantinedActivity.__table__.insert(), list(rejected))
+        return saved
+
+    async def get_latest_activities(self, limit=5):
+        """
+        Get the latest activities from the database.
+
+        :param limit: Maximum number of activities to retrieve
+        :type limit: int
+        :return: List of the latest activities
+        :rtype: list of Activity
+        """
+        await self._ensure_schema()
+        async with self.Session() as session:
+            result = await session.execute(select(Activity).order_by(Activity.id.desc()).limit(limit))
+            return list(result.scalars().all())
+
+    async def close(self):
+        """
+        Dispose of the engine and its pooled connections.
+        """
+        await self.engine.dispose()
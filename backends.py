@@ -0,0 +1,340 @@
+import re
+from abc import ABC, abstractmethod
+
+from sqlalchemy import Column, Integer, MetaData, Table, column, func, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from activity_io import ACTIVITY_FIELDS
+from models import ROLLUP_BUCKET_SECONDS, ROLLUP_METRICS, Activity
+from sqlite_profiles import apply_pragmas, resolve_pragmas
+
+# Holds the schema version on servers that have no equivalent of SQLite's user_version
+version_metadata = MetaData()
+schema_version = Table('schema_version', version_metadata, Column('version', Integer, nullable=False))
+
+
+def database_url(db_name):
+    """
+    Turn a database name into an SQLAlchemy URL, treating plain names as SQLite file paths.
+
+    :param db_name: SQLAlchemy URL or SQLite database file name
+    :type db_name: str
+    :return: SQLAlchemy URL
+    :rtype: str
+    """
+    return db_name if "://" in db_name else f'sqlite:///{db_name}'
+
+
+def rollup_add_statement(row):
+    """
+    Build the SQL adding a trigger row to its rollup, creating the rollup row when needed.
+
+    :param row: Trigger row alias, "NEW" or "OLD"
+    :type row: str
+    :return: INSERT ... ON CONFLICT statement
+    :rtype: str
+    """
+    columns = ["type", "bucket", "activity_count"]
+    values = [f"COALESCE({row}.type, '')", f"COALESCE({row}.created_at, 0) / {ROLLUP_BUCKET_SECONDS}", "1"]
+    for metric in ROLLUP_METRICS:
+        columns += [f"{metric}_count", f"{metric}_sum"]
+        values += [f"CASE WHEN {row}.{metric} IS NULL THEN 0 ELSE 1 END", f"COALESCE({row}.{metric}, 0)"]
+    updates = ", ".join(f"{column} = activity_rollups.{column} + excluded.{column}" for column in columns[2:])
+    return (f"INSERT INTO activity_rollups ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+            f"ON CONFLICT (type, bucket) DO UPDATE SET {updates}")
+
+
+def rollup_subtract_statement(row):
+    """
+    Build the SQL removing a trigger row from its rollup.
+
+    :param row: Trigger row alias, "NEW" or "OLD"
+    :type row: str
+    :return: UPDATE statement
+    :rtype: str
+    """
+    updates = ["activity_count = activity_count - 1"]
+    for metric in ROLLUP_METRICS:
+        updates += [f"{metric}_count = {metric}_count - CASE WHEN {row}.{metric} IS NULL THEN 0 ELSE 1 END",
+                    f"{metric}_sum = {metric}_sum - COALESCE({row}.{metric}, 0)"]
+    return (f"UPDATE activity_rollups SET {', '.join(updates)} "
+            f"WHERE type = COALESCE({row}.type, '') "
+            f"AND bucket = COALESCE({row}.created_at, 0) / {ROLLUP_BUCKET_SECONDS}")
+
+
+def search_terms(query):
+    """
+    Split a search query into words, keeping a trailing ``*`` as a prefix marker.
+
+    :param query: Free text typed by the user
+    :type query: str
+    :return: Words of the query
+    :rtype: list of str
+    """
+    return re.findall(r"[^\W_]+\*?", query)
+
+
+class Backend(ABC):
+    """
+    Dialect-specific behaviour of the database: engine setup, inserts with conflict handling
+    and schema version storage.
+
+    Subclasses must implement every abstract method, so an incomplete backend fails when it
+    is instantiated rather than partway through a command.
+    """
+    dialect = None
+
+    def engine_options(self, pool_size=None, max_overflow=None, pool_pre_ping=False, pool_recycle=None):
+        """
+        Build the create_engine keyword arguments for the pool settings that were given.
+
+        :param pool_size: Number of connections kept open in the pool
+        :type pool_size: int or None
+        :param max_overflow: Number of connections allowed beyond pool_size
+        :type max_overflow: int or None
+        :param pool_pre_ping: Test connections for liveness before handing them out
+        :type pool_pre_ping: bool
+        :param pool_recycle: Seconds after which a connection is replaced
+        :type pool_recycle: int or None
+        :return: Keyword arguments for create_engine
+        :rtype: dict
+        """
+        options = {"pool_pre_ping": pool_pre_ping}
+        if pool_size is not None:
+            options["pool_size"] = pool_size
+        if max_overflow is not None:
+            options["max_overflow"] = max_overflow
+        if pool_recycle is not None:
+            options["pool_recycle"] = pool_recycle
+        return options
+
+    def configure(self, engine, profile=None, pragmas=None):
+        """
+        Apply per-connection settings to a new engine.
+
+        :param engine: Engine to configure
+        :type engine: sqlalchemy.engine.Engine
+        :param profile: Name of the SQLite pragma profile
+        :type profile: str or None
+        :param pragmas: Pragmas overriding the profile's values
+        :type pragmas: dict or None
+        """
+
+    @abstractmethod
+    def insert(self, table):
+        """
+        Build the dialect's INSERT construct, which supports ON CONFLICT clauses.
+
+        :param table: Mapped class or table to insert into
+        :type table: type or sqlalchemy.Table
+        :return: Insert statement
+        :rtype: sqlalchemy.sql.Insert
+        """
+
+    def insert_activities(self, model, on_conflict="update"):
+        """
+        Build an INSERT for an activity table with the requested handling of duplicate keys.
+
+        :param model: Mapped class of the table, with a unique ``key`` column
+        :type model: type
+        :param on_conflict: "update" to overwrite the stored row, "ignore" to keep it, "error" to raise
+        :type on_conflict: str
+        :return: Insert statement
+        :rtype: sqlalchemy.sql.Insert
+        :raises ValueError: If on_conflict is not a known mode
+        """
+        statement = self.insert(model)
+        if on_conflict == "update":
+            return statement.on_conflict_do_update(
+                index_elements=[model.key],
+                set_={field: statement.excluded[field] for field in ACTIVITY_FIELDS if field != "key"})
+        if on_conflict == "ignore":
+            return statement.on_conflict_do_nothing(index_elements=[model.key])
+        if on_conflict == "error":
+            return statement
+        raise ValueError(f"Unknown conflict mode '{on_conflict}', expected 'update', 'ignore' or 'error'")
+
+    @abstractmethod
+    def create_rollup_triggers(self, connection):
+        """
+        Create the triggers keeping activity_rollups in step with every write to activities.
+
+        :param connection: Open connection inside a transaction
+        :type connection: sqlalchemy.engine.Connection
+        """
+
+    @abstractmethod
+    def create_search_index(self, connection):
+        """
+        Create the full-text index over the activity text and link domain, fill it from the
+        stored rows and keep it in step with every write to activities.
+
+        :param connection: Open connection inside a transaction
+        :type connection: sqlalchemy.engine.Connection
+        """
+
+    @abstractmethod
+    def search_activities(self, columns, query):
+        """
+        Build a select of activities matching every word of a query, best match first.
+
+        :param columns: Columns of the activities table to select
+        :type columns: list of sqlalchemy.Column
+        :param query: Free text; a word ending in ``*`` matches as a prefix
+        :type query: str
+        :return: Select statement
+        :rtype: sqlalchemy.sql.Select
+        """
+
+    def get_schema_version(self, connection):
+        """
+        Read the schema version from the schema_version table.
+
+        :param connection: Open connection
+        :type connection: sqlalchemy.engine.Connection
+        :return: Current schema version
+        :rtype: int
+        """
+        version_metadata.create_all(connection)
+        return connection.execute(select(schema_version.c.version)).scalar() or 0
+
+    def set_schema_version(self, connection, version):
+        """
+        Store the schema version in the schema_version table.
+
+        :param connection: Open connection inside a transaction
+        :type connection: sqlalchemy.engine.Connection
+        :param version: Schema version
+        :type version: int
+        """
+        connection.execute(schema_version.delete())
+        connection.execute(schema_version.insert().values(version=version))
+
+
+class SqliteBackend(Backend):
+    dialect = "sqlite"
+
+    def engine_options(self, **pool_settings):
+        options = super().engine_options(**pool_settings)
+        # A file database shares one writer lock, so waiting for a connection beats failing
+        options.setdefault("pool_timeout", 30)
+        return options
+
+    def configure(self, engine, profile=None, pragmas=None):
+        apply_pragmas(engine, resolve_pragmas(profile, pragmas))
+
+    def insert(self, table):
+        return sqlite.insert(table)
+
+    def create_rollup_triggers(self, connection):
+        columns = ", ".join(("type", "created_at") + ROLLUP_METRICS)
+        triggers = {
+            "activities_rollup_insert": ("INSERT", [rollup_add_statement("NEW")]),
+            "activities_rollup_update": (f"UPDATE OF {columns}",
+                                         [rollup_subtract_statement("OLD"), rollup_add_statement("NEW")]),
+            "activities_rollup_delete": ("DELETE", [rollup_subtract_statement("OLD")]),
+        }
+        for name, (event, statements) in triggers.items():
+            body = "".join(f"{statement}; " for statement in statements)
+            connection.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON activities "
+                                    f"BEGIN {body}END"))
+
+    def create_search_index(self, connection):
+        # Contentless, so the index does not duplicate the stored text; rows are removed with
+        # the FTS5 'delete' command, which needs the values that were indexed
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5(activity, domain, content='', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"))
+
+        def indexed(row):
+            rest = f"CASE WHEN instr({row}link, '://') > 0 THEN substr({row}link, instr({row}link, '://') + 3) " \
+                   f"ELSE {row}link END"
+            return f"{row}id, {row}activity, substr({rest}, 1, instr({rest} || '/', '/') - 1)"
+
+        insert = f"INSERT INTO activities_fts (rowid, activity, domain) VALUES ({indexed('NEW.')})"
+        delete = (f"INSERT INTO activities_fts (activities_fts, rowid, activity, domain) "
+                  f"VALUES ('delete', {indexed('OLD.')})")
+        triggers = {
+            "activities_fts_insert": ("INSERT", [insert]),
+            "activities_fts_update": ("UPDATE OF activity, link", [delete, insert]),
+            "activities_fts_delete": ("DELETE", [delete]),
+        }
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'activities_fts_insert'")).first()
+        if exists is None:
+            connection.execute(text(f"INSERT INTO activities_fts (rowid, activity, domain) "
+                                    f"SELECT {indexed('')} FROM activities"))
+        for name, (event, statements) in triggers.items():
+            body = "".join(f"{statement}; " for statement in statements)
+            connection.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON activities "
+                                    f"BEGIN {body}END"))
+
+    def search_activities(self, columns, query):
+        # Quoting every word keeps FTS5 operators and punctuation in user input from being parsed
+        match = " ".join(f'"{term.rstrip("*")}"' + ("*" if term.endswith("*") else "")
+                         for term in search_terms(query))
+        fts = table("activities_fts", column("rowid"), column("rank"))
+        return (select(*columns)
+                .select_from(Activity.__table__.join(fts, fts.c.rowid == Activity.id))
+                .where(text("activities_fts MATCH :match").bindparams(match=match))
+                .order_by(fts.c.rank))
+
+    def get_schema_version(self, connection):
+        # The version lives in the file header, so reading it needs no table
+        return connection.execute(text("PRAGMA user_version")).scalar()
+
+    def set_schema_version(self, connection, version):
+        connection.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+class PostgresqlBackend(Backend):
+    dialect = "postgresql"
+
+    def insert(self, table):
+        return postgresql.insert(table)
+
+    def create_rollup_triggers(self, connection):
+        connection.execute(text(
+            "CREATE OR REPLACE FUNCTION activities_rollup() RETURNS trigger AS $$ BEGIN "
+            f"IF TG_OP <> 'INSERT' THEN {rollup_subtract_statement('OLD')}; END IF; "
+            f"IF TG_OP <> 'DELETE' THEN {rollup_add_statement('NEW')}; END IF; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql"))
+        connection.execute(text("DROP TRIGGER IF EXISTS activities_rollup ON activities"))
+        connection.execute(text("CREATE TRIGGER activities_rollup AFTER INSERT OR UPDATE OR DELETE ON activities "
+                                "FOR EACH ROW EXECUTE FUNCTION activities_rollup()"))
+
+    def _search_document(self):
+        domain = func.coalesce(func.substring(Activity.link, "://([^/]+)"), "")
+        return func.to_tsvector("simple", func.coalesce(Activity.activity, "") + " " + domain)
+
+    def create_search_index(self, connection):
+        # An expression index, so the query below must build the same document
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_activities_search ON activities USING GIN (to_tsvector('simple', "
+            "coalesce(activity, '') || ' ' || coalesce(substring(link from '://([^/]+)'), '')))"))
+
+    def search_activities(self, columns, query):
+        terms = [term.rstrip("*") + (":*" if term.endswith("*") else "") for term in search_terms(query)]
+        tsquery = func.to_tsquery("simple", " & ".join(terms))
+        document = self._search_document()
+        return (select(*columns)
+                .where(document.op("@@")(tsquery))
+                .order_by(func.ts_rank(document, tsquery).desc()))
+
+
+BACKENDS = {backend.dialect: backend for backend in (SqliteBackend(), PostgresqlBackend())}
+
+
+def get_backend(dialect):
+    """
+    Get the backend for an SQLAlchemy dialect name.
+
+    :param dialect: Dialect name, e.g. "sqlite" or "postgresql"
+    :type dialect: str
+    :return: Backend implementation
+    :rtype: Backend
+    :raises ValueError: If the dialect is not supported
+    """
+    if dialect not in BACKENDS:
+        raise ValueError(f"Unsupported database dialect '{dialect}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[dialect]
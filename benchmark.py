@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from api_wrapper import ApiWrapper, HttpRequestHandler
+from database import Database
+from stub_server import StubServer
+from validation import validate_activity
+
+
+def percentiles(samples):
+    """
+    Summarize latency samples in milliseconds.
+
+    :param samples: Latencies in seconds
+    :type samples: list of float
+    :return: Count, mean and p50/p90/p99/max latencies in milliseconds
+    :rtype: dict
+    """
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": at(0.50),
+        "p90_ms": at(0.90),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def make_activities(start, count):
+    """
+    Generate synthetic activities with unique keys.
+
+    :param start: First key number
+    :type start: int
+    :param count: Number of activities
+    :type count: int
+    :return: Generator of activity data dictionaries
+    :rtype: generator of dict
+    """
+    types = ("education", "recreational", "social", "diy", "charity", "cooking", "relaxation", "music", "busywork")
+    for number in range(start, start + count):
+        yield {
+            "activity": f"Benchmark activity {number}",
+            "type": types[number % len(types)],
+            "participants": number % 5 + 1,
+            "price": (number % 10) / 10,
+            "link": "",
+            "key": str(number),
+            "accessibility": (number % 7) / 7
+        }
+
+
+def bench_get_random_activity(calls):
+    """
+    Measure per-call latency of get_random_activity against a local stub server.
+
+    :param calls: Number of calls to make
+    :type calls: int
+    :return: Latency summary
+    :rtype: dict
+    """
+    with StubServer() as server:
+        api = ApiWrapper(HttpRequestHandler(), url=server.url)
+        api.get_random_activity()  # warm the connection pool
+        samples = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            api.get_random_activity(filters={"type": "education"})
+            samples.append(time.perf_counter() - started)
+        api.http_handler.close()
+    return percentiles(samples)
+
+
+def bench_inserts(directory, rows, batch_sizes, profile):
+    """
+    Measure insert throughput for single-row saves and batched bulk saves.
+
+    :param directory: Directory for the temporary database files
+    :type directory: str
+    :param rows: Number of rows written per batch size
+    :type rows: int
+    :param batch_sizes: Batch sizes to measure; 1 uses save_activity
+    :type batch_sizes: list of int
+    :param profile: SQLite pragma profile
+    :type profile: str
+    :return: Rows per second for each batch size
+    :rtype: list of dict
+    """
+    results = []
+    for batch_size in batch_sizes:
+        database = Database(os.path.join(directory, f'inserts_{batch_size}.db'), profile=profile)
+        # Single-row saves are slow enough that a smaller sample is representative
+        count = min(rows, 2000) if batch_size == 1 else rows
+        started = time.perf_counter()
+        if batch_size == 1:
+            for activity in make_activities(0, count):
+                database.save_activity(activity)
+        else:
+            database.bulk_save_activities(make_activities(0, count), batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        results.append({"batch_size": batch_size, "rows": count, "seconds": elapsed,
+                        "rows_per_second": count / elapsed})
+        database.engine.dispose()
+    return results
+
+
+def bench_latest(directory, table_sizes, queries, profile):
+    """
+    Measure get_latest_activities latency as the table grows.
+
+    :param directory: Directory for the temporary database file
+    :type directory: str
+    :param table_sizes: Table sizes at which latency is measured, ascending
+    :type table_sizes: list of int
+    :param queries: Number of queries per table size
+    :type queries: int
+    :param profile: SQLite pragma profile
+    :type profile: str
+    :return: Latency summary for each table size
+    :rtype: list of dict
+    """
+    database = Database(os.path.join(directory, 'latest.db'), profile=profile)
+    results = []
+    rows = 0
+    for size in table_sizes:
+        database.bulk_save_activities(make_activities(rows, size - rows), batch_size=50000)
+        rows = size
+        samples = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            database.get_latest_activities(limit=5)
+            samples.append(time.perf_counter() - started)
+        results.append(dict(percentiles(samples), rows=size))
+    database.engine.dispose()
+    return results
+
+
+def bench_read_paths(directory, rows, repeats, profile):
+    """
+    Compare the ORM read path with the Core record read path on the same result set.
+
+    :param directory: Directory for the temporary database file
+    :type directory: str
+    :param rows: Number of activities read per call
+    :type rows: int
+    :param repeats: Number of timed calls per path
+    :type repeats: int
+    :param profile: SQLite pragma profile
+    :type profile: str
+    :return: Rows per second and peak allocated memory for each path
+    :rtype: dict
+    """
+    database = Database(os.path.join(directory, 'reads.db'), profile=profile)
+    database.bulk_save_activities(make_activities(0, rows), batch_size=50000)
+    paths = {
+        "orm": lambda: database.get_latest_activities(limit=rows),
+        "records": lambda: database.get_latest_records(limit=rows),
+    }
+
+    results = {}
+    for name, read in paths.items():
+        read()  # warm statement caches
+        started = time.perf_counter()
+        for _ in range(repeats):
+            read()
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        result = read()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+
+        results[name] = {"rows_per_second": rows * repeats / elapsed, "peak_bytes": peak}
+    database.engine.dispose()
+    return results
+
+
+def make_payloads(count):
+    """
+    Generate a mix of API-like payloads: clean activities, activities with every value sent as
+    a string, and one in ten invalid payloads.
+
+    :param count: Number of payloads
+    :type count: int
+    :return: List of payloads
+    :rtype: list
+    """
+    invalid = [None, {"error": "No activity found with the specified parameters"}, {"activity": "x", "price": "n/a"}]
+    payloads = []
+    for number, activity in enumerate(make_activities(0, count)):
+        if number % 10 == 9:
+            payloads.append(invalid[number // 10 % len(invalid)])
+        elif number % 2:
+            payloads.append({name: str(value) for name, value in activity.items()})
+        else:
+            payloads.append(activity)
+    return payloads
+
+
+def bench_validation(records, repeats):
+    """
+    Measure the throughput of validate_activity on a mix of clean, string-typed and invalid payloads.
+
+    :param records: Number of payloads validated per call
+    :type records: int
+    :param repeats: Number of timed passes
+    :type repeats: int
+    :return: Records per second of the best pass and number of rejected payloads
+    :rtype: dict
+    """
+    payloads = make_payloads(records)
+    best = None
+    rejected = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rejected = sum(validate_activity(payload)[0] is None for payload in payloads)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"records": records, "rejected": rejected, "records_per_second": records / best}
+
+
+def run(args):
+    """
+    Run the benchmark suite.
+
+    :param args: Benchmark arguments
+    :type args: argparse.Namespace
+    :return: Benchmark results
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        return {
+            "python": sys.version.split()[0],
+            "profile": args.profile,
+            "get_random_activity": bench_get_random_activity(args.calls),
+            "save_activity": bench_inserts(directory, args.rows, args.batch_sizes, args.profile),
+            "get_latest_activities": bench_latest(directory, args.table_sizes, args.queries, args.profile),
+            "read_paths": bench_read_paths(directory, args.read_rows, args.read_repeats, args.profile),
+            "validation": bench_validation(args.validate_records, args.validate_repeats),
+        }
+
+
+def parse_args(argv=None):
+    """
+    Parse the benchmark command-line arguments.
+
+    :param argv: Arguments, sys.argv[1:] if None
+    :type argv: list of str or None
+    :return: Benchmark arguments
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the fetch, validate, save and list pipeline")
+    parser.add_argument("--calls", type=int, default=1000, help="Number of get_random_activity calls")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows inserted per batch size")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000],
+                        help="Insert batch sizes")
+    parser.add_argument("--table_sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="Table sizes at which get_latest_activities is measured")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per table size")
+    parser.add_argument("--read_rows", type=int, default=100000, help="Rows read per call when comparing read paths")
+    parser.add_argument("--read_repeats", type=int, default=5, help="Timed calls per read path")
+    parser.add_argument("--validate_records", type=int, default=200000, help="Payloads validated per pass")
+    parser.add_argument("--validate_repeats", type=int, default=3, help="Timed validation passes")
+    parser.add_argument("--profile", choices=["durable", "throughput"], default="durable", help="SQLite profile")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of standard output")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    results = json.dumps(run(arguments), indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            output.write(results + "\n")
+    else:
+        print(results)
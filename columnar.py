@@ -0,0 +1,162 @@
+from activity_io import ACTIVITY_FIELDS, FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    # Optional dependency, only needed by the parquet and arrow formats
+    pyarrow = None
+
+# Rows buffered into one record batch, and so one Parquet row group or Arrow IPC batch
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def require_pyarrow():
+    """
+    Fail with an actionable message when the optional pyarrow dependency is missing.
+
+    :raises ImportError: If pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise ImportError("The parquet and arrow formats need pyarrow: pip install pyarrow")
+
+
+def activity_schema():
+    """
+    Build the Arrow schema of the activities table.
+
+    :return: Schema with one field per activity column
+    :rtype: pyarrow.Schema
+    """
+    require_pyarrow()
+    types = {"id": pyarrow.int64(), "participants": pyarrow.int64(), "price": pyarrow.float64(),
+             "accessibility": pyarrow.float64()}
+    return pyarrow.schema([(field, types.get(field, pyarrow.string())) for field in FIELDS])
+
+
+def _record_batch(rows, schema):
+    """
+    Transpose a chunk of rows into an Arrow record batch.
+
+    :param rows: Rows with the columns in FIELDS order
+    :type rows: list of tuple
+    :param schema: Schema of the batch
+    :type schema: pyarrow.Schema
+    :return: Record batch
+    :rtype: pyarrow.RecordBatch
+    """
+    columns = zip(*rows)
+    return pyarrow.record_batch([pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+def write_columnar(path, activities, output_format="parquet", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream activity rows into a Parquet file or an Arrow IPC file, one chunk at a time.
+
+    :param path: File path to write
+    :type path: str
+    :param activities: Iterable of activity rows with the columns in FIELDS order
+    :type activities: iterable of sqlalchemy.engine.Row or ActivityRecord
+    :param output_format: "parquet" or "arrow"
+    :type output_format: str
+    :param chunk_size: Number of rows per record batch
+    :type chunk_size: int
+    :return: Number of rows written
+    :rtype: int
+    """
+    schema = activity_schema()
+    if output_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+
+    written = 0
+    chunk = []
+    try:
+        for row in activities:
+            chunk.append(tuple(row))
+            if len(chunk) >= chunk_size:
+                writer.write_batch(_record_batch(chunk, schema))
+                written += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_batch(_record_batch(chunk, schema))
+            written += len(chunk)
+    finally:
+        writer.close()
+    return written
+
+
+def read_columnar(path, input_format="parquet"):
+    """
+    Lazily read activities from a Parquet file or an Arrow IPC file, one batch at a time.
+
+    :param path: File path to read
+    :type path: str
+    :param input_format: "parquet" or "arrow"
+    :type input_format: str
+    :return: Generator of activity data dictionaries, without the stored id
+    :rtype: generator of dict
+    """
+    require_pyarrow()
+    if input_format == "parquet":
+        batches = pyarrow.parquet.ParquetFile(path).iter_batches(columns=list(ACTIVITY_FIELDS))
+    else:
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(path, "r"))
+        batches = (reader.get_batch(index).select(list(ACTIVITY_FIELDS)) for index in range(reader.num_record_batches))
+    for batch in batches:
+        yield from batch.to_pylist()
+
+
+class ArrowActivityReader:
+    def __init__(self, path):
+        """
+        Open an Arrow IPC export through a memory map.
+
+        The table's buffers point into the mapped file, so opening does not copy or parse the
+        data and filters run over the columns without creating Python objects.
+
+        :param path: Arrow IPC file written by write_columnar
+        :type path: str
+        """
+        require_pyarrow()
+        self.source = pyarrow.memory_map(path, "r")
+        self.table = pyarrow.ipc.open_file(self.source).read_all()
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def filter(self, filters=None):
+        """
+        Select the activities matching the filters with vectorized comparisons.
+
+        :param filters: Dictionary of filters: a column name for equality, or a numeric column
+            name followed by "_min" or "_max" for bounds
+        :type filters: dict or None
+        :return: Matching activities
+        :rtype: pyarrow.Table
+        :raises ValueError: If a filter names an unknown column
+        """
+        compute = pyarrow.compute
+        mask = None
+        for name, value in (filters or {}).items():
+            if name.endswith("_min") and name[:-4] in ACTIVITY_FIELDS:
+                condition = compute.greater_equal(self.table[name[:-4]], value)
+            elif name.endswith("_max") and name[:-4] in ACTIVITY_FIELDS:
+                condition = compute.less_equal(self.table[name[:-4]], value)
+            elif name in FIELDS:
+                condition = compute.equal(self.table[name], value)
+            else:
+                raise ValueError(f"Unknown filter '{name}'")
+            mask = condition if mask is None else compute.and_(mask, condition)
+        return self.table if mask is None else self.table.filter(mask)
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        self.table = None
+        self.source.close()
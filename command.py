@@ -1,3 +1,48 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from activity_io import COLUMNAR_FORMATS, detect_format, format_activity, read_activities, write_activities
+
+FILTER_ARGUMENTS = ("type", "participants", "price_min", "price_max", "accessibility_min", "accessibility_max")
+
+
+def filters_from_args(args):
+    """
+    Build a filters dictionary from the filter options present on the command line.
+
+    :param args: Command-line arguments
+    :type args: argparse.Namespace
+    :return: Filters with unset options removed
+    :rtype: dict
+    """
+    filters = {name: getattr(args, name, None) for name in FILTER_ARGUMENTS}
+    return {key: value for key, value in filters.items() if value is not None}
+
+
+def print_activities(activities, output_format="text"):
+    """
+    Print activity rows to standard output as text, JSON Lines or CSV.
+
+    :param activities: Iterable of activity rows
+    :type activities: iterable of ActivityRecord or sqlalchemy.engine.Row
+    :param output_format: "text", "jsonl" or "csv"
+    :type output_format: str
+    """
+    if output_format in ("jsonl", "csv"):
+        write_activities(sys.stdout, activities, output_format)
+    else:
+        for activity in activities:
+            print(format_activity(activity))
+
+
+class UsageError(Exception):
+    """
+    Invalid input from the command line, reported as a one-line error instead of a traceback.
+    """
+
+
 class Command:
     def execute(self):
         """
@@ -26,34 +71,430 @@ class NewCommand(Command):
         """
         Execute the command for fetching and saving a new activity.
         """
-        filters = {
-            "type": self.args.type,
-            "participants": self.args.participants,
-            "price_min": self.args.price_min,
-            "price_max": self.args.price_max,
-            "accessibility_min": self.args.accessibility_min,
-            "accessibility_max": self.args.accessibility_max
-        }
+        filters = filters_from_args(self.args)
+
+        count = getattr(self.args, "count", 1) or 1
+        if getattr(self.args, "unique", False):
+            self.execute_unique(filters, count)
+            return
+        if count > 1:
+            self.execute_bulk(filters, count)
+            return
+
+        activity = self.fetch_activity(filters)
+        if activity is None:
+            print("No activity found for the given filters")
+            return
+        if not self.database.save_activity(activity):
+            print("Invalid activity received, saved to the quarantine table")
+
+    def fetch_activity(self, filters):
+        """
+        Fetch one activity from the API, or from the local catalogue in offline mode.
+
+        :param filters: Dictionary of filters for the request
+        :type filters: dict
+        :return: Information about a random activity
+        :rtype: dict or None
+        """
+        if getattr(self.args, "offline", False):
+            return self.database.get_catalogue_activity(filters=filters)
+        return self.api.get_random_activity(filters=filters)
+
+    def execute_bulk(self, filters, count):
+        """
+        Fetch several activities concurrently and save them in batched transactions.
+
+        :param filters: Dictionary of filters for the request
+        :type filters: dict
+        :param count: Number of activities to fetch
+        :type count: int
+        """
+        concurrency = getattr(self.args, "concurrency", None) or 8
+        started = time.perf_counter()
+
+        # Fetch in parallel and stream successful responses into batched inserts
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = executor.map(lambda _: self.fetch_activity(filters), range(count))
+            activities = (activity for activity in responses if activity)
+            saved = self.database.save_activities(activities)
+
+        elapsed = time.perf_counter() - started
+        print(f"Requests: {count}, saved: {saved}, elapsed: {elapsed:.2f}s")
+
+    def execute_unique(self, filters, count):
+        """
+        Fetch until ``count`` activities with keys not stored yet are saved.
+
+        Candidates are checked against the stored keys in memory, so duplicates cost no write.
+        Fetching stops early when ``patience`` consecutive requests yield no new key or the API
+        reports that nothing matches the filters.
+
+        :param filters: Dictionary of filters for the request
+        :type filters: dict
+        :param count: Number of new activities to save
+        :type count: int
+        """
+        from key_filters import StoredKeys
+        from validation import validate_activity
+
+        concurrency = getattr(self.args, "concurrency", None) or 8
+        patience = getattr(self.args, "patience", None) or 20
+        started = time.perf_counter()
+        stored = StoredKeys(self.database, getattr(self.args, "key_filter", None) or "set")
+        requests_made = 0
+        saved = 0
+        stale = 0
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while saved < count and stale < patience and not exhausted:
+                # Never request more than the activities still missing
+                size = min(concurrency, count - saved)
+                responses = executor.map(lambda _: self.fetch_activity(filters), range(size))
+                requests_made += size
+
+                batch = []
+                rejected = []
+                for activity in responses:
+                    if not activity:
+                        continue
+                    if "key" not in activity:
+                        # The API answers with an error when no activity matches the filters
+                        exhausted = True
+                        continue
+                    # Keys are compared normalized, as the API has been seen to return numeric keys
+                    row, _ = validate_activity(activity)
+                    if row is None:
+                        rejected.append(activity)
+                    elif stored.is_new(row["key"]) and saved + len(batch) < count:
+                        stored.add(row["key"])
+                        batch.append(row)
+
+                if batch or rejected:
+                    # Rejected payloads are passed on to be quarantined
+                    saved += self.database.bulk_save_activities(batch + rejected, on_conflict="ignore")
+                stale = 0 if batch else stale + size
+
+        elapsed = time.perf_counter() - started
+        print(f"Requests: {requests_made}, saved: {saved}, elapsed: {elapsed:.2f}s")
+        if saved < count:
+            print(f"Stopped after {requests_made} requests: no new activity for the given filters")
+
+
+class SyncCommand(Command):
+    def __init__(self, api, database, args):
+        """
+        Initialize a command for mirroring the upstream catalogue into the local database.
+
+        :param api: Object for working with the API
+        :type api: ApiWrapper
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.api = api
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for crawling the upstream catalogue.
+
+        The upstream API only serves random activities, so the crawl keeps sampling until
+        ``patience`` consecutive requests yield no new key or ``max_requests`` is reached.
+        """
+        max_requests = self.args.max_requests
+        patience = self.args.patience
+        concurrency = self.args.concurrency
+        started = time.perf_counter()
+        requests_made = 0
+        added = 0
+        stale = 0
 
-        filters = {key: value for key, value in filters.items() if value is not None}
-        activity = self.api.get_random_activity(filters=filters)
-        self.database.save_activity(activity)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while requests_made < max_requests and stale < patience:
+                size = min(concurrency, max_requests - requests_made)
+                responses = executor.map(lambda _: self.api.get_random_activity(), range(size))
+                activities = [activity for activity in responses if activity and "key" in activity]
+                requests_made += size
+
+                inserted = self.database.save_catalogue_activities(activities)
+                added += inserted
+                stale = 0 if inserted else stale + size
+
+        elapsed = time.perf_counter() - started
+        print(f"Requests: {requests_made}, new: {added}, "
+              f"catalogue size: {self.database.count_catalogue_activities()}, elapsed: {elapsed:.2f}s")
 
 
 class ListCommand(Command):
-    def __init__(self, database):
+    def __init__(self, database, args=None):
         """
         Initialize a command for listing recent activities.
 
         :param database: Object for working with the database
         :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace or None
         """
         self.database = database
+        self.args = args
 
     def execute(self):
         """
         Execute the command for listing recent activities.
+
+        Activities are streamed from the database and written as text, JSON Lines or CSV.
+        """
+        activities = self.database.iter_latest_activities(
+            limit=getattr(self.args, "limit", 5),
+            offset=getattr(self.args, "offset", 0),
+            before_id=getattr(self.args, "before_id", None),
+            filters=filters_from_args(self.args))
+        print_activities(activities, getattr(self.args, "format", "text"))
+
+
+class SearchCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for full-text search over the saved activities.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for printing the activities matching a query, best match first.
+        """
+        activities = self.database.search(self.args.query, filters=filters_from_args(self.args),
+                                          limit=self.args.limit)
+        if not activities and self.args.format == "text":
+            print("No activity matches the query")
+            return
+        print_activities(activities, self.args.format)
+
+
+class ImportCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for importing activities from a JSON Lines or CSV file.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for streaming activities from a file into the database.
+
+        :raises UsageError: If the file does not exist
         """
-        latest_activities = self.database.get_latest_activities()
-        for activity in latest_activities:
-            print(activity)
+        if self.args.path != "-" and not os.path.isfile(self.args.path):
+            raise UsageError(f"cannot import '{self.args.path}': no such file")
+        input_format = detect_format(self.args.path, self.args.format)
+        started = time.perf_counter()
+        quarantined = self.database.quarantined
+
+        if input_format in COLUMNAR_FORMATS:
+            from columnar import read_columnar
+            saved = self.database.bulk_save_activities(read_columnar(self.args.path, input_format),
+                                                       batch_size=self.args.batch_size,
+                                                       on_conflict=self.args.on_conflict)
+        else:
+            stream = sys.stdin if self.args.path == "-" else open(self.args.path, newline="", encoding="utf-8")
+            try:
+                saved = self.database.bulk_save_activities(read_activities(stream, input_format),
+                                                           batch_size=self.args.batch_size,
+                                                           on_conflict=self.args.on_conflict)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"Imported: {saved}, quarantined: {self.database.quarantined - quarantined}, elapsed: {elapsed:.2f}s")
+
+
+class ExportCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for exporting activities to a JSON Lines or CSV file.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for streaming activities from the database into a file.
+
+        :raises UsageError: If a binary format is requested on standard output
+        """
+        output_format = detect_format(self.args.path, self.args.format)
+        if output_format in COLUMNAR_FORMATS and self.args.path == "-":
+            raise UsageError(f"the {output_format} format cannot be written to standard output")
+        activities = self.database.iter_activities(filters=filters_from_args(self.args))
+
+        if output_format in COLUMNAR_FORMATS:
+            from columnar import write_columnar
+            started = time.perf_counter()
+            written = write_columnar(self.args.path, activities, output_format)
+            print(f"Exported: {written}, elapsed: {time.perf_counter() - started:.2f}s")
+            return
+
+        if self.args.path == "-":
+            write_activities(sys.stdout, activities, output_format)
+            return
+
+        started = time.perf_counter()
+        with open(self.args.path, "w", newline="", encoding="utf-8") as stream:
+            written = write_activities(stream, activities, output_format)
+        elapsed = time.perf_counter() - started
+        print(f"Exported: {written}, elapsed: {elapsed:.2f}s")
+
+
+class StatsCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for reporting aggregate statistics of the saved activities.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for printing counts and averages per activity type.
+        """
+        stats = self.database.get_activity_stats(window=self.args.window, activity_type=self.args.type)
+        if not stats:
+            print("No activities saved")
+            return
+
+        width = max([len("type")] + [len(row["type"] or "-") for row in stats])
+        print(f"{'type':<{width}}  {'count':>8}  {'participants':>12}  {'price':>8}  {'accessibility':>13}")
+        for row in stats:
+            averages = [f"{row[name]:.2f}" if row[name] is not None else "-"
+                        for name in ("participants", "price", "accessibility")]
+            print(f"{row['type'] or '-':<{width}}  {row['count']:>8}  {averages[0]:>12}  {averages[1]:>8}  "
+                  f"{averages[2]:>13}")
+        print(f"Total: {sum(row['count'] for row in stats)}")
+
+
+class HarvestCommand(Command):
+    def __init__(self, api, database, args):
+        """
+        Initialize a command for collecting activities as described by a harvest spec.
+
+        :param api: Object for working with the API
+        :type api: ApiWrapper
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.api = api
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for running the spec's jobs, resuming the progress stored in the database.
+
+        :raises UsageError: If the spec cannot be read or is malformed
+        """
+        from harvest import Harvester, load_spec
+
+        try:
+            spec = load_spec(self.args.spec)
+        except OSError as error:
+            raise UsageError(f"cannot read harvest spec '{self.args.spec}': {error.strerror}") from error
+        except ValueError as error:
+            raise UsageError(str(error)) from error
+        if self.args.workers:
+            spec["workers"] = self.args.workers
+        started = time.perf_counter()
+        harvester = Harvester(self.api, self.database, spec)
+        jobs = harvester.run(reset=self.args.reset)
+
+        for job in jobs:
+            print(f"{job['name']}: {job['status']}, collected: {job['collected']}/{job['target']}, "
+                  f"requests: {job['requests']}, duplicates: {job['duplicates']}")
+        elapsed = time.perf_counter() - started
+        print(f"Jobs: {len(jobs)}, failures: {harvester.failures}, elapsed: {elapsed:.2f}s")
+
+
+class PipelineCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for harvesting with fetch worker processes and a single writer process.
+
+        :param database: Object for working with the database; only its name and profile are
+            used, the writer process opens its own connection
+        :type database: Database or LazyDatabase
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for running the pipeline and printing the throughput of each stage.
+        """
+        from pipeline import format_report, run_pipeline
+
+        report = run_pipeline(
+            self.database.db_name, profile=getattr(self.database, "profile", None), url=self.args.url,
+            filters=filters_from_args(self.args), requests=self.args.requests, processes=self.args.processes,
+            rate=self.args.rate, queue_size=self.args.queue_size, batch_size=self.args.batch_size,
+            on_conflict=self.args.on_conflict)
+        print(format_report(report))
+
+
+class RecommendCommand(Command):
+    def __init__(self, database, args):
+        """
+        Initialize a command for ranking stored activities against the user's preferences.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param args: Command-line arguments
+        :type args: argparse.Namespace
+        """
+        self.database = database
+        self.args = args
+
+    def execute(self):
+        """
+        Execute the command for printing the k activities closest to the preferences.
+        """
+        from recommender import get_snapshot
+
+        ranked = get_snapshot(self.database).recommend(
+            participants=self.args.participants, budget=self.args.budget, accessibility=self.args.accessibility,
+            activity_type=self.args.type, k=self.args.k, weights={"type": self.args.type_weight})
+        if not ranked:
+            print("No activities saved")
+            return
+        distances = dict(ranked)
+        for record in self.database.get_records_by_ids([activity_id for activity_id, _ in ranked]):
+            print(f"{distances[record.id]:.3f}  {format_activity(record)}")
@@ -0,0 +1,304 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+# Commands the client forwards; the rest depend on the caller's working directory or stdin
+FORWARDED_COMMANDS = ("new", "list", "recommend")
+
+
+class ThreadLocalStream(io.TextIOBase):
+    def __init__(self, default):
+        """
+        Initialize a stream that writes to a per-thread buffer when one is set.
+
+        Commands print to sys.stdout, so the daemon swaps this in to capture each request's
+        output separately while requests run concurrently.
+
+        :param default: Stream used by threads without a buffer
+        :type default: io.TextIOBase
+        """
+        self.default = default
+        self.local = threading.local()
+
+    def capture(self):
+        """
+        Start capturing the calling thread's output into a fresh buffer.
+
+        :return: The buffer receiving the output
+        :rtype: io.StringIO
+        """
+        self.local.buffer = io.StringIO()
+        return self.local.buffer
+
+    def release(self):
+        """
+        Stop capturing the calling thread's output.
+        """
+        self.local.buffer = None
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        return (getattr(self.local, "buffer", None) or self.default).write(text)
+
+    def flush(self):
+        (getattr(self.local, "buffer", None) or self.default).flush()
+
+
+_streams_lock = threading.Lock()
+
+
+def install_capturing_streams():
+    """
+    Replace sys.stdout and sys.stderr with thread-local capturing streams if not done yet.
+    """
+    with _streams_lock:
+        if not isinstance(sys.stdout, ThreadLocalStream):
+            sys.stdout = ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, ThreadLocalStream):
+            sys.stderr = ThreadLocalStream(sys.stderr)
+
+
+def parse_address(address):
+    """
+    Interpret a daemon address as a TCP port or a Unix socket path.
+
+    :param address: Port number, "host:port", or a socket path
+    :type address: int or str
+    :return: Socket family and address
+    :rtype: tuple
+    """
+    address = str(address)
+    if address.isdigit():
+        return socket.AF_INET, ("127.0.0.1", int(address))
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serve JSON Lines requests of the form {"argv": [...]} on one connection.
+
+    Each request is answered with {"status": <exit code>, "stdout": ..., "stderr": ...}.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                argv = json.loads(line)["argv"]
+            except (ValueError, KeyError, TypeError):
+                response = {"status": 2, "stdout": "", "stderr": "Malformed request\n"}
+            else:
+                response = self.server.run(argv)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class DaemonServerMixin:
+    # A Unix socket refuses connections with EAGAIN once the listen backlog is full
+    request_queue_size = 128
+
+    def setup_daemon(self, api, db, parser):
+        """
+        Attach the warm API, database and parser that requests run against.
+
+        :param api: Object for working with the API
+        :type api: ApiWrapper
+        :param db: Object for working with the database
+        :type db: Database
+        :param parser: Argument parser built once for all requests
+        :type parser: argparse.ArgumentParser
+        """
+        self.api = api
+        self.db = db
+        self.parser = parser
+
+    def run(self, argv):
+        """
+        Run one CLI invocation in this process and capture its output.
+
+        :param argv: Command-line arguments, without the program name
+        :type argv: list of str
+        :return: Exit status and captured output
+        :rtype: dict
+        """
+        from main import main
+
+        if not argv or argv[0] not in FORWARDED_COMMANDS:
+            return {"status": 2, "stdout": "", "stderr": f"Only {', '.join(FORWARDED_COMMANDS)} can be served\n"}
+
+        install_capturing_streams()
+        stdout = sys.stdout.capture()
+        stderr = sys.stderr.capture()
+        status = 0
+        try:
+            main(self.api, self.db, argv, self.parser)
+        except SystemExit as exit_request:
+            status = exit_request.code if isinstance(exit_request.code, int) else 1
+        except Exception as error:
+            stderr.write(f"{type(error).__name__}: {error}\n")
+            status = 1
+        finally:
+            sys.stdout.release()
+            sys.stderr.release()
+        return {"status": status, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+class UnixDaemonServer(DaemonServerMixin, socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class TcpDaemonServer(DaemonServerMixin, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def create_server(api, db, address, parser=None):
+    """
+    Create a daemon server bound to a Unix socket or a local TCP port.
+
+    :param api: Object for working with the API
+    :type api: ApiWrapper
+    :param db: Object for working with the database
+    :type db: Database
+    :param address: Port number, "host:port", or a socket path
+    :type address: int or str
+    :param parser: Argument parser built once for all requests
+    :type parser: argparse.ArgumentParser or None
+    :return: Bound server, not yet serving
+    :rtype: socketserver.BaseServer
+    """
+    from main import build_parser
+
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.unlink(bind_address)
+        server = UnixDaemonServer(bind_address, DaemonRequestHandler)
+    else:
+        server = TcpDaemonServer(bind_address, DaemonRequestHandler)
+    server.setup_daemon(api, db, parser or build_parser())
+    return server
+
+
+def serve(api, db, address, parser=None):
+    """
+    Keep the API and database warm and serve requests until interrupted.
+
+    :param api: Object for working with the API
+    :type api: ApiWrapper
+    :param db: Object for working with the database
+    :type db: Database
+    :param address: Port number, "host:port", or a socket path
+    :type address: int or str
+    :param parser: Argument parser built once for all requests
+    :type parser: argparse.ArgumentParser or None
+    """
+    # Touch the lazy objects so connection setup happens before the first request
+    getattr(api, "http_handler", None)
+    getattr(db, "engine", None)
+
+    server = create_server(api, db, address, parser)
+    print(f"Serving on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        family, bind_address = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.unlink(bind_address)
+
+
+class DaemonClient:
+    def __init__(self, address, timeout=None, connect_timeout=5):
+        """
+        Initialize a thin client holding one connection to a running daemon.
+
+        :param address: Port number, "host:port", or a socket path
+        :type address: int or str
+        :param timeout: Seconds to wait for a response, no limit if None, since commands such as
+            ``new --count`` can legitimately run for a long time
+        :type timeout: float or None
+        :param connect_timeout: Seconds to wait for the connection to be established
+        :type connect_timeout: float
+        """
+        family, connect_address = parse_address(address)
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.settimeout(connect_timeout)
+        try:
+            self.socket.connect(connect_address)
+        except OSError:
+            self.socket.close()
+            raise
+        self.socket.settimeout(timeout)
+        self.stream = self.socket.makefile("rwb")
+
+    def run(self, argv):
+        """
+        Run a CLI invocation in the daemon.
+
+        :param argv: Command-line arguments, without the program name
+        :type argv: list of str
+        :return: Exit status and captured output
+        :rtype: dict
+        :raises OSError: If the connection fails, times out or is closed before the response
+        :raises ValueError: If the response is not valid JSON
+        """
+        self.stream.write((json.dumps({"argv": list(argv)}) + "\n").encode())
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        """
+        Close the connection to the daemon.
+        """
+        self.stream.close()
+        self.socket.close()
+
+
+def forward(address, argv, timeout=None):
+    """
+    Forward a CLI invocation to a running daemon and replay its output.
+
+    Once the request is sent it is not retried locally, since the daemon may already be
+    running it; a lost connection is reported with exit status 1 instead.
+
+    :param address: Port number, "host:port", or a socket path
+    :type address: int or str
+    :param argv: Command-line arguments, without the program name
+    :type argv: list of str
+    :param timeout: Seconds to wait for the response, no limit if None
+    :type timeout: float or None
+    :return: Exit status, or None if the command must run locally
+    :rtype: int or None
+    """
+    if not argv or argv[0] not in FORWARDED_COMMANDS:
+        return None
+    try:
+        client = DaemonClient(address, timeout=timeout)
+    except OSError:
+        return None
+    try:
+        response = client.run(argv)
+    except (OSError, ValueError) as error:
+        print(f"Lost the connection to the activities daemon at {address}: {error}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
@@ -0,0 +1,297 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from activity_cache import normalize_filters
+from metrics import REGISTRY
+from models import HarvestJob
+from throttling import TokenBucket
+from validation import quarantine_row, validate_activity
+
+
+def load_spec(path):
+    """
+    Read and validate a harvest spec.
+
+    The spec is a JSON document::
+
+        {
+            "rate": 2, "burst": 5, "workers": 4,
+            "jobs": [
+                {"name": "education", "filters": {"type": "education"}, "max_unique": 100,
+                 "patience": 50, "max_requests": 1000, "rate": 1}
+            ]
+        }
+
+    ``rate`` and ``burst`` limit all requests, a job's ``rate`` limits that job only. A job
+    stops once it saved ``max_unique`` new activities, after ``patience`` consecutive requests
+    without a new key, or after ``max_requests`` requests.
+
+    :param path: Spec file path
+    :type path: str
+    :return: Spec with defaults filled in
+    :rtype: dict
+    :raises ValueError: If the spec is malformed
+    """
+    with open(path, encoding="utf-8") as stream:
+        try:
+            spec = json.load(stream)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid harvest spec '{path}': {error}") from error
+
+    if not isinstance(spec, dict) or not isinstance(spec.get("jobs"), list) or not spec["jobs"]:
+        raise ValueError(f"Invalid harvest spec '{path}': expected an object with a non-empty 'jobs' list")
+
+    jobs = []
+    for index, job in enumerate(spec["jobs"]):
+        filters = job.get("filters") or {}
+        if not isinstance(filters, dict):
+            raise ValueError(f"Invalid harvest job {index}: 'filters' must be an object")
+        if not isinstance(job.get("max_unique"), int) or job["max_unique"] < 1:
+            raise ValueError(f"Invalid harvest job {index}: 'max_unique' must be a positive integer")
+        jobs.append({
+            "name": job.get("name") or normalize_filters(filters),
+            "filters": filters,
+            "max_unique": job["max_unique"],
+            "patience": job.get("patience", 50),
+            "max_requests": job.get("max_requests"),
+            "rate": job.get("rate"),
+        })
+
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Invalid harvest spec '{path}': job names must be unique")
+
+    return {"rate": spec.get("rate"), "burst": spec.get("burst"), "workers": spec.get("workers", 4), "jobs": jobs}
+
+
+def job_status(job):
+    """
+    Derive the status of a job from its counters and limits.
+
+    :param job: Job columns
+    :type job: dict
+    :return: "done", "exhausted", "budget" or "pending"
+    :rtype: str
+    """
+    if job["collected"] >= job["target"]:
+        return "done"
+    if job["stale"] >= job["patience"]:
+        return "exhausted"
+    if job["max_requests"] is not None and job["requests"] >= job["max_requests"]:
+        return "budget"
+    return "pending"
+
+
+class JobQueue:
+    def __init__(self, database):
+        """
+        Initialize a harvest job queue persisted in the activities database.
+
+        :param database: Object for working with the database
+        :type database: Database
+        """
+        self.database = database
+        self.table = HarvestJob.__table__
+
+    def sync(self, jobs, reset=False):
+        """
+        Register the jobs of a spec, keeping the progress of jobs that were already queued.
+
+        Limits are taken from the spec, so raising a finished job's target queues it again.
+
+        :param jobs: Jobs of a spec, as returned by load_spec
+        :type jobs: list of dict
+        :param reset: Start every job from scratch
+        :type reset: bool
+        :return: Queued jobs in spec order, as dictionaries of their columns
+        :rtype: list of dict
+        """
+        table = self.table
+        names = [job["name"] for job in jobs]
+        query = select(table).where(table.c.name.in_(names))
+        with self.database.engine.begin() as connection:
+            stored = {row.name: row._asdict() for row in connection.execute(query)}
+            for job in jobs:
+                values = {"filters": json.dumps(job["filters"], sort_keys=True), "target": job["max_unique"],
+                          "patience": job["patience"], "max_requests": job["max_requests"],
+                          "collected": 0, "requests": 0, "duplicates": 0, "stale": 0}
+                current = stored.get(job["name"])
+                if current is not None and not reset:
+                    for name in ("collected", "requests", "duplicates", "stale"):
+                        values[name] = current[name]
+                values["status"] = job_status(values)
+                if current is None:
+                    connection.execute(table.insert().values(name=job["name"], **values))
+                else:
+                    connection.execute(table.update().where(table.c.id == current["id"]).values(**values))
+            queued = {row.name: row._asdict() for row in connection.execute(query)}
+        return [queued[name] for name in names]
+
+    def save(self, transaction, job, activity=None):
+        """
+        Persist a job's counters, saving an activity in the same transaction.
+
+        :param transaction: Open write transaction of the database
+        :type transaction: WriteTransaction
+        :param job: Job columns
+        :type job: dict
+        :param activity: Validated activity row to save, if the request found one
+        :type activity: dict or None
+        :return: True if the activity was saved, False if its key was already stored
+        :rtype: bool
+        """
+        saved = activity is not None and bool(transaction.save([activity], on_conflict="ignore"))
+        if saved:
+            job["collected"] += 1
+            job["stale"] = 0
+        else:
+            job["duplicates"] += activity is not None
+            job["stale"] += activity is not None
+        job["status"] = job_status(job)
+        transaction.connection.execute(self.table.update().where(self.table.c.id == job["id"]).values(
+            status=job["status"], collected=job["collected"], requests=job["requests"],
+            duplicates=job["duplicates"], stale=job["stale"]))
+        return saved
+
+
+class Harvester:
+    def __init__(self, api, database, spec):
+        """
+        Initialize a worker pool that runs the jobs of a harvest spec.
+
+        :param api: Object for working with the API
+        :type api: ApiWrapper
+        :param database: Object for working with the database
+        :type database: Database
+        :param spec: Harvest spec, as returned by load_spec
+        :type spec: dict
+        """
+        self.api = api
+        self.database = database
+        self.spec = spec
+        self.queue = JobQueue(database)
+        self.limiter = TokenBucket(spec["rate"], spec["burst"]) if spec["rate"] else None
+        self.job_limiters = {job["name"]: TokenBucket(job["rate"]) for job in spec["jobs"] if job["rate"]}
+        self.lock = threading.Lock()
+        self.keys = set()
+        self.jobs = []
+        self.in_flight = {}
+        self.next_index = 0
+        self.failures = 0
+
+    def run(self, reset=False):
+        """
+        Run the queued jobs until each of them is finished.
+
+        :param reset: Start every job from scratch instead of resuming
+        :type reset: bool
+        :return: Final state of every job of the spec
+        :rtype: list of dict
+        """
+        self.jobs = self.queue.sync(self.spec["jobs"], reset=reset)
+        for job in self.jobs:
+            job["filters"] = json.loads(job["filters"])
+            self.in_flight[job["id"]] = 0
+        # Known keys are skipped without a write
+        self.keys = set(self.database.iter_keys())
+
+        workers = max(1, self.spec["workers"])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(self._work) for _ in range(workers)]:
+                future.result()
+        return self.jobs
+
+    def _claim(self):
+        """
+        Pick the next job that still needs requests, round robin.
+
+        Requests in flight count towards the target, so workers do not overshoot it.
+
+        :return: Job to work on, or None when every job is finished
+        :rtype: dict or None
+        """
+        with self.lock:
+            for offset in range(len(self.jobs)):
+                job = self.jobs[(self.next_index + offset) % len(self.jobs)]
+                in_flight = self.in_flight[job["id"]]
+                if job["status"] != "pending" or job["collected"] + in_flight >= job["target"]:
+                    continue
+                if job["max_requests"] is not None and job["requests"] + in_flight >= job["max_requests"]:
+                    continue
+                self.next_index = (self.next_index + offset + 1) % len(self.jobs)
+                self.in_flight[job["id"]] += 1
+                return job
+        return None
+
+    def _work(self):
+        """
+        Fetch and record activities until no job needs more requests.
+        """
+        while True:
+            job = self._claim()
+            if job is None:
+                # Requests still in flight may fail, so check again once they are recorded
+                with self.lock:
+                    if not any(self.in_flight.values()):
+                        return
+                time.sleep(0.01)
+                continue
+
+            limiter = self.job_limiters.get(job["name"])
+            if limiter is not None:
+                limiter.acquire()
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            try:
+                with REGISTRY.timer("harvest.request"):
+                    activity = self.api.get_random_activity(filters=job["filters"] or None)
+            except Exception:
+                with self.lock:
+                    self.in_flight[job["id"]] -= 1
+                raise
+            self._record(job, activity)
+
+    def _record(self, job, activity):
+        """
+        Update a job with the outcome of one request and persist it.
+
+        :param job: Job the request was made for
+        :type job: dict
+        :param activity: Response of the API
+        :type activity: dict or None
+        """
+        with self.lock, self.database.transaction() as transaction:
+            self.in_flight[job["id"]] -= 1
+            job["requests"] += 1
+            candidate = None
+
+            if activity is None:
+                # A failed request brings no new key either, so a failing API exhausts the job
+                self.failures += 1
+                job["stale"] += 1
+            elif "key" not in activity:
+                # The API answers with an error when no activity matches the filters
+                job["stale"] = job["patience"]
+            else:
+                row, reason = validate_activity(activity)
+                if row is None:
+                    # A malformed response counts as a failed request
+                    self.failures += 1
+                    job["stale"] += 1
+                    transaction.quarantine([quarantine_row(activity, reason)])
+                elif row["key"] in self.keys or job["collected"] >= job["target"]:
+                    job["duplicates"] += 1
+                    job["stale"] += 1
+                else:
+                    self.keys.add(row["key"])
+                    candidate = row
+
+            saved = self.queue.save(transaction, job, candidate)
+        REGISTRY.increment("harvest.requests")
+        if saved:
+            REGISTRY.increment("harvest.saved")
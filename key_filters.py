@@ -0,0 +1,105 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Initialize a Bloom filter sized for ``capacity`` keys at the given false positive rate.
+
+        :param capacity: Expected number of keys
+        :type capacity: int
+        :param error_rate: Target probability that an absent key is reported as present
+        :type error_rate: float
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        """
+        Compute the bit positions of a key by double hashing one 128-bit digest.
+
+        :param key: Key to hash, other types are hashed as their string
+        :type key: str
+        :return: Bit positions
+        :rtype: generator of int
+        """
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, key):
+        """
+        Add a key to the filter.
+
+        :param key: Key to add
+        :type key: str
+        """
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class StoredKeys:
+    def __init__(self, database, kind="set", error_rate=0.001):
+        """
+        Initialize an in-memory view of the activity keys stored in the database.
+
+        A set answers exactly. A Bloom filter uses a fraction of the memory; its rare false
+        positives are confirmed against the database, so answers stay exact either way.
+
+        :param database: Object for working with the database
+        :type database: Database
+        :param kind: "set" or "bloom"
+        :type kind: str
+        :param error_rate: False positive rate of the Bloom filter
+        :type error_rate: float
+        :raises ValueError: If kind is not a known filter
+        """
+        if kind not in ("set", "bloom"):
+            raise ValueError(f"Unknown key filter '{kind}', expected 'set' or 'bloom'")
+        self.database = database
+        self.kind = kind
+        self.lookups = 0
+        # Keys added since loading are kept exactly, as they may not be written yet
+        self.added = set()
+        if kind == "set":
+            self.keys = set(database.iter_keys())
+        else:
+            self.keys = BloomFilter(database.count_activities(), error_rate)
+            for key in database.iter_keys():
+                self.keys.add(key)
+
+    def is_new(self, key):
+        """
+        Check whether a key is neither stored nor added since loading.
+
+        :param key: Activity key, numeric keys are compared as the strings they are stored as
+        :type key: str or int
+        :return: True if the key is new
+        :rtype: bool
+        """
+        key = str(key)
+        if key in self.added:
+            return False
+        if key not in self.keys:
+            return True
+        if self.kind == "set":
+            return False
+        self.lookups += 1
+        return not self.database.key_exists(key)
+
+    def add(self, key):
+        """
+        Record a key as stored.
+
+        :param key: Activity key
+        :type key: str or int
+        """
+        self.added.add(str(key))
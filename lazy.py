@@ -0,0 +1,66 @@
+class LazyObject:
+    def __init__(self, factory):
+        """
+        Initialize a proxy that builds the wrapped object on first attribute access.
+
+        :param factory: Callable returning the wrapped object
+        :type factory: callable
+        """
+        self._factory = factory
+        self._instance = None
+
+    def _get_instance(self):
+        """
+        Build the wrapped object if needed and return it.
+
+        :return: The wrapped object
+        :rtype: object
+        """
+        if self._instance is None:
+            self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get_instance(), name)
+
+
+class LazyDatabase(LazyObject):
+    def __init__(self, db_name, profile=None):
+        """
+        Initialize a database proxy that serves listings without loading SQLAlchemy.
+
+        Listing is answered by SqliteReader when the database file already has its schema;
+        every other operation builds the full Database on first use.
+
+        :param db_name: SQLite database file name or SQLAlchemy URL
+        :type db_name: str
+        :param profile: Name of the SQLite pragma profile
+        :type profile: str or None
+        """
+        super().__init__(self._build_database)
+        self.db_name = db_name
+        self.profile = profile
+
+    def _build_database(self):
+        """
+        Build the full Database.
+
+        :return: Object for working with the database
+        :rtype: Database
+        """
+        from database import Database
+        return Database(self.db_name, profile=self.profile)
+
+    def iter_latest_activities(self, *args, **kwargs):
+        """
+        Stream the latest activities, avoiding SQLAlchemy when the schema already exists.
+
+        :return: Generator of activity rows
+        :rtype: generator
+        """
+        if self._instance is None and "://" not in self.db_name:
+            from sqlite_reader import SqliteReader
+            reader = SqliteReader(self.db_name)
+            if reader.has_schema():
+                return reader.iter_latest_activities(*args, **kwargs)
+        return self._get_instance().iter_latest_activities(*args, **kwargs)
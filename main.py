@@ -1,57 +1,290 @@
 import argparse
+import os
+import sys
 
-from api_wrapper import ApiWrapper, HttpRequestHandler
-from command import NewCommand, ListCommand
-from database import Database
+from lazy import LazyDatabase, LazyObject
+from metrics import REGISTRY, JsonLogSink, PrometheusTextFileSink, format_breakdown
 
+# Heavy dependencies (requests, SQLAlchemy) are imported on first use, so commands that
+# do not need them start faster
+LAZY_ATTRIBUTES = {
+    "ApiWrapper": "api_wrapper",
+    "HttpRequestHandler": "api_wrapper",
+    "Database": "database",
+}
 
-def main(api, db):
+
+def __getattr__(name):
     """
-    Main application function.
+    Resolve the API and database classes lazily on attribute access.
 
-    :param api: Object for working with the API
-    :type api: ApiWrapper
-    :param db: Object for working with the database
-    :type db: Database
+    :param name: Attribute name
+    :type name: str
+    :return: The requested class
+    :rtype: type
+    """
+    if name in LAZY_ATTRIBUTES:
+        import importlib
+        return getattr(importlib.import_module(LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_api():
+    """
+    Build the API wrapper with a pooled HTTP handler.
+
+    :return: Object for working with the API
+    :rtype: ApiWrapper
+    """
+    from api_wrapper import ApiWrapper, HttpRequestHandler
+    return ApiWrapper(HttpRequestHandler())
+
+
+def add_filter_arguments(parser):
+    """
+    Add the activity filter options shared by several commands.
+
+    :param parser: Parser of a subcommand
+    :type parser: argparse.ArgumentParser
+    """
+    parser.add_argument("--type", help="Filter by activity type")
+    parser.add_argument("--participants", type=int, help="Number of participants")
+    parser.add_argument("--price_min", type=float, help="Minimum price")
+    parser.add_argument("--price_max", type=float, help="Maximum price")
+    parser.add_argument("--accessibility_min", type=float, help="Minimum accessibility")
+    parser.add_argument("--accessibility_max", type=float, help="Maximum accessibility")
+
+
+def parse_duration(value):
+    """
+    Parse a duration such as "90", "30m", "12h" or "7d" into seconds.
+
+    :param value: Number followed by an optional unit: s, m, h or d
+    :type value: str
+    :return: Duration in seconds
+    :rtype: int
+    :raises argparse.ArgumentTypeError: If the value is not a valid duration
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    number, unit = (value[:-1], value[-1]) if value[-1:] in units else (value, "s")
+    if not number.isdigit():
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}', expected e.g. 90, 30m, 12h or 7d")
+    return int(number) * units[unit]
+
+
+def parse_positive_int(value):
+    """
+    Parse a count that must be at least 1.
+
+    :param value: Whole number
+    :type value: str
+    :return: Parsed number
+    :rtype: int
+    :raises argparse.ArgumentTypeError: If the value is not a whole number of at least 1
+    """
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"invalid count '{value}', expected a whole number of at least 1")
+    return int(value)
+
+
+def build_parser():
+    """
+    Build the command-line argument parser.
+
+    :return: Parser for all available commands
+    :rtype: argparse.ArgumentParser
     """
 
     # Create a command-line argument parser with program description
     parser = argparse.ArgumentParser(description="Bored API Command Line Program")
 
+    # Instrumentation options shared by all commands
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing breakdown to stderr")
+    parser.add_argument("--metrics_prom", help="Write metrics in Prometheus text format to this file")
+    parser.add_argument("--metrics_json", help="Append one JSON line per metric event to this file")
+
     # Add subparsers for available commands
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     # Command to fetch and save a new activity
     new_parser = subparsers.add_parser("new", help="Fetch and save a new activity")
-    new_parser.add_argument("--type", help="Filter by activity type")
-    new_parser.add_argument("--participants", type=int, help="Number of participants")
-    new_parser.add_argument("--price_min", type=float, help="Minimum price")
-    new_parser.add_argument("--price_max", type=float, help="Maximum price")
-    new_parser.add_argument("--accessibility_min", type=float, help="Minimum accessibility")
-    new_parser.add_argument("--accessibility_max", type=float, help="Maximum accessibility")
+    add_filter_arguments(new_parser)
+    new_parser.add_argument("--count", type=parse_positive_int, default=1, help="Number of activities to fetch")
+    new_parser.add_argument("--concurrency", type=parse_positive_int, default=8,
+                            help="Maximum number of parallel requests")
+    new_parser.add_argument("--offline", action="store_true", help="Answer from the local catalogue instead of HTTP")
+    new_parser.add_argument("--unique", action="store_true",
+                            help="Fetch until --count activities with keys not stored yet are saved")
+    new_parser.add_argument("--patience", type=int, default=20,
+                            help="With --unique, stop after this many consecutive requests without a new key")
+    new_parser.add_argument("--key_filter", choices=["set", "bloom"], default="set",
+                            help="With --unique, hold the stored keys in a set or a smaller Bloom filter")
+
+    # Command to mirror the upstream catalogue into the local database
+    sync_parser = subparsers.add_parser("sync", help="Mirror the upstream activity catalogue locally")
+    sync_parser.add_argument("--max_requests", type=int, default=1000, help="Maximum number of requests to make")
+    sync_parser.add_argument("--patience", type=int, default=100,
+                             help="Stop after this many consecutive requests without a new activity")
+    sync_parser.add_argument("--concurrency", type=parse_positive_int, default=8,
+                             help="Maximum number of parallel requests")
 
     # Command to list recent activities
-    subparsers.add_parser("list", help="List recent activities")
+    list_parser = subparsers.add_parser("list", help="List recent activities")
+    add_filter_arguments(list_parser)
+    list_parser.add_argument("--limit", type=int, default=5, help="Maximum number of activities, 0 for all")
+    list_parser.add_argument("--offset", type=int, default=0, help="Number of activities to skip")
+    list_parser.add_argument("--before_id", type=int, help="Only list activities older than this id")
+    list_parser.add_argument("--format", choices=["text", "jsonl", "csv"], default="text", help="Output format")
+
+    # Command to import activities from a file
+    import_parser = subparsers.add_parser("import",
+                                          help="Import activities from a JSON Lines, CSV, Parquet or Arrow file")
+    import_parser.add_argument("path", help="File to read, - for standard input")
+    import_parser.add_argument("--format", choices=["jsonl", "csv", "parquet", "arrow"],
+                               help="Input format, guessed from the extension")
+    import_parser.add_argument("--batch_size", type=int, default=1000, help="Number of rows per transaction")
+    import_parser.add_argument("--on_conflict", choices=["update", "ignore", "error"], default="update",
+                               help="What to do with activities whose key is already stored")
+
+    # Command to export activities to a file
+    export_parser = subparsers.add_parser("export",
+                                          help="Export activities to a JSON Lines, CSV, Parquet or Arrow file")
+    export_parser.add_argument("path", help="File to write, - for standard output")
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "parquet", "arrow"],
+                               help="Output format, guessed from the extension; parquet and arrow need pyarrow")
+    add_filter_arguments(export_parser)
+
+    # Command to run the jobs of a harvest spec with a worker pool
+    harvest_parser = subparsers.add_parser("harvest", help="Collect activities as described by a JSON harvest spec")
+    harvest_parser.add_argument("spec", help="Harvest spec file")
+    harvest_parser.add_argument("--workers", type=int, help="Number of worker threads, overriding the spec")
+    harvest_parser.add_argument("--reset", action="store_true", help="Restart every job instead of resuming")
+
+    # Command to harvest with fetch worker processes feeding a single writer process
+    pipeline_parser = subparsers.add_parser("pipeline",
+                                            help="Fetch activities with several processes and save them in batches")
+    add_filter_arguments(pipeline_parser)
+    pipeline_parser.add_argument("--requests", type=int, default=100, help="Total number of requests to make")
+    pipeline_parser.add_argument("--processes", type=int, help="Number of fetch processes, one per CPU by default")
+    pipeline_parser.add_argument("--rate", type=float, help="Maximum requests per second of all processes together")
+    pipeline_parser.add_argument("--queue_size", type=int, default=1000,
+                                 help="Maximum number of activities waiting for the writer")
+    pipeline_parser.add_argument("--batch_size", type=int, default=500, help="Number of rows per transaction")
+    pipeline_parser.add_argument("--on_conflict", choices=["ignore", "update"], default="ignore",
+                                 help="What to do with activities whose key is already stored")
+    pipeline_parser.add_argument("--url", help="Activity endpoint, the public API by default")
+
+    # Command to rank stored activities against preferences
+    recommend_parser = subparsers.add_parser("recommend", help="Recommend stored activities closest to preferences")
+    recommend_parser.add_argument("--participants", type=int, help="Preferred number of participants")
+    recommend_parser.add_argument("--budget", type=float, help="Preferred price, from 0 to 1")
+    recommend_parser.add_argument("--accessibility", type=float, help="Preferred accessibility, from 0 to 1")
+    recommend_parser.add_argument("--type", help="Preferred activity type")
+    recommend_parser.add_argument("--type_weight", type=float, default=0.5,
+                                  help="Distance added to activities of another type")
+    recommend_parser.add_argument("-k", type=parse_positive_int, default=10, help="Number of activities to recommend")
+
+    # Command to search saved activities by words in their text or link domain
+    search_parser = subparsers.add_parser("search", help="Search saved activities by text or link domain")
+    search_parser.add_argument("query", help="Words to match; end a word with * to match it as a prefix")
+    add_filter_arguments(search_parser)
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum number of activities, 0 for all")
+    search_parser.add_argument("--format", choices=["text", "jsonl", "csv"], default="text", help="Output format")
+
+    # Command to report aggregate statistics of the saved activities
+    stats_parser = subparsers.add_parser("stats", help="Show counts and averages per activity type")
+    stats_parser.add_argument("--window", type=parse_duration,
+                              help="Only count activities saved within this duration, e.g. 30m, 12h or 7d")
+    stats_parser.add_argument("--type", help="Only report this activity type")
+
+    # Command to keep the API and database warm and serve requests over a local socket
+    serve_parser = subparsers.add_parser("serve", help="Serve new, list and recommend requests over a local socket")
+    serve_address = serve_parser.add_mutually_exclusive_group()
+    serve_address.add_argument("--socket", default="activities.sock", help="Unix domain socket path to listen on")
+    serve_address.add_argument("--port", type=int, help="Local TCP port to listen on instead of a Unix socket")
+
+    return parser
+
+
+def main(api, db, argv=None, parser=None):
+    """
+    Main application function.
+
+    :param api: Object for working with the API
+    :type api: ApiWrapper
+    :param db: Object for working with the database
+    :type db: Database
+    :param argv: (Optional) Command-line arguments, sys.argv[1:] if None
+    :type argv: list of str or None
+    :param parser: (Optional) Prebuilt argument parser, reused by the daemon
+    :type parser: argparse.ArgumentParser or None
+    """
+    parser = parser or build_parser()
 
     # Parse command-line arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        from daemon import serve
+        serve(api, db, args.port if args.port is not None else args.socket, parser)
+        return
+
+    from command import (NewCommand, ListCommand, SyncCommand, ImportCommand, ExportCommand, HarvestCommand,
+                         PipelineCommand, RecommendCommand, SearchCommand, StatsCommand, UsageError)
 
     # Create a dictionary of commands to execute
     commands = {
         "new": NewCommand(api, db, args),
-        "list": ListCommand(db)
+        "sync": SyncCommand(api, db, args),
+        "list": ListCommand(db, args),
+        "import": ImportCommand(db, args),
+        "export": ExportCommand(db, args),
+        "harvest": HarvestCommand(api, db, args),
+        "pipeline": PipelineCommand(db, args),
+        "recommend": RecommendCommand(db, args),
+        "search": SearchCommand(db, args),
+        "stats": StatsCommand(db, args)
     }
 
     # Check which command the user requested and execute the corresponding command
-    if args.command in commands:
-        commands[args.command].execute()
-    else:
+    if args.command not in commands:
         # Print help if an invalid command is specified
         parser.print_help()
+        return
+
+    sinks = []
+    if args.metrics_prom:
+        sinks.append(PrometheusTextFileSink(args.metrics_prom))
+    if args.metrics_json:
+        sinks.append(JsonLogSink(args.metrics_json))
+    for sink in sinks:
+        REGISTRY.add_sink(sink)
+
+    before = REGISTRY.snapshot()
+    try:
+        with REGISTRY.timer(f"command.{args.command}"):
+            commands[args.command].execute()
+    except UsageError as error:
+        parser.exit(2, f"{parser.prog}: error: {error}\n")
+    finally:
+        if args.profile:
+            print(format_breakdown(before, REGISTRY.snapshot()), file=sys.stderr)
+        for sink in sinks:
+            sink.flush(REGISTRY)
+            sink.close()
+            REGISTRY.remove_sink(sink)
 
 
 if __name__ == "__main__":
-    http_handler = HttpRequestHandler()
-    api = ApiWrapper(http_handler)
-    database = Database('activities.db')
+    # Forward to a running daemon when one is configured, falling back to running locally
+    daemon_address = os.environ.get('ACTIVITIES_DAEMON')
+    if daemon_address:
+        from daemon import forward
+        status = forward(daemon_address, sys.argv[1:])
+        if status is not None:
+            sys.exit(status)
+
+    api = LazyObject(build_api)
+    database = LazyDatabase(os.environ.get('ACTIVITIES_DB_URL', 'activities.db'),
+                            profile=os.environ.get('ACTIVITIES_DB_PROFILE'))
     main(api, database)
@@ -0,0 +1,317 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Initialize a cumulative latency histogram.
+
+        :param buckets: Upper bounds of the buckets in seconds, ascending
+        :type buckets: tuple of float
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        Record one observation.
+
+        :param value: Observed duration in seconds
+        :type value: float
+        """
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def snapshot(self):
+        """
+        Copy the histogram state.
+
+        :return: Count, sum, max and per-bucket counts
+        :rtype: dict
+        """
+        return {"count": self.count, "sum": self.sum, "max": self.max, "buckets": list(self.counts)}
+
+
+class InMemorySink:
+    def __init__(self):
+        """
+        Initialize a sink that keeps every event in a list, mainly for tests and ad-hoc analysis.
+        """
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+    def flush(self, registry):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonLogSink:
+    def __init__(self, path):
+        """
+        Initialize a sink that appends one JSON line per event to a file.
+
+        :param path: Log file path
+        :type path: str
+        """
+        self.stream = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def record(self, event):
+        line = json.dumps(dict(event, timestamp=time.time())) + "\n"
+        with self.lock:
+            self.stream.write(line)
+
+    def flush(self, registry):
+        with self.lock:
+            self.stream.flush()
+
+    def close(self):
+        with self.lock:
+            self.stream.close()
+
+
+class PrometheusTextFileSink:
+    def __init__(self, path, prefix="activities"):
+        """
+        Initialize a sink that writes the registry in the Prometheus text exposition format.
+
+        The file is replaced atomically on flush, as expected by the node exporter's textfile
+        collector.
+
+        :param path: Output file path
+        :type path: str
+        :param prefix: Prefix of every metric name
+        :type prefix: str
+        """
+        self.path = path
+        self.prefix = prefix
+
+    def record(self, event):
+        pass
+
+    def _metric_name(self, name):
+        return f"{self.prefix}_{name.replace('.', '_')}"
+
+    def render(self, registry):
+        """
+        Render the registry as Prometheus text.
+
+        :param registry: Registry to render
+        :type registry: Registry
+        :return: Exposition text
+        :rtype: str
+        """
+        snapshot = registry.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = self._metric_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, histogram in sorted(snapshot["timers"].items()):
+            metric = self._metric_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(registry.buckets, histogram["buckets"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}',
+                      f"{metric}_sum {histogram['sum']}",
+                      f"{metric}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self, registry):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as output:
+            output.write(self.render(registry))
+        os.replace(temporary, self.path)
+
+    def close(self):
+        pass
+
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Initialize a registry of counters and latency histograms with pluggable sinks.
+
+        :param buckets: Upper bounds of the histogram buckets in seconds
+        :type buckets: tuple of float
+        """
+        self.buckets = buckets
+        self.counters = {}
+        self.timers = {}
+        self.sinks = []
+        self.lock = threading.Lock()
+
+    def add_sink(self, sink):
+        """
+        Send every future event to a sink.
+
+        :param sink: Object with record(event), flush(registry) and close() methods
+        :type sink: InMemorySink or JsonLogSink or PrometheusTextFileSink
+        """
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """
+        Stop sending events to a sink.
+
+        :param sink: Previously added sink
+        :type sink: object
+        """
+        self.sinks.remove(sink)
+
+    def increment(self, name, value=1):
+        """
+        Increase a counter.
+
+        :param name: Counter name, dot separated
+        :type name: str
+        :param value: Amount to add
+        :type value: int
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        for sink in self.sinks:
+            sink.record({"type": "counter", "name": name, "value": value})
+
+    def observe(self, name, seconds):
+        """
+        Record a duration in a latency histogram.
+
+        :param name: Timer name, dot separated
+        :type name: str
+        :param seconds: Duration in seconds
+        :type seconds: float
+        """
+        with self.lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        for sink in self.sinks:
+            sink.record({"type": "timer", "name": name, "value": seconds})
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Time the enclosed block and record it under ``name``, even if it raises.
+
+        :param name: Timer name, dot separated
+        :type name: str
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def time_iterator(self, name, iterable):
+        """
+        Yield the items of an iterable, recording under ``name`` the time spent producing them.
+
+        The time the consumer spends between items is left out, so a streaming reader is charged
+        for its own work only. The total is recorded once the iterable is exhausted or closed.
+
+        :param name: Timer name, dot separated
+        :type name: str
+        :param iterable: Iterable to time, closed with the returned generator
+        :type iterable: iterable
+        :return: Generator of the items
+        :rtype: generator
+        """
+        iterator = iter(iterable)
+        seconds = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started
+                yield item
+        finally:
+            started = time.perf_counter()
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            self.observe(name, seconds + time.perf_counter() - started)
+
+    def snapshot(self):
+        """
+        Copy the current counters and histograms.
+
+        :return: Dictionary with "counters" and "timers"
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {name: histogram.snapshot() for name, histogram in self.timers.items()},
+            }
+
+    def flush(self):
+        """
+        Ask every sink to persist what it has recorded.
+        """
+        for sink in self.sinks:
+            sink.flush(self)
+
+    def reset(self):
+        """
+        Drop all recorded counters and histograms.
+        """
+        with self.lock:
+            self.counters.clear()
+            self.timers.clear()
+
+
+def format_breakdown(before, after):
+    """
+    Format the per-stage timing recorded between two snapshots as a table.
+
+    :param before: Snapshot taken before the measured work
+    :type before: dict
+    :param after: Snapshot taken after the measured work
+    :type after: dict
+    :return: Table of stages with call counts, total and mean milliseconds
+    :rtype: str
+    """
+    rows = []
+    for name, histogram in after["timers"].items():
+        previous = before["timers"].get(name, {"count": 0, "sum": 0.0})
+        count = histogram["count"] - previous["count"]
+        if count:
+            total = histogram["sum"] - previous["sum"]
+            rows.append((name, count, total * 1000, total * 1000 / count))
+    rows.sort(key=lambda row: row[2], reverse=True)
+
+    width = max([len("stage")] + [len(row[0]) for row in rows])
+    lines = [f"{'stage':<{width}}  {'calls':>7}  {'total ms':>10}  {'mean ms':>9}"]
+    lines += [f"{name:<{width}}  {count:>7}  {total:>10.2f}  {mean:>9.3f}" for name, count, total, mean in rows]
+    return "\n".join(lines)
+
+
+# Registry used by the API, database and command instrumentation
+REGISTRY = Registry()
@@ -0,0 +1,160 @@
+from sqlalchemy import inspect, text
+from backends import get_backend
+from models import (ROLLUP_BUCKET_SECONDS, ROLLUP_METRICS, Activity, ActivityRollup, CatalogueActivity, HarvestJob,
+                    QuarantinedActivity, metadata)
+
+
+def _deduplicate_activity_keys(connection):
+    """
+    Remove duplicate activity keys, keeping the most recently saved row for each key.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    connection.execute(text(
+        "DELETE FROM activities WHERE key IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM activities WHERE key IS NOT NULL GROUP BY key)"))
+
+
+def _create_missing_indexes(connection):
+    """
+    Create the indexes declared on the models that an older table is missing.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    for model in (Activity, CatalogueActivity):
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _create_activity_rollups(connection):
+    """
+    Add the created_at column, build activity_rollups from the stored rows and install the
+    triggers that keep it up to date.
+
+    Rows saved before created_at existed are counted in bucket 0, so they appear in all-time
+    statistics but in no time window.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    if "created_at" not in {column["name"] for column in inspect(connection).get_columns("activities")}:
+        connection.execute(text("ALTER TABLE activities ADD COLUMN created_at INTEGER"))
+    ActivityRollup.__table__.create(connection, checkfirst=True)
+
+    columns = ["type", "bucket", "activity_count"]
+    values = ["COALESCE(type, '')", f"COALESCE(created_at, 0) / {ROLLUP_BUCKET_SECONDS}", "COUNT(*)"]
+    for metric in ROLLUP_METRICS:
+        columns += [f"{metric}_count", f"{metric}_sum"]
+        values += [f"COUNT({metric})", f"COALESCE(SUM({metric}), 0)"]
+    connection.execute(ActivityRollup.__table__.delete())
+    connection.execute(text(
+        f"INSERT INTO activity_rollups ({', '.join(columns)}) SELECT {', '.join(values)} FROM activities "
+        f"GROUP BY COALESCE(type, ''), COALESCE(created_at, 0) / {ROLLUP_BUCKET_SECONDS}"))
+
+    get_backend(connection.dialect.name).create_rollup_triggers(connection)
+
+
+def _create_search_index(connection):
+    """
+    Create the full-text search index over the stored activities.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    get_backend(connection.dialect.name).create_search_index(connection)
+
+
+def _create_harvest_jobs(connection):
+    """
+    Create the table holding the harvest job queue.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    HarvestJob.__table__.create(connection, checkfirst=True)
+
+
+def _create_quarantine(connection):
+    """
+    Create the table holding the payloads rejected by validation.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    """
+    QuarantinedActivity.__table__.create(connection, checkfirst=True)
+
+
+# Ordered schema migrations; the position in this list is the resulting schema version
+MIGRATIONS = [
+    [_deduplicate_activity_keys, _create_missing_indexes],
+    [_create_activity_rollups],
+    [_create_search_index],
+    [_create_harvest_jobs],
+    [_create_quarantine],
+]
+
+
+def get_schema_version(connection):
+    """
+    Read the schema version, stored in the SQLite file header or a schema_version table.
+
+    :param connection: Open connection
+    :type connection: sqlalchemy.engine.Connection
+    :return: Current schema version
+    :rtype: int
+    """
+    return get_backend(connection.dialect.name).get_schema_version(connection)
+
+
+def migrate_connection(connection):
+    """
+    Bring the database behind an open connection up to the latest schema version.
+
+    ``metadata.create_all`` only creates missing tables, so indexes and constraints added to
+    tables that already exist are applied here.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    :return: Schema version after migrating
+    :rtype: int
+    """
+    version = get_schema_version(connection)
+    for target, steps in enumerate(MIGRATIONS[version:], start=version + 1):
+        for step in steps:
+            step(connection)
+        get_backend(connection.dialect.name).set_schema_version(connection, target)
+    return max(version, len(MIGRATIONS))
+
+
+def ensure_schema_connection(connection):
+    """
+    Create and migrate the schema unless the database is already at the latest version.
+
+    Reading the version is a single pragma, so opening an up-to-date database skips table
+    reflection entirely.
+
+    :param connection: Open connection inside a transaction
+    :type connection: sqlalchemy.engine.Connection
+    :return: Schema version
+    :rtype: int
+    """
+    version = get_schema_version(connection)
+    if version >= len(MIGRATIONS):
+        return version
+    metadata.create_all(connection)
+    return migrate_connection(connection)
+
+
+def ensure_schema(engine):
+    """
+    Create and migrate the schema of a database once per file.
+
+    :param engine: Engine bound to the database
+    :type engine: sqlalchemy.engine.Engine
+    :return: Schema version
+    :rtype: int
+    """
+    with engine.begin() as connection:
+        return ensure_schema_connection(connection)
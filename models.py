@@ -1,9 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, MetaData
+import time
+
+from sqlalchemy import Column, Integer, String, Float, Index, MetaData
 from sqlalchemy.orm import declarative_base
 
+from activity_io import format_activity
+
 metadata = MetaData()
 Base = declarative_base(metadata=metadata)
 
+# Width of a rollup time bucket in seconds; stats windows are rounded down to a bucket
+ROLLUP_BUCKET_SECONDS = 3600
+
+# Activity columns whose count and sum are kept per type and bucket
+ROLLUP_METRICS = ("participants", "price", "accessibility")
+
+
+def _timestamp():
+    return int(time.time())
+
 
 class Activity(Base):
     """
@@ -14,6 +28,12 @@ class Activity(Base):
     """
 
     __tablename__ = 'activities'
+    __table_args__ = (
+        Index('ux_activities_key', 'key', unique=True),
+        Index('ix_activities_type_participants', 'type', 'participants'),
+        Index('ix_activities_price', 'price'),
+        Index('ix_activities_accessibility', 'accessibility'),
+    )
 
     id = Column(Integer, primary_key=True)
     activity = Column(String)
@@ -23,6 +43,8 @@ class Activity(Base):
     link = Column(String, nullable=True)
     key = Column(String)
     accessibility = Column(Float)
+    # Seconds since the epoch when the row was first saved; NULL for rows saved before it existed
+    created_at = Column(Integer, default=_timestamp)
 
     def __str__(self):
         """
@@ -32,11 +54,126 @@ class Activity(Base):
         :rtype: str
         """
 
-        return (
-            f"Activity(id={self.id}, "
-            f"activity='{self.activity}', "
-            f"type='{self.type}', "
-            f"participants={self.participants}, "
-            f"price={self.price}, "
-            f"accessibility={self.accessibility}, "
-            f"link='{self.link}')")
+        return format_activity(self)
+
+
+class ActivityRollup(Base):
+    """
+    Represents the running totals of the activities saved per type and hour in the
+    'activity_rollups' table.
+
+    Rows are maintained by database triggers on every insert, update and delete of
+    ``activities``, so statistics are read from a handful of rows whatever the table size.
+
+    :param Base: The base class for SQLAlchemy models.
+    :type Base: sqlalchemy.ext.declarative.declarative_base
+    """
+
+    __tablename__ = 'activity_rollups'
+
+    # Empty string for activities without a type, so the pair stays a usable conflict target
+    type = Column(String, primary_key=True)
+    # created_at // ROLLUP_BUCKET_SECONDS, 0 for activities without created_at
+    bucket = Column(Integer, primary_key=True)
+    activity_count = Column(Integer, nullable=False, default=0)
+    participants_count = Column(Integer, nullable=False, default=0)
+    participants_sum = Column(Float, nullable=False, default=0)
+    price_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0)
+    accessibility_count = Column(Integer, nullable=False, default=0)
+    accessibility_sum = Column(Float, nullable=False, default=0)
+
+
+class CatalogueActivity(Base):
+    """
+    Represents an activity mirrored from the upstream catalogue in the 'catalogue' table.
+
+    Rows are unique on ``key`` and indexed for the filters accepted by the ``new`` command,
+    so offline lookups are answered by indexed queries instead of HTTP requests.
+
+    :param Base: The base class for SQLAlchemy models.
+    :type Base: sqlalchemy.ext.declarative.declarative_base
+    """
+
+    __tablename__ = 'catalogue'
+    __table_args__ = (
+        Index('ix_catalogue_type_participants', 'type', 'participants'),
+        Index('ix_catalogue_price', 'price'),
+        Index('ix_catalogue_accessibility', 'accessibility'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    activity = Column(String)
+    type = Column(String)
+    participants = Column(Integer)
+    price = Column(Float)
+    link = Column(String, nullable=True)
+    key = Column(String, unique=True, nullable=False)
+    accessibility = Column(Float)
+
+    def to_dict(self):
+        """
+        Return the activity in the shape returned by the upstream API.
+
+        :return: Activity data
+        :rtype: dict
+        """
+        return {
+            "activity": self.activity,
+            "type": self.type,
+            "participants": self.participants,
+            "price": self.price,
+            "link": self.link,
+            "key": self.key,
+            "accessibility": self.accessibility
+        }
+
+
+class HarvestJob(Base):
+    """
+    Represents one filter combination of a harvest spec and its progress in the 'harvest_jobs' table.
+
+    Counters are written in the same transaction as the activities the job saves, so a harvest
+    restarted after a crash continues from exactly where it stopped.
+
+    :param Base: The base class for SQLAlchemy models.
+    :type Base: sqlalchemy.ext.declarative.declarative_base
+    """
+
+    __tablename__ = 'harvest_jobs'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    # Filters as canonical JSON
+    filters = Column(String, nullable=False)
+    target = Column(Integer, nullable=False)
+    patience = Column(Integer, nullable=False)
+    max_requests = Column(Integer, nullable=True)
+    # "pending", "done" (target reached), "exhausted" (no new keys) or "budget" (max_requests reached)
+    status = Column(String, nullable=False, default="pending")
+    collected = Column(Integer, nullable=False, default=0)
+    requests = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    # Consecutive requests that returned no new key
+    stale = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Integer, default=_timestamp, onupdate=_timestamp)
+
+
+class QuarantinedActivity(Base):
+    """
+    Represents a payload rejected by validation, kept in the 'quarantined_activities' table.
+
+    The payload is stored as received, so bad responses can be inspected and replayed once
+    the cause is understood.
+
+    :param Base: The base class for SQLAlchemy models.
+    :type Base: sqlalchemy.ext.declarative.declarative_base
+    """
+
+    __tablename__ = 'quarantined_activities'
+
+    id = Column(Integer, primary_key=True)
+    # Payload as JSON; values that are not JSON serializable are stored as their repr
+    payload = Column(String, nullable=False)
+    reason = Column(String, nullable=False)
+    created_at = Column(Integer, default=_timestamp)
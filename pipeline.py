@@ -0,0 +1,303 @@
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+# Activities waiting for the writer; fetch workers block once it is full
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Seconds between checks on the child processes while waiting for them
+POLL_INTERVAL = 0.1
+
+# Marks a writer wake-up with nothing received, as any payload, even a falsy one, must be kept
+_TIMEOUT = object()
+
+
+def shard_sizes(total, shards):
+    """
+    Split a number of requests as evenly as possible between workers.
+
+    :param total: Number of requests to make
+    :type total: int
+    :param shards: Number of workers
+    :type shards: int
+    :return: Number of requests of each worker
+    :rtype: list of int
+    """
+    base, extra = divmod(total, shards)
+    return [base + (index < extra) for index in range(shards)]
+
+
+def _ignore_interrupts():
+    """
+    Leave Ctrl+C to the parent, which turns it into the stop event so children finish cleanly.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def fetch_worker(index, url, filters, requests, rate, activities, results, stop):
+    """
+    Fetch activities over a keep-alive session of this process and queue them for the writer.
+
+    Failed requests are counted and dropped here; every payload received is passed on, so the
+    writer can quarantine the invalid ones. Putting on the bounded queue blocks while the
+    writer is behind.
+
+    :param index: Worker number
+    :type index: int
+    :param url: Activity endpoint, the public API if None
+    :type url: str or None
+    :param filters: Dictionary of filters for the requests
+    :type filters: dict or None
+    :param requests: Number of requests to make
+    :type requests: int
+    :param rate: (Optional) Maximum requests per second of this worker
+    :type rate: float or None
+    :param activities: Queue of payloads read by the writer
+    :type activities: multiprocessing.Queue
+    :param results: Queue receiving the worker's stats
+    :type results: multiprocessing.Queue
+    :param stop: Event set to stop fetching early
+    :type stop: multiprocessing.Event
+    """
+    _ignore_interrupts()
+    from api_wrapper import URL, ApiWrapper, HttpRequestHandler
+
+    stats = {"stage": "fetch", "index": index, "requests": 0, "activities": 0, "failures": 0, "blocked": 0.0}
+    started = time.perf_counter()
+    handler = HttpRequestHandler(rate=rate)
+    api = ApiWrapper(handler, url=url or URL)
+    try:
+        while stats["requests"] < requests and not stop.is_set():
+            activity = api.get_random_activity(filters=filters or None)
+            stats["requests"] += 1
+            if activity is None:
+                stats["failures"] += 1
+                continue
+            waited = time.perf_counter()
+            activities.put(activity)
+            stats["blocked"] += time.perf_counter() - waited
+            stats["activities"] += 1
+    except Exception as error:
+        stats["error"] = repr(error)
+        raise
+    finally:
+        handler.close()
+        stats["elapsed"] = time.perf_counter() - started
+        results.put(stats)
+
+
+def writer_process(db_name, profile, activities, results, batch_size, flush_interval, on_conflict):
+    """
+    Save queued activities in batches until the None sentinel, as the only writer of the database.
+
+    A batch is written once it holds ``batch_size`` rows or its oldest row waited
+    ``flush_interval`` seconds. Payloads failing validation go to the quarantine table.
+
+    :param db_name: SQLite database file name or SQLAlchemy URL
+    :type db_name: str
+    :param profile: Name of the SQLite pragma profile
+    :type profile: str or None
+    :param activities: Queue of payloads, ended by None
+    :type activities: multiprocessing.Queue
+    :param results: Queue receiving the writer's stats
+    :type results: multiprocessing.Queue
+    :param batch_size: Maximum number of rows per transaction
+    :type batch_size: int
+    :param flush_interval: Maximum seconds a row waits before being written
+    :type flush_interval: float
+    :param on_conflict: "ignore" to keep stored keys, "update" to overwrite them
+    :type on_conflict: str
+    """
+    _ignore_interrupts()
+    stats = {"stage": "write", "received": 0, "saved": 0, "quarantined": 0, "batches": 0, "busy": 0.0}
+    started = time.perf_counter()
+    database = None
+    try:
+        from database import Database
+        database = Database(db_name, profile=profile)
+
+        def write(batch):
+            began = time.perf_counter()
+            stats["saved"] += database.bulk_save_activities(batch, batch_size=len(batch), on_conflict=on_conflict)
+            stats["busy"] += time.perf_counter() - began
+            stats["batches"] += 1
+
+        batch = []
+        deadline = None
+        while True:
+            try:
+                row = activities.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                row = _TIMEOUT
+            if row is None:
+                break
+            if row is not _TIMEOUT:
+                batch.append(row)
+                stats["received"] += 1
+                if deadline is None:
+                    deadline = time.monotonic() + flush_interval
+            if batch and (len(batch) >= batch_size or time.monotonic() >= deadline):
+                write(batch)
+                batch = []
+                deadline = None
+        if batch:
+            write(batch)
+    except Exception as error:
+        stats["error"] = repr(error)
+        raise
+    finally:
+        if database is not None:
+            stats["quarantined"] = database.quarantined
+            database.close()
+        stats["elapsed"] = time.perf_counter() - started
+        results.put(stats)
+
+
+def _wait(fetchers, writer):
+    """
+    Wait for the fetch workers to finish, stopping them if the writer dies.
+
+    :param fetchers: Fetch worker processes
+    :type fetchers: list of multiprocessing.Process
+    :param writer: Writer process
+    :type writer: multiprocessing.Process
+    :raises RuntimeError: If the writer exits before the fetch workers
+    """
+    for fetcher in fetchers:
+        while fetcher.is_alive():
+            if not writer.is_alive():
+                # Nobody drains the queue anymore, so blocked workers would never finish
+                for process in fetchers:
+                    process.terminate()
+                    process.join()
+                raise RuntimeError(f"Pipeline writer exited with code {writer.exitcode}")
+            fetcher.join(POLL_INTERVAL)
+
+
+def run_pipeline(db_name, profile=None, url=None, filters=None, requests=100, processes=None, rate=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 on_conflict="ignore"):
+    """
+    Fetch activities with a pool of processes and save them through a single writer process.
+
+    Each fetch worker has its own HTTP session and a shard of the requests, so fetching and
+    parsing scale with cores, while one writer keeps SQLite free of lock contention. The
+    bounded queue between them applies backpressure: workers wait when the writer falls
+    behind instead of buffering without limit. Ctrl+C sets a stop event; workers finish the
+    request in flight and the writer saves everything queued before the pipeline returns.
+
+    :param db_name: SQLite database file name or SQLAlchemy URL
+    :type db_name: str
+    :param profile: Name of the SQLite pragma profile
+    :type profile: str or None
+    :param url: (Optional) Activity endpoint, the public API by default
+    :type url: str or None
+    :param filters: Dictionary of filters for the requests
+    :type filters: dict or None
+    :param requests: Total number of requests to make
+    :type requests: int
+    :param processes: Number of fetch workers, the number of CPUs by default
+    :type processes: int or None
+    :param rate: (Optional) Maximum requests per second of all workers together
+    :type rate: float or None
+    :param queue_size: Maximum number of activities waiting for the writer
+    :type queue_size: int
+    :param batch_size: Maximum number of rows per transaction
+    :type batch_size: int
+    :param flush_interval: Maximum seconds a row waits before being written
+    :type flush_interval: float
+    :param on_conflict: "ignore" to keep stored keys, "update" to overwrite them
+    :type on_conflict: str
+    :return: Stats of each fetch worker and of the writer, total elapsed seconds and whether
+        the run was interrupted
+    :rtype: dict
+    :raises RuntimeError: If the writer fails
+    """
+    processes = max(1, min(processes or os.cpu_count() or 1, requests or 1))
+    context = multiprocessing.get_context()
+    activities = context.Queue(queue_size)
+    results = context.Queue()
+    stop = context.Event()
+
+    # Daemonic children cannot outlive an aborted parent and leave the database locked
+    writer = context.Process(target=writer_process, name="pipeline-writer", daemon=True,
+                             args=(db_name, profile, activities, results, batch_size, flush_interval, on_conflict))
+    fetchers = [
+        context.Process(target=fetch_worker, name=f"pipeline-fetch-{index}", daemon=True,
+                        args=(index, url, filters, count, rate / processes if rate else None, activities, results,
+                              stop))
+        for index, count in enumerate(shard_sizes(requests, processes))]
+
+    started = time.perf_counter()
+    writer.start()
+    for fetcher in fetchers:
+        fetcher.start()
+
+    interrupted = False
+    try:
+        _wait(fetchers, writer)
+    except KeyboardInterrupt:
+        interrupted = True
+        stop.set()
+        _wait(fetchers, writer)
+
+    # Every row of the finished workers is ahead of the sentinel in the queue
+    activities.put(None)
+    writer.join()
+
+    report = {"fetchers": [], "writer": None, "elapsed": time.perf_counter() - started, "interrupted": interrupted}
+    while True:
+        try:
+            stats = results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            break
+        if stats["stage"] == "write":
+            report["writer"] = stats
+        else:
+            report["fetchers"].append(stats)
+    report["fetchers"].sort(key=lambda stats: stats["index"])
+
+    if writer.exitcode != 0:
+        error = (report["writer"] or {}).get("error", f"exit code {writer.exitcode}")
+        raise RuntimeError(f"Pipeline writer failed: {error}")
+    return report
+
+
+def format_report(report):
+    """
+    Format the per-stage throughput of a pipeline run.
+
+    :param report: Report returned by run_pipeline
+    :type report: dict
+    :return: One line per fetch worker, a total per stage and the elapsed time
+    :rtype: str
+    """
+    def rate(count, seconds):
+        return count / seconds if seconds else 0.0
+
+    lines = []
+    for stats in report["fetchers"]:
+        lines.append(f"fetch-{stats['index']}: requests: {stats['requests']}, activities: {stats['activities']}, "
+                     f"failures: {stats['failures']}, blocked: {stats['blocked']:.2f}s, "
+                     f"{rate(stats['requests'], stats['elapsed']):.1f} req/s")
+
+    fetchers = report["fetchers"]
+    requests = sum(stats["requests"] for stats in fetchers)
+    fetch_elapsed = max((stats["elapsed"] for stats in fetchers), default=0.0)
+    lines.append(f"fetch: requests: {requests}, activities: {sum(stats['activities'] for stats in fetchers)}, "
+                 f"failures: {sum(stats['failures'] for stats in fetchers)}, "
+                 f"blocked: {sum(stats['blocked'] for stats in fetchers):.2f}s, "
+                 f"{rate(requests, fetch_elapsed):.1f} req/s")
+
+    writer = report["writer"]
+    if writer is not None:
+        lines.append(f"write: received: {writer['received']}, saved: {writer['saved']}, "
+                     f"quarantined: {writer['quarantined']}, batches: {writer['batches']}, "
+                     f"busy: {writer['busy']:.2f}s, {rate(writer['received'], writer['busy']):.1f} rows/s")
+    status = ", interrupted" if report["interrupted"] else ""
+    lines.append(f"Elapsed: {report['elapsed']:.2f}s{status}")
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+import threading
+import weakref
+
+from sqlalchemy import func, select
+
+from models import Activity
+
+try:
+    import numpy
+except ImportError:
+    # Optional dependency, only needed by the recommend command
+    numpy = None
+
+# Relative weight of each criterion in the distance
+DEFAULT_WEIGHTS = {"price": 1.0, "accessibility": 1.0, "participants": 1.0, "type": 0.5}
+
+# Rows scored at once, bounding the size of the temporary arrays
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# Snapshot per database object, so a long-lived process such as the daemon keeps it warm
+_SNAPSHOTS = weakref.WeakKeyDictionary()
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def require_numpy():
+    """
+    Fail with an actionable message when the optional numpy dependency is missing.
+
+    :raises ImportError: If numpy is not installed
+    """
+    if numpy is None:
+        raise ImportError("The recommend command needs numpy: pip install numpy")
+
+
+class ActivitySnapshot:
+    def __init__(self, database):
+        """
+        Initialize an in-memory columnar copy of the scoring columns of the activities table.
+
+        Rows are kept sorted by id in arrays that grow by doubling. The snapshot registers as
+        a write listener of the database, so rows written through it are reloaded by id on the
+        next refresh; rows inserted by other processes are picked up as ids above the highest
+        one loaded, and deleted rows are dropped when the row count no longer matches.
+
+        :param database: Object for working with the database
+        :type database: Database
+        """
+        require_numpy()
+        self.database = database
+        self.lock = threading.Lock()
+        self.size = 0
+        self.ids = numpy.empty(0, dtype=numpy.int64)
+        # Single precision halves the memory traffic of scoring
+        self.price = numpy.empty(0, dtype=numpy.float32)
+        self.accessibility = numpy.empty(0, dtype=numpy.float32)
+        self.participants = numpy.empty(0, dtype=numpy.float32)
+        self.type_codes = numpy.empty(0, dtype=numpy.int32)
+        self.types = {}
+        self.pending = set()
+        self.loaded = False
+        database.add_write_listener(self._on_write)
+
+    def _on_write(self, ids):
+        with self.lock:
+            self.pending.update(ids)
+
+    def _reserve(self, count):
+        """
+        Grow the arrays so that ``count`` more rows fit.
+
+        :param count: Number of rows about to be appended
+        :type count: int
+        """
+        needed = self.size + count
+        if needed <= len(self.ids):
+            return
+        capacity = max(needed, 2 * len(self.ids), 1024)
+        for name in ("ids", "price", "accessibility", "participants", "type_codes"):
+            current = getattr(self, name)
+            grown = numpy.empty(capacity, dtype=current.dtype)
+            grown[:self.size] = current[:self.size]
+            setattr(self, name, grown)
+
+    def _type_code(self, activity_type):
+        return self.types.setdefault(activity_type, len(self.types))
+
+    def _apply(self, rows):
+        """
+        Insert or overwrite rows, keeping the arrays sorted by id.
+
+        :param rows: Rows of (id, type, participants, price, accessibility)
+        :type rows: list of tuple
+        """
+        if not rows:
+            return
+        rows.sort()
+        columns = list(zip(*rows))
+        ids = numpy.array(columns[0], dtype=numpy.int64)
+        values = {
+            "price": numpy.array(columns[3], dtype=float).astype(numpy.float32),
+            "accessibility": numpy.array(columns[4], dtype=float).astype(numpy.float32),
+            "participants": numpy.array(columns[2], dtype=float).astype(numpy.float32),
+            "type_codes": numpy.array([self._type_code(value) for value in columns[1]], dtype=numpy.int32),
+        }
+
+        # Rows already loaded are updated in place, the others are new
+        positions = numpy.searchsorted(self.ids[:self.size], ids)
+        known = positions < self.size
+        known[known] = self.ids[positions[known]] == ids[known]
+        for name, column in values.items():
+            getattr(self, name)[positions[known]] = column[known]
+
+        new = ~known
+        if not new.any():
+            return
+        self._reserve(int(new.sum()))
+        start, end = self.size, self.size + int(new.sum())
+        self.ids[start:end] = ids[new]
+        for name, column in values.items():
+            getattr(self, name)[start:end] = column[new]
+        self.size = end
+        if start and self.ids[start - 1] > self.ids[start]:
+            # Ids committed out of order by concurrent writers
+            order = numpy.argsort(self.ids[:end], kind="stable")
+            for name in ("ids", "price", "accessibility", "participants", "type_codes"):
+                array = getattr(self, name)
+                array[:end] = array[:end][order]
+
+    def _keep(self, mask):
+        """
+        Drop the rows not selected by a mask, keeping the arrays sorted by id.
+
+        :param mask: True for each of the ``size`` loaded rows to keep
+        :type mask: numpy.ndarray
+        """
+        kept = int(mask.sum())
+        if kept == self.size:
+            return
+        for name in ("ids", "price", "accessibility", "participants", "type_codes"):
+            array = getattr(self, name)
+            array[:kept] = array[:self.size][mask]
+        self.size = kept
+
+    def refresh(self):
+        """
+        Load rows written since the last refresh: ids reported by the write listener and ids
+        above the highest one loaded. Reported ids that are gone are dropped; if the snapshot
+        still holds more rows than the table, rows deleted by other processes are dropped too.
+
+        :return: Number of rows loaded
+        :rtype: int
+        """
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            last_id = int(self.ids[self.size - 1]) if self.size else 0
+            self.loaded = True
+
+        table = Activity.__table__.c
+        columns = [table.id, table.type, table.participants, table.price, table.accessibility]
+        rows = []
+        with self.database.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=10000).execute(
+                select(*columns).where(table.id > last_id).order_by(table.id))
+            rows.extend(tuple(row) for row in result)
+            pending = sorted(activity_id for activity_id in pending if activity_id <= last_id)
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                rows.extend(tuple(row) for row in connection.execute(select(*columns).where(table.id.in_(chunk))))
+            count = connection.execute(select(func.count()).select_from(Activity.__table__)).scalar()
+
+        found = {row[0] for row in rows}
+        deleted = numpy.array([activity_id for activity_id in pending if activity_id not in found], dtype=numpy.int64)
+        with self.lock:
+            self._apply(rows)
+            if len(deleted):
+                self._keep(~numpy.isin(self.ids[:self.size], deleted))
+            size = self.size
+
+        if size > count:
+            # Rows were deleted behind the snapshot's back, keep only the ids still stored
+            with self.database.engine.connect() as connection:
+                stored = numpy.fromiter(connection.execute(select(table.id)).scalars(), dtype=numpy.int64)
+            with self.lock:
+                self._keep(numpy.isin(self.ids[:self.size], stored))
+        return len(rows)
+
+    def recommend(self, participants=None, budget=None, accessibility=None, activity_type=None, k=10,
+                  weights=None, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Rank the activities by weighted distance to the requested criteria, closest first.
+
+        The distance is the square root of the weighted sum of squared differences of price
+        and accessibility, and of participants relative to the requested number, plus the type
+        weight when the type differs. Criteria left to None are ignored; activities missing a
+        requested value rank last.
+
+        :param participants: Preferred number of participants
+        :type participants: int or None
+        :param budget: Preferred price, from 0 to 1
+        :type budget: float or None
+        :param accessibility: Preferred accessibility, from 0 to 1
+        :type accessibility: float or None
+        :param activity_type: Preferred type
+        :type activity_type: str or None
+        :param k: Number of activities to return
+        :type k: int
+        :param weights: Weights overriding DEFAULT_WEIGHTS
+        :type weights: dict or None
+        :param block_size: Number of rows scored at once
+        :type block_size: int
+        :return: Ids and distances of the best activities, closest first
+        :rtype: list of tuple
+        :raises ValueError: If k is not positive
+        """
+        if k < 1:
+            raise ValueError(f"k must be a positive number of activities, got {k}")
+        if not self.loaded or self.pending:
+            self.refresh()
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+        with self.lock:
+            size = self.size
+            type_code = self.types.get(activity_type, -1)
+            best_ids = numpy.empty(0, dtype=numpy.int64)
+            best_scores = numpy.empty(0, dtype=numpy.float32)
+            criteria = [(self.price, budget, 1.0, weights["price"]),
+                        (self.accessibility, accessibility, 1.0, weights["accessibility"]),
+                        (self.participants, participants, max(participants or 1, 1), weights["participants"])]
+            criteria = [criterion for criterion in criteria if criterion[1] is not None]
+            for start in range(0, size, block_size):
+                end = min(size, start + block_size)
+                # Computed in place to avoid a temporary array per operation
+                scores = numpy.zeros(end - start, dtype=numpy.float32)
+                difference = numpy.empty(end - start, dtype=numpy.float32)
+                for column, target, scale, weight in criteria:
+                    numpy.subtract(column[start:end], numpy.float32(target), out=difference)
+                    difference *= numpy.float32(weight ** 0.5 / scale)
+                    numpy.square(difference, out=difference)
+                    scores += difference
+                numpy.sqrt(scores, out=scores)
+                if activity_type is not None:
+                    scores[self.type_codes[start:end] != type_code] += numpy.float32(weights["type"])
+                numpy.nan_to_num(scores, copy=False, nan=numpy.inf)
+
+                # Keep the k best of this block and the previous ones
+                ids = numpy.concatenate([best_ids, self.ids[start:end]])
+                scores = numpy.concatenate([best_scores, scores])
+                if len(scores) > k:
+                    top = numpy.argpartition(scores, k - 1)[:k]
+                    ids, scores = ids[top], scores[top]
+                best_ids, best_scores = ids, scores
+
+        order = numpy.lexsort((best_ids, best_scores))
+        return [(int(best_ids[index]), float(best_scores[index])) for index in order]
+
+
+def get_snapshot(database):
+    """
+    Get the snapshot of a database, creating it on first use.
+
+    :param database: Object for working with the database
+    :type database: Database
+    :return: Snapshot kept for the lifetime of the database object
+    :rtype: ActivitySnapshot
+    """
+    with _SNAPSHOTS_LOCK:
+        snapshot = _SNAPSHOTS.get(database)
+        if snapshot is None:
+            snapshot = _SNAPSHOTS[database] = ActivitySnapshot(database)
+    return snapshot
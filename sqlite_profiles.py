@@ -0,0 +1,61 @@
+from sqlalchemy import event
+
+# Pragma sets applied to every new SQLite connection. WAL lets readers run while a writer is active;
+# the profiles differ in how much durability they trade for write latency.
+PROFILES = {
+    # Every commit is fsynced; survives power loss
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+    },
+    # WAL is fsynced only at checkpoints; a power loss may drop the last commits but never corrupts
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+
+DEFAULT_PROFILE = "durable"
+
+
+def resolve_pragmas(profile=None, pragmas=None):
+    """
+    Merge a named profile with explicit pragma overrides.
+
+    :param profile: Name of a profile in PROFILES, DEFAULT_PROFILE if None
+    :type profile: str or None
+    :param pragmas: Pragmas overriding the profile's values
+    :type pragmas: dict or None
+    :return: Pragma names mapped to values
+    :rtype: dict
+    :raises ValueError: If the profile name is unknown
+    """
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}', expected one of {sorted(PROFILES)}")
+    return {**PROFILES[profile], **(pragmas or {})}
+
+
+def apply_pragmas(engine, pragmas):
+    """
+    Register a connect hook that sets the pragmas on every new connection of an engine.
+
+    :param engine: Engine bound to an SQLite database
+    :type engine: sqlalchemy.engine.Engine
+    :param pragmas: Pragma names mapped to values
+    :type pragmas: dict
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+
+from activity_io import ACTIVITY_FIELDS, FIELDS, ActivityRecord
+from metrics import REGISTRY
+
+
+def _where_clause(filters, before_id=None):
+    """
+    Translate command-line style filters into an SQL WHERE clause and its parameters.
+
+    :param filters: Dictionary of filters, as accepted by the API
+    :type filters: dict or None
+    :param before_id: Only match activities with an id lower than this one
+    :type before_id: int or None
+    :return: WHERE clause (empty if there are no conditions) and its parameters
+    :rtype: tuple
+    """
+    conditions = []
+    params = []
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name.endswith("_min") and name[:-4] in ACTIVITY_FIELDS:
+            conditions.append(f"{name[:-4]} >= ?")
+        elif name.endswith("_max") and name[:-4] in ACTIVITY_FIELDS:
+            conditions.append(f"{name[:-4]} <= ?")
+        elif name in ACTIVITY_FIELDS:
+            conditions.append(f"{name} = ?")
+        else:
+            continue
+        params.append(value)
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+class SqliteReader:
+    def __init__(self, db_name, busy_timeout=5000):
+        """
+        Initialize a read-only view of the activities table using only the standard library.
+
+        This avoids importing SQLAlchemy on the ``list`` path, which dominates the start-up
+        time of short-lived CLI invocations.
+
+        :param db_name: SQLite database file name
+        :type db_name: str
+        :param busy_timeout: Milliseconds to wait for a lock held by a writer
+        :type busy_timeout: int
+        """
+        self.db_name = db_name
+        self.busy_timeout = busy_timeout
+
+    def has_schema(self):
+        """
+        Check whether the database file exists and holds the activities table.
+
+        :return: True if the activities table can be read
+        :rtype: bool
+        """
+        if not os.path.exists(self.db_name):
+            return False
+        connection = sqlite3.connect(self.db_name)
+        try:
+            row = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'activities'").fetchone()
+        finally:
+            connection.close()
+        return row is not None
+
+    def iter_latest_activities(self, limit=5, offset=0, before_id=None, filters=None, chunk_size=1000):
+        """
+        Stream the latest activities from the database, newest first.
+
+        Takes the same arguments as Database.iter_latest_activities, and is timed under the
+        same name.
+
+        :param limit: Maximum number of activities to retrieve, no limit if None or 0
+        :type limit: int or None
+        :param offset: Number of matching activities to skip
+        :type offset: int
+        :param before_id: Only return activities with an id lower than this one
+        :type before_id: int or None
+        :param filters: Dictionary of filters, as accepted by the API
+        :type filters: dict or None
+        :param chunk_size: Number of rows fetched from the cursor at a time
+        :type chunk_size: int
+        :return: Generator of activity records
+        :rtype: generator of ActivityRecord
+        """
+        where, params = _where_clause(filters, before_id)
+        query = f"SELECT {', '.join(FIELDS)} FROM activities{where} ORDER BY id DESC LIMIT ? OFFSET ?"
+        params += [limit or -1, offset or 0]
+        return REGISTRY.time_iterator("db.iter_latest_activities", self._stream(query, params, chunk_size))
+
+    def _stream(self, query, params, chunk_size):
+        """
+        Stream the rows of a query as activity records.
+
+        :param query: SQL query selecting the activity columns
+        :type query: str
+        :param params: Parameters of the query
+        :type params: list
+        :param chunk_size: Number of rows fetched from the cursor at a time
+        :type chunk_size: int
+        :return: Generator of activity records
+        :rtype: generator of ActivityRecord
+        """
+        connection = sqlite3.connect(self.db_name)
+        try:
+            connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+            cursor = connection.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield ActivityRecord._make(row)
+        finally:
+            connection.close()
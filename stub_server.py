@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ACTIVITY = {
+    "activity": "Learn Express.js",
+    "type": "education",
+    "participants": 1,
+    "price": 0.1,
+    "link": "https://expressjs.com/",
+    "key": "3943509",
+    "accessibility": 0.1
+}
+
+
+class StubActivityHandler(BaseHTTPRequestHandler):
+    """
+    Minimal keep-alive HTTP handler standing in for the upstream activity API.
+
+    ``failures_left`` makes the next requests answer 503, ``throttled_left`` makes them answer
+    429 with a ``retry_after`` header, ``malformed_left`` makes them answer 200 with an HTML
+    body, ``delay`` slows every response down, and ``connections`` and ``requests`` record the
+    client addresses and number of requests seen.
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY delayed ACKs add ~40 ms per call
+    disable_nagle_algorithm = True
+    failures_left = 0
+    throttled_left = 0
+    retry_after = "0"
+    malformed_left = 0
+    delay = 0.0
+    connections = set()
+    requests = 0
+
+    @classmethod
+    def reset(cls):
+        """
+        Restore the default behaviour and clear the recorded requests.
+        """
+        cls.failures_left = 0
+        cls.throttled_left = 0
+        cls.retry_after = "0"
+        cls.malformed_left = 0
+        cls.delay = 0.0
+        cls.connections = set()
+        cls.requests = 0
+
+    def do_GET(self):
+        StubActivityHandler.connections.add(self.client_address)
+        StubActivityHandler.requests += 1
+        if StubActivityHandler.delay:
+            time.sleep(StubActivityHandler.delay)
+        if StubActivityHandler.throttled_left > 0:
+            StubActivityHandler.throttled_left -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', StubActivityHandler.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if StubActivityHandler.failures_left > 0:
+            StubActivityHandler.failures_left -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if StubActivityHandler.malformed_left > 0:
+            StubActivityHandler.malformed_left -= 1
+            body = b"<html><body>Service temporarily unavailable</body></html>"
+            content_type = 'text/html'
+        else:
+            body = json.dumps(STUB_ACTIVITY).encode()
+            content_type = 'application/json'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, handler_class=StubActivityHandler):
+        """
+        Initialize a local stub server bound to a free port on the loopback interface.
+
+        :param handler_class: Request handler class serving the stub responses
+        :type handler_class: type
+        """
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """
+        URL of the stub activity endpoint.
+
+        :return: Endpoint URL
+        :rtype: str
+        """
+        return f'http://127.0.0.1:{self.server.server_port}/api/activity'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from activity_cache import ActivityCache, MemoryCacheTier, SqliteCacheTier, normalize_filters
+from api_wrapper import ApiWrapper
+
+
+class CountingHttpRequestHandler:
+    def __init__(self):
+        """
+        Initialize the CountingHttpRequestHandler.
+
+        This class returns a distinct activity for every call and counts how many calls were made.
+        """
+        self.calls = 0
+
+    def get(self, url, params=None):
+        """
+        Simulate a GET request returning a new activity each time.
+
+        :param url: The URL to which the GET request is made.
+        :type url: str
+        :param params: Optional parameters for the GET request, defaults to None.
+        :type params: dict, optional
+        :return: A mock activity.
+        :rtype: dict
+        """
+        self.calls += 1
+        return {
+            "activity": f"Activity {self.calls}",
+            "type": (params or {}).get("type", "education"),
+            "participants": 1,
+            "price": 0.1,
+            "link": "",
+            "key": str(self.calls),
+            "accessibility": 0.1
+        }
+
+
+def test_normalize_filters_is_order_insensitive():
+    """
+    Test that equivalent filter dictionaries produce the same cache key.
+    """
+    assert normalize_filters({"type": "fun", "participants": 2}) == normalize_filters(
+        {"participants": "2", "type": "fun", "price_min": None})
+
+
+def test_cache_serves_hits_once_pool_is_full():
+    """
+    Test that the cache stops hitting the network once enough activities are pooled.
+    """
+    http_handler = CountingHttpRequestHandler()
+    cache = ActivityCache(min_pool_size=3)
+    api = ApiWrapper(http_handler, cache=cache)
+
+    for _ in range(10):
+        assert api.get_random_activity(filters={"type": "fun"})["type"] == "fun"
+
+    assert http_handler.calls == 3
+    assert cache.stats()["hits"] == 7
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_counts_lookups_exactly_across_threads():
+    """
+    Test that hits and misses recorded by concurrent lookups are all counted.
+    """
+    cache = ActivityCache(min_pool_size=3)
+    for number in range(3):
+        cache.store({"type": "fun"}, {"activity": f"Activity {number}", "key": str(number)})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda number: cache.lookup({"type": "fun" if number % 2 else "music"}), range(20000)))
+
+    assert cache.stats() == {"hits": 10000, "misses": 10000, "hit_ratio": 0.5}
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """
+    Test size-based and TTL-based eviction of the in-memory tier.
+    """
+    tier = MemoryCacheTier(max_entries=2)
+    tier.add("a", {"key": "1"})
+    tier.add("b", {"key": "2"})
+    tier.get("a")
+    tier.add("c", {"key": "3"})
+
+    assert tier.get("b") == []
+    assert tier.get("a") == [{"key": "1"}]
+
+    expired = MemoryCacheTier(ttl=-1)
+    expired.add("a", {"key": "1"})
+    assert expired.get("a") == []
+
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    """
+    Test that the on-disk tier warms a fresh cache and evicts surplus rows.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    db_name = str(tmp_path / 'cache.db')
+    cache = ActivityCache(disk_tier=SqliteCacheTier(db_name, max_entries=2), min_pool_size=2)
+    for key in ("1", "2", "3"):
+        cache.store({"type": "fun"}, {"key": key, "type": "fun"})
+
+    warm_cache = ActivityCache(disk_tier=SqliteCacheTier(db_name), min_pool_size=2)
+    activity = warm_cache.lookup({"type": "fun"})
+
+    assert activity["key"] in ("2", "3")
+    assert warm_cache.stats()["hits"] == 1
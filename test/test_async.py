@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from async_api_wrapper import AsyncApiWrapper, AsyncHttpRequestHandler
+from async_database import AsyncDatabase
+from stub_server import StubActivityHandler, StubServer
+
+
+class MockAsyncHttpRequestHandler:
+    def __init__(self):
+        """
+        Initialize the MockAsyncHttpRequestHandler.
+
+        This class simulates non-blocking HTTP requests by returning a canned activity
+        whose key is derived from the number of calls made so far.
+        """
+        self.calls = 0
+
+    async def get(self, url, params=None):
+        """
+        Simulate a non-blocking GET request to a specified URL with optional parameters.
+
+        :param url: The URL to which the GET request is made.
+        :type url: str
+        :param params: Optional parameters for the GET request, defaults to None.
+        :type params: dict, optional
+        :return: A mock activity.
+        :rtype: dict
+        """
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0)
+        return {
+            "activity": f"Async Activity {call}",
+            "type": (params or {}).get("type", "education"),
+            "participants": 1,
+            "price": 0.1,
+            "link": "",
+            "key": str(call),
+            "accessibility": 0.1
+        }
+
+
+@pytest.fixture
+def async_database(tmp_path):
+    """
+    Fixture to create an AsyncDatabase object backed by a temporary file.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: An AsyncDatabase object for testing.
+    :rtype: AsyncDatabase
+    """
+    return AsyncDatabase(str(tmp_path / 'activities.db'))
+
+
+def test_async_get_random_activity_with_type_filter():
+    """
+    Test the AsyncApiWrapper.get_random_activity method with a "type" filter.
+    """
+    api = AsyncApiWrapper(MockAsyncHttpRequestHandler())
+
+    response = asyncio.run(api.get_random_activity(filters={"type": "fun"}))
+
+    assert response["type"] == "fun"
+
+
+def test_async_get_returns_none_on_non_json_body():
+    """
+    Test that a 200 response whose body is not JSON yields None instead of raising.
+    """
+    async def fetch_twice(url):
+        handler = AsyncHttpRequestHandler(retries=0)
+        try:
+            return await handler.get(url), await handler.get(url)
+        finally:
+            await handler.close()
+
+    StubActivityHandler.reset()
+    StubActivityHandler.malformed_left = 1
+    with StubServer() as server:
+        malformed, valid = asyncio.run(fetch_twice(server.url))
+
+    assert malformed is None
+    assert valid["key"] == "3943509"
+
+
+def test_async_concurrent_fetch_and_save(async_database):
+    """
+    Test that many fetch-and-save operations can run concurrently on one event loop.
+
+    :param async_database: An AsyncDatabase object for testing.
+    :type async_database: AsyncDatabase
+    """
+    api = AsyncApiWrapper(MockAsyncHttpRequestHandler())
+
+    async def fetch_and_save():
+        activity = await api.get_random_activity()
+        await async_database.save_activity(activity)
+
+    async def run():
+        await asyncio.gather(*(fetch_and_save() for _ in range(50)))
+        latest = await async_database.get_latest_activities(limit=5)
+        await async_database.close()
+        return latest
+
+    latest_activities = asyncio.run(run())
+
+    assert len(latest_activities) == 5
+    assert latest_activities[0].id > latest_activities[1].id
+
+
+def test_async_save_activities_in_batches(async_database):
+    """
+    Test the AsyncDatabase.save_activities method.
+
+    :param async_database: An AsyncDatabase object for testing.
+    :type async_database: AsyncDatabase
+    """
+    activities = [
+        {"activity": f"Batch {i}", "type": "test", "participants": 1, "price": 0.1, "accessibility": 0.1}
+        for i in range(7)
+    ]
+
+    async def run():
+        saved = await async_database.save_activities(activities, batch_size=3)
+        latest = await async_database.get_latest_activities(limit=1)
+        await async_database.close()
+        return saved, latest
+
+    saved, latest_activities = asyncio.run(run())
+
+    assert saved == 7
+    assert latest_activities[0].activity == "Batch 6"
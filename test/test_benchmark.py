@@ -0,0 +1,21 @@
+from benchmark import parse_args, run
+
+
+def test_benchmark_suite_runs_with_small_sizes():
+    """
+    Test that the benchmark suite runs end to end and reports every stage.
+
+    This keeps the suite from rotting without spending test time on real measurements.
+    """
+    args = parse_args(["--calls", "5", "--rows", "20", "--batch_sizes", "1", "10",
+                       "--table_sizes", "10", "30", "--queries", "3",
+                       "--read_rows", "20", "--read_repeats", "1", "--validate_records", "30",
+                       "--validate_repeats", "1"])
+
+    results = run(args)
+
+    assert results["get_random_activity"]["count"] == 5
+    assert [entry["batch_size"] for entry in results["save_activity"]] == [1, 10]
+    assert [entry["rows"] for entry in results["get_latest_activities"]] == [10, 30]
+    assert set(results["read_paths"]) == {"orm", "records"}
+    assert results["validation"]["rejected"] == 3
@@ -0,0 +1,105 @@
+import argparse
+
+import pytest
+from command import ExportCommand, ImportCommand
+from database import Database
+
+pyarrow = pytest.importorskip("pyarrow")
+
+from columnar import ArrowActivityReader, write_columnar  # noqa: E402
+
+
+@pytest.fixture
+def populated_database(tmp_path):
+    """
+    Fixture to create a Database object holding activities of two types.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: A Database object for testing.
+    :rtype: Database
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities(
+        {"activity": f"Activity {i}", "type": "education" if i % 2 else "music", "participants": i % 3 + 1,
+         "price": i / 100, "link": "", "key": str(i), "accessibility": (i % 10) / 10}
+        for i in range(100))
+    return database
+
+
+def export_args(path, **overrides):
+    """
+    Build the arguments of the export command with its command-line defaults.
+
+    :return: Command-line arguments
+    :rtype: argparse.Namespace
+    """
+    values = {"path": path, "format": None, "type": None, "participants": None, "price_min": None,
+              "price_max": None, "accessibility_min": None, "accessibility_max": None}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_arrow_export_is_read_through_a_memory_map(populated_database, tmp_path, capsys):
+    """
+    Test that an Arrow export keeps every row and column and filters vectorized.
+
+    :param populated_database: A Database object holding activities of two types.
+    :type populated_database: Database
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    path = str(tmp_path / "activities.arrow")
+
+    ExportCommand(populated_database, export_args(path)).execute()
+
+    assert capsys.readouterr().out.startswith("Exported: 100")
+    reader = ArrowActivityReader(path)
+    assert len(reader) == 100
+    assert reader.table.column_names == ["id", "activity", "type", "participants", "price", "link", "key",
+                                         "accessibility"]
+    matches = reader.filter({"type": "education", "price_max": 0.5, "accessibility_min": 0.5})
+    expected = [str(i) for i in range(100) if i % 2 and i / 100 <= 0.5 and (i % 10) / 10 >= 0.5]
+    assert matches.column("key").to_pylist() == expected
+    with pytest.raises(ValueError):
+        reader.filter({"colour": "red"})
+    reader.close()
+
+
+def test_parquet_export_import_round_trip(populated_database, tmp_path):
+    """
+    Test that a filtered Parquet export imports back into an empty database.
+
+    :param populated_database: A Database object holding activities of two types.
+    :type populated_database: Database
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    path = str(tmp_path / "activities.parquet")
+    ExportCommand(populated_database, export_args(path, type="music")).execute()
+    assert pyarrow.parquet.ParquetFile(path).metadata.num_rows == 50
+
+    target = Database(str(tmp_path / 'imported.db'))
+    ImportCommand(target, argparse.Namespace(path=path, format=None, batch_size=7, on_conflict="update")).execute()
+
+    original = [record[1:] for record in populated_database.get_latest_records(limit=0, filters={"type": "music"})]
+    assert [record[1:] for record in target.get_latest_records(limit=0)] == original
+
+
+def test_write_columnar_chunks_and_empty_input(tmp_path):
+    """
+    Test that rows are written in record batches of chunk_size and that no rows give a valid file.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    rows = [(i, f"Activity {i}", "test", 1, 0.1, None, str(i), 0.2) for i in range(10)]
+
+    assert write_columnar(str(tmp_path / "chunks.arrow"), rows, "arrow", chunk_size=4) == 10
+    assert write_columnar(str(tmp_path / "empty.arrow"), [], "arrow") == 0
+
+    reader = pyarrow.ipc.open_file(str(tmp_path / "chunks.arrow"))
+    assert [reader.get_batch(index).num_rows for index in range(reader.num_record_batches)] == [4, 4, 2]
+    assert len(ArrowActivityReader(str(tmp_path / "empty.arrow"))) == 0
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import io
+import json
+
+import pytest
+from command import ExportCommand, ImportCommand, ListCommand, SearchCommand, StatsCommand
+from database import Database
+
+
+@pytest.fixture
+def populated_database(tmp_path):
+    """
+    Fixture to create a Database object holding a few activities.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: A Database object for testing.
+    :rtype: Database
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities(
+        {"activity": f"Activity {i}", "type": "test", "participants": i, "price": 0.1,
+         "link": "", "key": str(i), "accessibility": 0.2}
+        for i in range(1, 4))
+    return database
+
+
+def list_args(**overrides):
+    """
+    Build the arguments of the list command with its command-line defaults.
+
+    :return: Command-line arguments
+    :rtype: argparse.Namespace
+    """
+    values = {"limit": 5, "offset": 0, "before_id": None, "format": "text", "type": None, "participants": None,
+              "price_min": None, "price_max": None, "accessibility_min": None, "accessibility_max": None}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_list_text_output_matches_activity_str(populated_database, capsys):
+    """
+    Test that the default text output keeps the Activity.__str__ format.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    ListCommand(populated_database, list_args(limit=1)).execute()
+
+    expected = str(populated_database.get_latest_activities(limit=1)[0])
+    assert capsys.readouterr().out == expected + "\n"
+
+
+def test_list_jsonl_output(populated_database, capsys):
+    """
+    Test the JSON Lines output with a participants filter.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    ListCommand(populated_database, list_args(format="jsonl", participants=2)).execute()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["key"] for line in lines] == ["2"]
+
+
+def test_list_csv_output(populated_database, capsys):
+    """
+    Test the CSV output with a header row.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    ListCommand(populated_database, list_args(format="csv", limit=0)).execute()
+
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [row["activity"] for row in rows] == ["Activity 3", "Activity 2", "Activity 1"]
+
+
+@pytest.mark.parametrize("file_name", ["activities.jsonl", "activities.csv"])
+def test_export_import_round_trip(populated_database, tmp_path, file_name):
+    """
+    Test that exported activities can be imported into another database.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param file_name: Name of the exchange file, whose extension selects the format.
+    :type file_name: str
+    """
+    path = str(tmp_path / file_name)
+    ExportCommand(populated_database, argparse.Namespace(**dict(vars(list_args()), path=path, format=None))).execute()
+
+    target = Database(str(tmp_path / 'target.db'))
+    import_args = argparse.Namespace(path=path, format=None, batch_size=2, on_conflict="ignore")
+    ImportCommand(target, import_args).execute()
+    ImportCommand(target, import_args).execute()
+
+    rows = list(target.iter_activities())
+    assert [row.key for row in rows] == ["1", "2", "3"]
+    assert rows[1].participants == 2
+    assert rows[1].price == 0.1
+
+
+@pytest.mark.parametrize("file_name, content", [
+    ("activities.csv", "activity,participants,price,key\nRead,2.0,0.1,1\nSing,two,0.1,2\nCook,3,,3\n"),
+    ("activities.jsonl", '{"activity": "Read", "participants": 2, "key": "1"}\n{"activity": "Sing", "key": \n'
+                         '{"activity": "Cook", "participants": "3", "key": "3"}\n'),
+])
+def test_import_quarantines_bad_records_and_keeps_going(tmp_path, capsys, file_name, content):
+    """
+    Test that a bad cell or an unparsable line is quarantined without aborting the import.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param file_name: Name of the file, whose extension selects the format.
+    :type file_name: str
+    :param content: Two good records around a bad one
+    :type content: str
+    """
+    path = tmp_path / file_name
+    path.write_text(content)
+    database = Database(str(tmp_path / 'activities.db'))
+
+    ImportCommand(database, argparse.Namespace(path=str(path), format=None, batch_size=2,
+                                               on_conflict="ignore")).execute()
+
+    assert [(row.key, row.participants) for row in database.iter_activities()] == [("1", 2), ("3", 3)]
+    assert database.count_quarantined() == 1
+    assert capsys.readouterr().out.startswith("Imported: 2, quarantined: 1")
+
+
+def test_stats_prints_averages_per_type(populated_database, capsys):
+    """
+    Test that the stats command prints one line per type and the total.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    StatsCommand(populated_database, argparse.Namespace(window=3600, type=None)).execute()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["type", "count", "participants", "price", "accessibility"]
+    assert lines[1].split() == ["test", "3", "2.00", "0.10", "0.20"]
+    assert lines[2] == "Total: 3"
+
+
+def test_search_prints_matches(populated_database, capsys):
+    """
+    Test that the search command prints the matching activities and a notice when nothing matches.
+
+    :param populated_database: A Database object holding a few activities.
+    :type populated_database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    SearchCommand(populated_database, list_args(query="activity 2", limit=10)).execute()
+    SearchCommand(populated_database, list_args(query="missing", limit=10)).execute()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert "activity='Activity 2'" in lines[0]
+    assert lines[1] == "No activity matches the query"
@@ -0,0 +1,134 @@
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from api_wrapper import ApiWrapper, HttpRequestHandler
+from daemon import DaemonClient, create_server, forward, parse_address
+from database import Database
+from stub_server import StubServer
+
+
+@pytest.fixture
+def daemon_address(tmp_path, monkeypatch):
+    """
+    Fixture to run a daemon on a temporary Unix socket backed by a stub API server.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param monkeypatch: Pytest monkeypatch fixture, used to restore the standard streams.
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    :return: Socket path of the running daemon.
+    :rtype: str
+    """
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    monkeypatch.setattr(sys, "stderr", sys.stderr)
+    address = str(tmp_path / 'activities.sock')
+
+    with StubServer() as stub:
+        api = ApiWrapper(HttpRequestHandler(), url=stub.url)
+        database = Database(str(tmp_path / 'activities.db'))
+        server = create_server(api, database, address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield address
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_address():
+    """
+    Test that daemon addresses resolve to TCP or Unix socket addresses.
+    """
+    assert parse_address(8765)[1] == ("127.0.0.1", 8765)
+    assert parse_address("localhost:8765")[1] == ("localhost", 8765)
+    assert parse_address("/tmp/activities.sock")[1] == "/tmp/activities.sock"
+
+
+def test_daemon_serves_new_and_list(daemon_address):
+    """
+    Test that new and list requests run in the daemon over one connection.
+
+    :param daemon_address: Socket path of the running daemon.
+    :type daemon_address: str
+    """
+    client = DaemonClient(daemon_address)
+    saved = client.run(["new", "--type", "education"])
+    listed = client.run(["list", "--format", "jsonl"])
+    rejected = client.run(["import", "activities.jsonl"])
+    invalid = client.run(["list", "--limit", "many"])
+    client.close()
+
+    assert saved["status"] == 0
+    assert '"key": "3943509"' in listed["stdout"]
+    assert rejected["status"] == 2
+    assert invalid["status"] == 2
+    assert "invalid int value" in invalid["stderr"]
+
+
+def test_daemon_captures_output_per_request(daemon_address):
+    """
+    Test that concurrent requests each receive only their own output.
+
+    :param daemon_address: Socket path of the running daemon.
+    :type daemon_address: str
+    """
+    DaemonClient(daemon_address).run(["new"])
+
+    def list_once(limit):
+        client = DaemonClient(daemon_address)
+        try:
+            return client.run(["list", "--limit", str(limit)])["stdout"]
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        outputs = list(executor.map(list_once, [1] * 20))
+
+    assert all(output.count("Activity(") == 1 for output in outputs)
+
+
+def test_forward_falls_back_when_daemon_is_down(tmp_path):
+    """
+    Test that forwarding returns None so the CLI runs locally when no daemon is listening.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    assert forward(str(tmp_path / 'missing.sock'), ["list"]) is None
+    assert forward(str(tmp_path / 'missing.sock'), ["export", "-"]) is None
+
+
+@pytest.mark.parametrize("stall", [False, True])
+def test_forward_reports_a_lost_connection(tmp_path, capsys, stall):
+    """
+    Test that a daemon dropping the connection or timing out gives an error message, not a traceback.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param stall: Keep the connection open without answering until the client times out
+    :type stall: bool
+    """
+    address = str(tmp_path / 'broken.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(address)
+    listener.listen(1)
+
+    def accept():
+        connection, _ = listener.accept()
+        connection.recv(1024)
+        if stall:
+            threading.Event().wait(1)
+        connection.close()
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    status = forward(address, ["new", "--count", "1000"], timeout=0.2 if stall else None)
+    thread.join()
+    listener.close()
+
+    assert status == 1
+    assert "Lost the connection to the activities daemon" in capsys.readouterr().err
@@ -1,5 +1,10 @@
+import sqlite3
+
 import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from database import Database
+from migrations import MIGRATIONS
 
 
 @pytest.fixture
@@ -82,3 +87,303 @@ def test_get_latest_activities(database):
     # Check the order of activities (latest should come first)
     assert latest_activities[0].id > latest_activities[1].id
     assert latest_activities[1].id > latest_activities[2].id
+
+
+def test_save_activities_in_batches(database):
+    """
+    Test the save_activities method of the Database class.
+
+    This test verifies that activities are saved across several batched transactions.
+
+    :param database: A Database object for testing.
+    :type database: Database
+    """
+    activities = (
+        {
+            "activity": f"Bulk Activity {i}",
+            "type": "bulk",
+            "participants": 1,
+            "price": 0.1,
+            "accessibility": 0.1
+        }
+        for i in range(1, 8)
+    )
+
+    saved = database.save_activities(activities, batch_size=3)
+
+    latest_activities = database.get_latest_activities(limit=2)
+
+    assert saved == 7
+    assert latest_activities[0].activity == "Bulk Activity 7"
+    assert latest_activities[1].activity == "Bulk Activity 6"
+
+
+def test_catalogue_deduplicates_and_filters(tmp_path):
+    """
+    Test the local catalogue mirror used by the offline mode.
+
+    This test verifies that catalogue rows are deduplicated on key and that filters
+    are answered from the local table.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    activities = [
+        {"activity": "Read a book", "type": "education", "participants": 1, "price": 0.0,
+         "link": "", "key": "1", "accessibility": 0.1},
+        {"activity": "Play chess", "type": "recreational", "participants": 2, "price": 0.2,
+         "link": "", "key": "2", "accessibility": 0.3},
+    ]
+
+    assert database.save_catalogue_activities(activities) == 2
+    assert database.save_catalogue_activities(activities[:1]) == 0
+    assert database.count_catalogue_activities() == 2
+
+    activity = database.get_catalogue_activity({"participants": 2, "price_max": 0.5})
+    assert activity["key"] == "2"
+    assert database.get_catalogue_activity({"type": "education", "accessibility_min": 0.5}) is None
+
+
+def test_save_activity_upserts_on_key(tmp_path):
+    """
+    Test that saving an activity with a known key updates the stored row instead of duplicating it.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    activity_data = {"activity": "Old name", "type": "test", "participants": 1, "price": 0.1,
+                     "key": "42", "accessibility": 0.1}
+
+    database.save_activity(activity_data)
+    database.save_activity(dict(activity_data, activity="New name"))
+
+    latest_activities = database.get_latest_activities(limit=5)
+    assert len(latest_activities) == 1
+    assert latest_activities[0].activity == "New name"
+
+
+def test_existing_database_is_migrated(tmp_path):
+    """
+    Test that a database created before the indexes existed is deduplicated and indexed.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    db_name = str(tmp_path / 'activities.db')
+    connection = sqlite3.connect(db_name)
+    connection.execute(
+        "CREATE TABLE activities (id INTEGER NOT NULL PRIMARY KEY, activity VARCHAR, type VARCHAR, "
+        "participants INTEGER, price FLOAT, link VARCHAR, key VARCHAR, accessibility FLOAT)")
+    connection.executemany(
+        "INSERT INTO activities (activity, type, participants, price, key, accessibility) "
+        "VALUES (?, ?, 1, 0.1, ?, 0.1)",
+        [("First", "test", "1"), ("Duplicate", "test", "1"), ("Second", "test", "2")])
+    connection.commit()
+    connection.close()
+
+    database = Database(db_name)
+
+    connection = sqlite3.connect(db_name)
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list('activities')")}
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    connection.close()
+
+    assert [activity.activity for activity in database.get_latest_activities()] == ["Second", "Duplicate"]
+    assert {"ux_activities_key", "ix_activities_type_participants"} <= indexes
+    assert version == len(MIGRATIONS)
+    assert [activity.activity for activity in database.search("second")] == ["Second"]
+    assert database.get_activity_stats() == [
+        {"type": "test", "count": 2, "participants": 1.0, "price": 0.1, "accessibility": 0.1}]
+
+
+def test_engine_profile_sets_pragmas(tmp_path):
+    """
+    Test that the throughput profile and explicit overrides are applied on connect.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'), profile="throughput", pragmas={"busy_timeout": 1234})
+
+    with database.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+
+    with pytest.raises(ValueError):
+        Database(str(tmp_path / 'other.db'), profile="unknown")
+
+
+def test_reader_is_not_blocked_by_open_writer(tmp_path):
+    """
+    Test that in WAL mode a reader sees committed rows while a write transaction is open.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activity({"activity": "Committed", "type": "test", "participants": 1, "price": 0.1,
+                            "key": "1", "accessibility": 0.1})
+
+    with database.engine.connect() as writer:
+        writer.execute(text("BEGIN IMMEDIATE"))
+        writer.execute(text("INSERT INTO activities (activity, key) VALUES ('Pending', '2')"))
+
+        assert [activity.activity for activity in database.get_latest_activities()] == ["Committed"]
+        writer.rollback()
+
+
+def test_iter_latest_activities_with_filters_and_cursor(tmp_path):
+    """
+    Test streaming the latest activities with filters, offset and a keyset cursor.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities(
+        {"activity": f"Activity {i}", "type": "even" if i % 2 == 0 else "odd", "participants": 1,
+         "price": i * 0.1, "key": str(i), "accessibility": 0.1}
+        for i in range(1, 11))
+
+    even = [row.activity for row in database.iter_latest_activities(limit=0, filters={"type": "even"})]
+    page = [row.id for row in database.iter_latest_activities(limit=3, offset=1)]
+    older = [row.id for row in database.iter_latest_activities(limit=2, before_id=page[-1])]
+    cheap = [row.key for row in database.iter_latest_activities(limit=0, filters={"price_max": 0.35})]
+
+    assert even == ["Activity 10", "Activity 8", "Activity 6", "Activity 4", "Activity 2"]
+    assert page == [9, 8, 7]
+    assert older == [6, 5]
+    assert cheap == ["3", "2", "1"]
+
+
+def test_bulk_save_activities_conflict_modes(tmp_path):
+    """
+    Test the bulk_save_activities conflict handling on duplicate keys.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    activities = [{"activity": f"Activity {i}", "type": "test", "key": str(i)} for i in range(5)]
+
+    assert database.bulk_save_activities(activities, batch_size=2) == 5
+    assert database.bulk_save_activities(activities[:3], on_conflict="ignore") == 0
+    assert database.bulk_save_activities([dict(activities[0], activity="Renamed")], on_conflict="update") == 1
+    with pytest.raises(IntegrityError):
+        database.bulk_save_activities(activities[:1], on_conflict="error")
+
+    assert [row.activity for row in database.iter_activities()][:2] == ["Renamed", "Activity 1"]
+
+
+def test_get_latest_records_matches_orm_path(tmp_path):
+    """
+    Test that the ORM-free records carry the same data and string form as Activity objects.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities(
+        {"activity": f"Activity {i}", "type": "odd" if i % 2 else "even", "participants": i, "price": 0.1,
+         "link": "", "key": str(i), "accessibility": 0.2}
+        for i in range(1, 6))
+
+    records = database.get_latest_records(limit=3)
+    activities = database.get_latest_activities(limit=3)
+
+    assert [str(record) for record in records] == [str(activity) for activity in activities]
+    assert [record.key for record in database.get_latest_records(limit=0, filters={"type": "even"})] == ["4", "2"]
+    assert not hasattr(records[0], "__dict__")
+
+
+def test_activity_stats_follow_every_write_path(tmp_path):
+    """
+    Test that the rollups count upserts once and follow single, bulk and deleted rows.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activity({"activity": "Run", "type": "sport", "participants": 1, "price": 0.2,
+                            "key": "1", "accessibility": 0.1})
+    database.save_activity({"activity": "Run again", "type": "sport", "participants": 3, "price": 0.4,
+                            "key": "1", "accessibility": 0.3})
+    database.save_activities([{"activity": "Swim", "type": "sport", "participants": 1, "price": None,
+                               "key": "2", "accessibility": 0.5},
+                              {"activity": "Read", "type": "education", "participants": 1, "price": 0.0,
+                               "key": "3", "accessibility": 0.2}])
+
+    stats = {row["type"]: row for row in database.get_activity_stats()}
+    assert stats["sport"]["count"] == 2
+    assert stats["sport"]["participants"] == pytest.approx(2.0)
+    assert stats["sport"]["price"] == pytest.approx(0.4)
+    assert stats["sport"]["accessibility"] == pytest.approx(0.4)
+    assert database.get_activity_stats(activity_type="education")[0]["count"] == 1
+
+    with database.engine.begin() as connection:
+        connection.execute(text("DELETE FROM activities WHERE key = '3'"))
+    assert [row["type"] for row in database.get_activity_stats()] == ["sport"]
+
+
+def test_activity_stats_window(tmp_path):
+    """
+    Test that the time window only counts activities saved within it.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities([{"activity": f"Activity {i}", "type": "test", "participants": 1, "key": str(i)}
+                              for i in range(3)])
+    with database.engine.begin() as connection:
+        connection.execute(text("UPDATE activities SET created_at = created_at - 2 * 86400 WHERE key = '0'"))
+
+    assert database.get_activity_stats()[0]["count"] == 3
+    assert database.get_activity_stats(window=86400)[0]["count"] == 2
+
+
+def test_search_matches_text_and_link_domain(tmp_path):
+    """
+    Test full-text search over the activity text and link domain, with prefixes and filters.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities([
+        {"activity": "Learn to bake bread", "type": "cooking", "participants": 1,
+         "link": "https://en.wikipedia.org/wiki/Bread", "key": "1"},
+        {"activity": "Bake a cake with a friend", "type": "cooking", "participants": 2, "link": "", "key": "2"},
+        {"activity": "Meet friends at a café", "type": "social", "participants": 3, "link": None, "key": "3"},
+    ])
+
+    assert [record.key for record in database.search("bake cake")] == ["2"]
+    assert {record.key for record in database.search("bak*")} == {"1", "2"}
+    assert [record.key for record in database.search("en.wikipedia.org")] == ["1"]
+    assert [record.key for record in database.search("wiki")] == []
+    assert [record.key for record in database.search("cafe")] == ["3"]
+    assert [record.key for record in database.search("friend*", filters={"type": "social"})] == ["3"]
+    assert database.search('"bread OR (') == []
+    assert database.search("  ") == []
+
+
+def test_search_index_follows_updates_and_deletes(tmp_path):
+    """
+    Test that the search index is kept in step when a row is overwritten or deleted.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activity({"activity": "Paint a fence", "type": "diy", "key": "1"})
+    database.save_activity({"activity": "Plant a tree", "type": "diy", "key": "1"})
+
+    assert database.search("fence") == []
+    assert [record.activity for record in database.search("tree")] == ["Plant a tree"]
+
+    with database.engine.begin() as connection:
+        connection.execute(text("DELETE FROM activities WHERE key = '1'"))
+    assert database.search("tree") == []
@@ -0,0 +1,192 @@
+import json
+import random
+import threading
+
+import pytest
+from database import Database
+from harvest import Harvester, load_spec
+
+
+class FakeApi:
+    def __init__(self, pools, crash_after=None):
+        """
+        Initialize an API stand-in serving random activities from a fixed pool per type.
+
+        :param pools: Number of distinct activities available per type
+        :type pools: dict
+        :param crash_after: Raise on the request after this many, to simulate a crash
+        :type crash_after: int or None
+        """
+        self.pools = pools
+        self.crash_after = crash_after
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_random_activity(self, filters=None):
+        with self.lock:
+            self.calls += 1
+            if self.crash_after is not None and self.calls > self.crash_after:
+                raise RuntimeError("crash")
+        activity_type = filters["type"]
+        if not self.pools.get(activity_type):
+            return {"error": "No activity found with the specified parameters"}
+        number = random.randrange(self.pools[activity_type])
+        return {"activity": f"{activity_type} {number}", "type": activity_type, "participants": 1,
+                "price": 0.1, "link": "", "key": f"{activity_type}-{number}", "accessibility": 0.2}
+
+
+def write_spec(tmp_path, jobs, **options):
+    """
+    Write a harvest spec and load it.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param jobs: Jobs of the spec
+    :type jobs: list of dict
+    :return: Loaded spec
+    :rtype: dict
+    """
+    path = tmp_path / "spec.json"
+    path.write_text(json.dumps(dict(options, jobs=jobs)))
+    return load_spec(str(path))
+
+
+def count_keys(database):
+    """
+    Count the stored activity keys.
+
+    :param database: A Database object.
+    :type database: Database
+    :return: Number of keys and number of distinct keys
+    :rtype: tuple
+    """
+    keys = list(database.iter_keys())
+    return len(keys), len(set(keys))
+
+
+def test_harvest_collects_unique_activities_and_skips_stored_keys(tmp_path):
+    """
+    Test that every job stops at its target, without writing duplicates or already stored keys,
+    and that the write listeners hear of every saved activity.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activity({"activity": "education 0", "type": "education", "key": "education-0"})
+    written = []
+    database.add_write_listener(written.extend)
+    spec = write_spec(tmp_path, [{"filters": {"type": "education"}, "max_unique": 20, "patience": 500},
+                                 {"name": "music", "filters": {"type": "music"}, "max_unique": 5}], workers=4)
+
+    jobs = Harvester(FakeApi({"education": 40, "music": 30}), database, spec).run()
+
+    assert [(job["status"], job["collected"]) for job in jobs] == [("done", 20), ("done", 5)]
+    assert count_keys(database) == (26, 26)
+    assert len(set(written)) == len(written) == 25
+    assert jobs[0]["requests"] == jobs[0]["collected"] + jobs[0]["duplicates"]
+
+
+def test_harvest_stops_exhausted_and_budget_jobs(tmp_path):
+    """
+    Test that jobs stop after patience runs out, when the API reports no match, or at max_requests.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    spec = write_spec(tmp_path, [{"filters": {"type": "small"}, "max_unique": 50, "patience": 30},
+                                 {"filters": {"type": "missing"}, "max_unique": 5},
+                                 {"filters": {"type": "large"}, "max_unique": 50, "max_requests": 7}], workers=2)
+
+    jobs = Harvester(FakeApi({"small": 3, "large": 10 ** 9}), database, spec).run()
+
+    assert [job["status"] for job in jobs] == ["exhausted", "exhausted", "budget"]
+    assert jobs[0]["collected"] == 3
+    assert jobs[1]["requests"] == 1
+    assert jobs[2]["requests"] == 7
+
+
+def test_harvest_resumes_after_crash(tmp_path):
+    """
+    Test that a harvest restarted after a crash keeps the stored progress and finishes the job.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    spec = write_spec(tmp_path, [{"filters": {"type": "education"}, "max_unique": 30}], workers=1)
+
+    with pytest.raises(RuntimeError):
+        Harvester(FakeApi({"education": 10 ** 9}, crash_after=12), database, spec).run()
+    assert count_keys(database)[0] == 12
+
+    api = FakeApi({"education": 10 ** 9})
+    jobs = Harvester(api, database, spec).run()
+
+    assert jobs[0]["status"] == "done"
+    assert api.calls == 18
+    assert count_keys(database) == (30, 30)
+
+    # Finished jobs are not run again, unless their target is raised
+    assert Harvester(api, database, spec).run()[0]["requests"] == 30
+    spec["jobs"][0]["max_unique"] = 35
+    assert Harvester(api, database, spec).run()[0]["collected"] == 35
+
+
+def test_harvest_exhausts_jobs_while_the_api_fails(tmp_path):
+    """
+    Test that failed requests and malformed responses count toward patience, so a job without
+    max_requests still finishes, and that malformed responses are quarantined.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    class FailingApi:
+        def __init__(self):
+            self.calls = 0
+            self.lock = threading.Lock()
+
+        def get_random_activity(self, filters=None):
+            with self.lock:
+                self.calls += 1
+                calls = self.calls
+            if filters["type"] == "malformed":
+                return {"activity": "Sing", "key": f"sing-{calls}", "price": "free"}
+            return None
+
+    database = Database(str(tmp_path / 'activities.db'))
+    spec = write_spec(tmp_path, [{"filters": {"type": "down"}, "max_unique": 5, "patience": 8},
+                                 {"filters": {"type": "malformed"}, "max_unique": 5, "patience": 6}], workers=2)
+
+    harvester = Harvester(FailingApi(), database, spec)
+    jobs = harvester.run()
+
+    assert [job["status"] for job in jobs] == ["exhausted", "exhausted"]
+    assert [job["requests"] for job in jobs] == [8, 6]
+    assert harvester.failures == 14
+    assert database.count_activities() == 0
+    assert database.quarantined == database.count_quarantined() == 6
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    json.dumps({"jobs": []}),
+    json.dumps({"jobs": [{"filters": {"type": "education"}}]}),
+    json.dumps({"jobs": [{"filters": ["education"], "max_unique": 1}]}),
+    json.dumps({"jobs": [{"name": "a", "max_unique": 1}, {"name": "a", "max_unique": 2}]}),
+])
+def test_load_spec_rejects_malformed_specs(tmp_path, content):
+    """
+    Test that malformed specs raise ValueError.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param content: Spec file content
+    :type content: str
+    """
+    path = tmp_path / "spec.json"
+    path.write_text(content)
+
+    with pytest.raises(ValueError):
+        load_spec(str(path))
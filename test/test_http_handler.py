@@ -0,0 +1,134 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from api_wrapper import HttpRequestHandler
+from stub_server import StubActivityHandler, StubServer
+
+
+@pytest.fixture
+def stub_url():
+    """
+    Fixture to run a local stub HTTP server for the duration of a test.
+
+    :return: Base URL of the running stub server.
+    :rtype: str
+    """
+    StubActivityHandler.reset()
+    with StubServer() as server:
+        yield server.url
+
+
+def test_get_reuses_pooled_connection(stub_url):
+    """
+    Test that consecutive requests are served over a single keep-alive connection.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    handler = HttpRequestHandler()
+    for _ in range(5):
+        assert handler.get(stub_url)["key"] == "3943509"
+    handler.close()
+
+    assert len(StubActivityHandler.connections) == 1
+
+
+def test_get_retries_on_server_error(stub_url):
+    """
+    Test that 5xx responses are retried before giving up.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    StubActivityHandler.failures_left = 2
+    handler = HttpRequestHandler(retries=3, backoff_factor=0)
+
+    assert handler.get(stub_url)["key"] == "3943509"
+
+
+def test_get_returns_none_when_retries_exhausted(stub_url):
+    """
+    Test that a persistent server error yields None instead of raising.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    StubActivityHandler.failures_left = 10
+    handler = HttpRequestHandler(retries=1, backoff_factor=0)
+
+    assert handler.get(stub_url) is None
+
+
+def test_get_returns_none_on_connection_error():
+    """
+    Test that a refused connection yields None instead of raising.
+    """
+    handler = HttpRequestHandler(retries=0, connect_timeout=0.5)
+
+    assert handler.get('http://127.0.0.1:9/api/activity') is None
+
+
+def test_get_returns_none_on_non_json_body(stub_url):
+    """
+    Test that a 200 response whose body is not JSON counts as a failure instead of raising.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    StubActivityHandler.malformed_left = 1
+    handler = HttpRequestHandler(retries=0)
+
+    assert handler.get(stub_url) is None
+    assert handler.stats()["failures"] == 1
+    assert handler.get(stub_url)["key"] == "3943509"
+
+
+def test_failures_are_counted_exactly_across_threads():
+    """
+    Test that failures recorded by concurrent requests are all counted.
+    """
+    handler = HttpRequestHandler(retries=0, connect_timeout=0.5)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: handler.get('http://127.0.0.1:9/api/activity'), range(200)))
+
+    assert handler.stats()["failures"] == 200
+
+
+def test_get_honors_retry_after_on_429(stub_url):
+    """
+    Test that a 429 response pauses the rate limiter for the Retry-After delay and is retried.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    StubActivityHandler.throttled_left = 1
+    StubActivityHandler.retry_after = "0.3"
+    handler = HttpRequestHandler(rate=100)
+
+    started = time.perf_counter()
+    assert handler.get(stub_url)["key"] == "3943509"
+    elapsed = time.perf_counter() - started
+
+    assert elapsed >= 0.3
+    assert handler.stats()["rate_limited"] == 1
+    assert handler.stats()["limiter"]["waits"] == 1
+
+
+def test_get_coalesces_identical_concurrent_requests(stub_url):
+    """
+    Test that concurrent identical requests share one upstream request.
+
+    :param stub_url: URL of the local stub server.
+    :type stub_url: str
+    """
+    StubActivityHandler.delay = 0.2
+    handler = HttpRequestHandler(coalesce=True)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        responses = list(executor.map(lambda _: handler.get(stub_url, params={"type": "education"}), range(5)))
+
+    assert all(response["key"] == "3943509" for response in responses)
+    assert StubActivityHandler.requests == 1
+    assert handler.stats()["coalescer"] == {"sent": 1, "coalesced": 4}
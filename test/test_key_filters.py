@@ -0,0 +1,154 @@
+import argparse
+import itertools
+import threading
+
+import pytest
+from command import NewCommand
+from database import Database
+from key_filters import BloomFilter, StoredKeys
+
+
+class PoolApi:
+    def __init__(self, size, numeric_keys=False):
+        """
+        Initialize an API stand-in cycling through a fixed pool of activities.
+
+        :param size: Number of distinct activities available, 0 to answer with the no-match error
+        :type size: int
+        :param numeric_keys: Answer with integer keys instead of strings
+        :type numeric_keys: bool
+        """
+        self.size = size
+        self.numeric_keys = numeric_keys
+        self.numbers = itertools.count()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_random_activity(self, filters=None):
+        with self.lock:
+            self.calls += 1
+            number = next(self.numbers) % self.size if self.size else None
+        if number is None:
+            return {"error": "No activity found with the specified parameters"}
+        return {"activity": f"Activity {number}", "type": "test", "participants": 1, "price": 0.1,
+                "link": "", "key": number if self.numeric_keys else str(number), "accessibility": 0.2}
+
+
+def new_args(**overrides):
+    """
+    Build the arguments of the new command in fetch-until-unique mode.
+
+    :return: Command-line arguments
+    :rtype: argparse.Namespace
+    """
+    values = {"count": 1, "concurrency": 4, "offline": False, "unique": True, "patience": 8, "key_filter": "set"}
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    """
+    Test that every added key is found and absent keys rarely are.
+    """
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for number in range(10000):
+        bloom.add(f"key-{number}")
+
+    assert all(f"key-{number}" in bloom for number in range(10000))
+    false_positives = sum(f"other-{number}" in bloom for number in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.parametrize("kind", ["set", "bloom"])
+def test_stored_keys_answers_exactly(tmp_path, kind):
+    """
+    Test that both key filters report stored and added keys, confirming Bloom hits in the database.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param kind: Key filter kind
+    :type kind: str
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities({"activity": "Stored", "type": "test", "key": str(number)} for number in range(500))
+
+    stored = StoredKeys(database, kind, error_rate=0.5)
+    stored.add("added")
+
+    assert not any(stored.is_new(str(number)) for number in range(500))
+    assert not stored.is_new("added")
+    assert all(stored.is_new(f"new-{number}") for number in range(500))
+    if kind == "bloom":
+        assert stored.lookups > 0
+
+
+@pytest.mark.parametrize("kind", ["set", "bloom"])
+def test_new_unique_saves_only_new_keys(tmp_path, capsys, kind):
+    """
+    Test that fetch-until-unique saves exactly count new activities with no wasted requests.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param kind: Key filter kind
+    :type kind: str
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities({"activity": "Stored", "type": "test", "key": str(number)} for number in range(4))
+    api = PoolApi(100)
+
+    NewCommand(api, database, new_args(count=10, key_filter=kind)).execute()
+
+    keys = list(database.iter_keys())
+    assert len(keys) == len(set(keys)) == 14
+    assert api.calls == 14
+    assert capsys.readouterr().out.startswith("Requests: 14, saved: 10")
+
+
+@pytest.mark.parametrize("kind", ["set", "bloom"])
+def test_new_unique_compares_numeric_keys_with_stored_keys(tmp_path, capsys, kind):
+    """
+    Test that numeric keys from the API are matched against the stored string keys.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param kind: Key filter kind
+    :type kind: str
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities({"activity": "Stored", "type": "test", "key": str(number)} for number in range(4))
+    api = PoolApi(10, numeric_keys=True)
+
+    NewCommand(api, database, new_args(count=6, key_filter=kind)).execute()
+
+    keys = list(database.iter_keys())
+    assert sorted(keys, key=int) == [str(number) for number in range(10)]
+    assert capsys.readouterr().out.startswith("Requests: 10, saved: 6")
+    assert StoredKeys(database, kind).is_new(10) and not StoredKeys(database, kind).is_new(3)
+
+
+@pytest.mark.parametrize("pool_size, expected_calls", [(6, 16), (0, 4)])
+def test_new_unique_stops_when_filters_are_exhausted(tmp_path, capsys, pool_size, expected_calls):
+    """
+    Test that fetching stops after patience runs out or when the API reports no match.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param pool_size: Number of distinct activities the API serves
+    :type pool_size: int
+    :param expected_calls: Number of requests made before stopping
+    :type expected_calls: int
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    api = PoolApi(pool_size)
+
+    NewCommand(api, database, new_args(count=50)).execute()
+
+    assert api.calls == expected_calls
+    assert database.count_activities() == pool_size
+    assert "no new activity for the given filters" in capsys.readouterr().out
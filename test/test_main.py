@@ -1,5 +1,5 @@
 import pytest
-from main import main
+from main import build_parser, main
 
 
 @pytest.fixture
@@ -36,7 +36,13 @@ def mock_database(mocker):
 test_args = [
     (["new", "--type", "education", "--participants", "1", "--price_min", "0.1", "--price_max", "30",
       "--accessibility_min", "0.1", "--accessibility_max", "0.5"], "new"),
+    (["new", "--type", "education", "--count", "3", "--concurrency", "2"], "new"),
+    (["new", "--type", "education", "--offline"], "new"),
+    (["sync", "--max_requests", "4", "--concurrency", "2"], "sync"),
     (["list"], "list"),
+    (["list", "--limit", "0", "--type", "education", "--before_id", "10", "--format", "jsonl"], "list"),
+    (["stats", "--window", "7d", "--type", "education"], "stats"),
+    (["search", "bake bread", "--type", "cooking", "--limit", "3", "--format", "jsonl"], "search"),
 ]
 
 
@@ -72,3 +78,68 @@ def test_main_argument_parsing(mock_api, mock_database, capsys, args, command):
         assert "" in captured.out
     elif command == "list":
         assert "" in captured.out
+
+
+@pytest.mark.parametrize("args, message", [
+    (["export", "-", "--format", "parquet"], "the parquet format cannot be written to standard output"),
+    (["import", "missing.jsonl"], "cannot import 'missing.jsonl': no such file"),
+    (["harvest", "missing.json"], "cannot read harvest spec 'missing.json': No such file or directory"),
+    (["harvest", "spec.json"], "Invalid harvest spec 'spec.json': expected an object with a non-empty 'jobs' list"),
+])
+def test_main_reports_usage_errors_without_traceback(mock_api, mock_database, capsys, tmp_path, monkeypatch, args,
+                                                     message):
+    """
+    Test that bad input is reported as a one-line error on stderr with exit status 2.
+
+    :param mock_api: Mocked ApiWrapper object.
+    :type mock_api: Mock
+    :param mock_database: Mocked Database object.
+    :type mock_database: Mock
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    :param args: List of command-line arguments.
+    :type args: list
+    :param message: Expected error message.
+    :type message: str
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "spec.json").write_text('{"jobs": []}')
+
+    with pytest.raises(SystemExit) as exit_request:
+        main(mock_api, mock_database, args)
+
+    assert exit_request.value.code == 2
+    captured = capsys.readouterr()
+    assert captured.err.splitlines() == [f"{build_parser().prog}: error: {message}"]
+    assert captured.out == ""
+
+
+@pytest.mark.parametrize("args", [
+    ["new", "--count", "-3"],
+    ["new", "--count", "0"],
+    ["new", "--concurrency", "0"],
+    ["sync", "--concurrency", "-1"],
+])
+def test_main_rejects_non_positive_counts(mock_api, mock_database, capsys, args):
+    """
+    Test that counts below 1 are refused instead of falling back to the defaults.
+
+    :param mock_api: Mocked ApiWrapper object.
+    :type mock_api: Mock
+    :param mock_database: Mocked Database object.
+    :type mock_database: Mock
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    :param args: List of command-line arguments.
+    :type args: list
+    """
+    with pytest.raises(SystemExit) as exit_request:
+        main(mock_api, mock_database, args)
+
+    assert exit_request.value.code == 2
+    assert "expected a whole number of at least 1" in capsys.readouterr().err
+    mock_api.get_random_activity.assert_not_called()
@@ -0,0 +1,174 @@
+import json
+import time
+
+import pytest
+from database import Database
+from main import main
+from metrics import REGISTRY, Histogram, InMemorySink, JsonLogSink, PrometheusTextFileSink, Registry, format_breakdown
+from sqlite_reader import SqliteReader
+
+
+@pytest.fixture
+def registry():
+    """
+    Fixture to give each test a clean global registry with an in-memory sink attached.
+
+    :return: The global registry and its in-memory sink.
+    :rtype: tuple
+    """
+    REGISTRY.reset()
+    sink = InMemorySink()
+    REGISTRY.add_sink(sink)
+    yield REGISTRY, sink
+    REGISTRY.remove_sink(sink)
+    REGISTRY.reset()
+
+
+def test_histogram_places_observations_in_buckets():
+    """
+    Test that observations land in the first bucket whose bound they do not exceed.
+    """
+    histogram = Histogram(buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == [2, 1]
+    assert snapshot["count"] == 4
+    assert snapshot["max"] == 3.0
+    assert snapshot["sum"] == pytest.approx(3.65)
+
+
+def test_prometheus_sink_renders_counters_and_cumulative_buckets(tmp_path):
+    """
+    Test that the Prometheus text file holds counters and cumulative histogram buckets.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    registry = Registry(buckets=(0.1, 1.0))
+    registry.increment("http.failures", 2)
+    registry.observe("http.get", 0.05)
+    registry.observe("http.get", 0.5)
+    sink = PrometheusTextFileSink(str(tmp_path / "metrics.prom"))
+
+    sink.flush(registry)
+
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "activities_http_failures_total 2" in text
+    assert 'activities_http_get_seconds_bucket{le="0.1"} 1' in text
+    assert 'activities_http_get_seconds_bucket{le="1.0"} 2' in text
+    assert 'activities_http_get_seconds_bucket{le="+Inf"} 2' in text
+    assert "activities_http_get_seconds_count 2" in text
+
+
+def test_json_log_sink_writes_one_line_per_event(tmp_path):
+    """
+    Test that the JSON log sink appends every event as a JSON line.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    registry = Registry()
+    sink = JsonLogSink(str(tmp_path / "metrics.jsonl"))
+    registry.add_sink(sink)
+
+    registry.increment("db.rows_written", 3)
+    with registry.timer("db.save_activity"):
+        pass
+    sink.close()
+
+    events = [json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text().splitlines()]
+    assert [(event["type"], event["name"]) for event in events] == [("counter", "db.rows_written"),
+                                                                   ("timer", "db.save_activity")]
+    assert events[0]["value"] == 3
+
+
+def test_database_operations_are_timed(registry, tmp_path):
+    """
+    Test that saving, reading and streaming activities records timers and the written row counter.
+
+    :param registry: The global registry and its in-memory sink.
+    :type registry: tuple
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    metrics, sink = registry
+    database = Database(str(tmp_path / 'activities.db'))
+
+    database.save_activity({"activity": "Timed", "type": "test", "key": "1"})
+    database.save_activities([{"activity": "Bulk", "type": "test", "key": "2"}])
+    database.get_latest_activities()
+    assert len(list(database.iter_latest_activities(limit=0))) == 2
+    assert len(list(database.iter_activities())) == 2
+    assert len(list(SqliteReader(str(tmp_path / 'activities.db')).iter_latest_activities())) == 2
+
+    snapshot = metrics.snapshot()
+    assert snapshot["timers"]["db.save_activity"]["count"] == 1
+    assert snapshot["timers"]["db.write_batch"]["count"] == 1
+    assert snapshot["timers"]["db.get_latest_activities"]["count"] == 1
+    assert snapshot["timers"]["db.iter_latest_activities"]["count"] == 2
+    assert snapshot["timers"]["db.iter_activities"]["count"] == 1
+    assert snapshot["counters"]["db.rows_written"] == 2
+    assert {"type": "counter", "name": "db.rows_written", "value": 1} in sink.events
+
+
+def test_profile_flag_prints_stage_breakdown(registry, mocker, capsys):
+    """
+    Test that --profile prints the timing of the command and the stages it ran.
+
+    :param registry: The global registry and its in-memory sink.
+    :type registry: tuple
+    :param mocker: Pytest mocker fixture.
+    :type mocker: _pytest.pythonapi.MockerFixture
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    metrics, _ = registry
+    database = mocker.Mock()
+    database.iter_latest_activities.side_effect = lambda **kwargs: metrics.observe("db.read", 0.01) or []
+
+    main(mocker.Mock(), database, ["--profile", "list", "--limit", "2"])
+
+    breakdown = capsys.readouterr().err
+    assert breakdown.splitlines()[0].split() == ["stage", "calls", "total", "ms", "mean", "ms"]
+    assert "command.list" in breakdown
+    assert "db.read" in breakdown
+
+
+def test_time_iterator_leaves_out_the_consumer():
+    """
+    Test that a timed iterator records the producer's time once, even when abandoned early.
+    """
+    def produce():
+        for number in range(3):
+            time.sleep(0.01)
+            yield number
+
+    registry = Registry()
+    for _ in registry.time_iterator("produce", produce()):
+        time.sleep(0.05)
+    abandoned = registry.time_iterator("abandoned", produce())
+    next(abandoned)
+    abandoned.close()
+
+    timers = registry.snapshot()["timers"]
+    assert timers["produce"]["count"] == 1
+    assert 0.03 <= timers["produce"]["sum"] < 0.1
+    assert timers["abandoned"]["count"] == 1
+
+
+def test_format_breakdown_only_reports_new_work():
+    """
+    Test that the breakdown subtracts what was recorded before the measured work.
+    """
+    registry = Registry()
+    registry.observe("http.get", 0.5)
+    before = registry.snapshot()
+    registry.observe("db.save_activity", 0.002)
+
+    breakdown = format_breakdown(before, registry.snapshot())
+
+    assert "db.save_activity" in breakdown
+    assert "http.get" not in breakdown
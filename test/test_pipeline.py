@@ -0,0 +1,170 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from command import PipelineCommand
+from database import Database
+from pipeline import run_pipeline, shard_sizes, writer_process
+from stub_server import StubServer
+
+
+class PoolHandler(BaseHTTPRequestHandler):
+    """
+    Stub activity endpoint cycling through a pool of keys, answering every fifth request with
+    the no-match error payload and every seventh with a server error.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    pool_size = 30
+    delay = 0.0
+    numbers = itertools.count()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with PoolHandler.lock:
+            number = next(PoolHandler.numbers)
+        if PoolHandler.delay:
+            threading.Event().wait(PoolHandler.delay)
+        if number % 7 == 6:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if number % 5 == 4:
+            payload = {"error": "No activity found with the specified parameters"}
+        else:
+            key = number % PoolHandler.pool_size
+            payload = {"activity": f"Activity {key}", "type": "test", "participants": 1, "price": 0.1,
+                       "link": "", "key": str(key), "accessibility": 0.2}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """
+    Fixture to run the pool stub server.
+
+    :return: A running stub server.
+    :rtype: StubServer
+    """
+    PoolHandler.numbers = itertools.count()
+    PoolHandler.delay = 0.0
+    with StubServer(PoolHandler) as server:
+        yield server
+
+
+def test_shard_sizes_split_requests_evenly():
+    """
+    Test that the requests are shared out with at most one request of difference.
+    """
+    assert shard_sizes(10, 3) == [4, 3, 3]
+    assert shard_sizes(2, 4) == [1, 1, 0, 0]
+
+
+def test_pipeline_saves_fetched_activities_through_one_writer(tmp_path, server, capsys):
+    """
+    Test that every payload fetched by the workers reaches the writer, each key is saved once and
+    error payloads are quarantined.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param server: A running stub server.
+    :type server: StubServer
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    args = argparse.Namespace(requests=140, processes=3, rate=None, queue_size=2, batch_size=16,
+                              on_conflict="ignore", url=server.url, type=None)
+
+    PipelineCommand(database, args).execute()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in lines] == ["fetch-0", "fetch-1", "fetch-2", "fetch", "write", "Elapsed"]
+    # 20 server errors and 24 error payloads out of 140 requests
+    assert lines[3].startswith("fetch: requests: 140, activities: 120, failures: 20")
+    distinct = len({number % 30 for number in range(140) if number % 7 != 6 and number % 5 != 4})
+    assert lines[4].startswith(f"write: received: 120, saved: {distinct}, quarantined: 24")
+    keys = list(database.iter_keys())
+    assert len(keys) == len(set(keys)) == distinct
+    assert database.count_quarantined() == 24
+
+
+def test_writer_quarantines_falsy_payloads(tmp_path):
+    """
+    Test that empty payloads reach validation and are quarantined instead of being dropped.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    context = multiprocessing.get_context()
+    activities = context.Queue()
+    results = context.Queue()
+    for payload in ({}, [], 0, "", {"activity": "Read", "key": "1"}, None):
+        activities.put(payload)
+
+    writer = context.Process(target=writer_process, args=(str(tmp_path / 'activities.db'), None, activities, results,
+                                                          16, 0.05, "ignore"))
+    writer.start()
+    writer.join()
+
+    stats = results.get(timeout=5)
+    assert writer.exitcode == 0
+    assert (stats["received"], stats["saved"], stats["quarantined"]) == (5, 1, 4)
+    assert Database(str(tmp_path / 'activities.db')).count_quarantined() == 4
+
+
+def test_pipeline_drains_the_queue_when_interrupted(tmp_path, server):
+    """
+    Test that Ctrl+C stops the workers early and every activity they fetched is still saved.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param server: A running stub server.
+    :type server: StubServer
+    """
+    PoolHandler.pool_size = 10 ** 9
+    PoolHandler.delay = 0.01
+    timer = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    try:
+        report = run_pipeline(str(tmp_path / 'activities.db'), url=server.url, requests=100000, processes=2,
+                              queue_size=4, batch_size=8)
+    finally:
+        timer.cancel()
+        PoolHandler.pool_size = 30
+
+    writer = report["writer"]
+    assert report["interrupted"]
+    assert 0 < sum(stats["requests"] for stats in report["fetchers"]) < 100000
+    assert writer["received"] == sum(stats["activities"] for stats in report["fetchers"])
+    assert writer["saved"] + writer["quarantined"] == writer["received"]
+    assert Database(str(tmp_path / 'activities.db')).count_activities() == writer["saved"]
+
+
+def test_pipeline_stops_the_workers_when_the_writer_fails(tmp_path, server):
+    """
+    Test that a writer that cannot open the database fails the run instead of hanging it.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :param server: A running stub server.
+    :type server: StubServer
+    """
+    with pytest.raises(RuntimeError, match="Pipeline writer"):
+        run_pipeline(str(tmp_path / 'missing' / 'activities.db'), url=server.url, requests=100000, processes=2,
+                     queue_size=1)
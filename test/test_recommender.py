@@ -0,0 +1,163 @@
+import argparse
+import math
+
+import pytest
+from command import RecommendCommand
+from database import Database
+from main import build_parser
+from models import Activity
+
+pytest.importorskip("numpy")
+
+from recommender import ActivitySnapshot, get_snapshot  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Fixture to create a Database object holding activities with varied attributes.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: A Database object for testing.
+    :rtype: Database
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activities(
+        {"activity": f"Activity {i}", "type": ("education", "music", "social")[i % 3],
+         "participants": i % 4 + 1, "price": (i * 7 % 10) / 10, "key": str(i), "accessibility": (i * 3 % 10) / 10}
+        for i in range(60))
+    return database
+
+
+def brute_force(database, participants, budget, accessibility, activity_type, k):
+    """
+    Rank the activities with a plain Python loop, as a reference.
+
+    :return: Ids of the k closest activities
+    :rtype: list of int
+    """
+    scored = []
+    for record in database.get_latest_records(limit=0):
+        distance = math.sqrt((record.price - budget) ** 2 + (record.accessibility - accessibility) ** 2 +
+                             ((record.participants - participants) / participants) ** 2)
+        distance += 0.5 * (record.type != activity_type)
+        scored.append((round(distance, 5), record.id))
+    return [activity_id for _, activity_id in sorted(scored)[:k]]
+
+
+@pytest.mark.parametrize("block_size", [7, 1 << 20])
+def test_recommend_matches_brute_force_ranking(database, block_size):
+    """
+    Test that the vectorized ranking matches a per-row computation, whatever the block size.
+
+    :param database: A Database object holding activities with varied attributes.
+    :type database: Database
+    :param block_size: Number of rows scored at once
+    :type block_size: int
+    """
+    ranked = ActivitySnapshot(database).recommend(participants=2, budget=0.3, accessibility=0.5,
+                                                  activity_type="music", k=8, block_size=block_size)
+
+    assert len(ranked) == 8
+    assert [activity_id for activity_id, _ in ranked] == brute_force(database, 2, 0.3, 0.5, "music", 8)
+    assert [distance for _, distance in ranked] == sorted(distance for _, distance in ranked)
+
+
+def test_snapshot_follows_writes_incrementally(database, tmp_path):
+    """
+    Test that the snapshot sees updated and new rows from this process and new rows from others.
+
+    :param database: A Database object holding activities with varied attributes.
+    :type database: Database
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    snapshot = ActivitySnapshot(database)
+    target = {"participants": 9, "budget": 0.05, "accessibility": 0.95, "k": 1}
+    best_id, _ = snapshot.recommend(**target)[0]
+    assert snapshot.size == 60
+
+    # An upsert overwrites a row that is already in the snapshot
+    database.save_activity({"activity": "Updated", "type": "music", "participants": 9, "price": 0.05,
+                            "key": "10", "accessibility": 0.95})
+    updated_id, distance = snapshot.recommend(**target)[0]
+    assert database.get_records_by_ids([updated_id])[0].key == "10"
+    assert distance == pytest.approx(0.0)
+
+    # Another writer's insert is found above the highest loaded id
+    Database(str(tmp_path / 'activities.db')).save_activity(
+        {"activity": "Elsewhere", "type": "music", "participants": 9, "price": 0.05, "key": "other",
+         "accessibility": 0.96})
+    assert snapshot.refresh() == 1
+    assert snapshot.size == 61
+    assert [activity_id for activity_id, _ in snapshot.recommend(**dict(target, k=2))][0] == updated_id
+
+
+def test_snapshot_drops_deleted_rows(database, tmp_path):
+    """
+    Test that rows deleted after being loaded are no longer recommended.
+
+    :param database: A Database object holding activities with varied attributes.
+    :type database: Database
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    snapshot = ActivitySnapshot(database)
+    target = {"participants": 9, "budget": 0.05, "accessibility": 0.95, "k": 1}
+    snapshot.recommend(**target)
+    table = Activity.__table__
+
+    # A loaded row updated through the write listener, then deleted before the refresh
+    database.save_activity({"activity": "Updated", "type": "music", "participants": 9, "price": 0.05,
+                            "key": "10", "accessibility": 0.95})
+    with database.engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.key == "10"))
+    assert snapshot.recommend(**target)[0][1] > 0.0
+    assert snapshot.size == 59
+
+    # Rows deleted by another process, noticed on the next refresh
+    other = Database(str(tmp_path / 'activities.db'))
+    with other.engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.id <= 20))
+    database.save_activity({"activity": "New", "type": "music", "participants": 1, "price": 0.5, "key": "new",
+                            "accessibility": 0.5})
+    ranked = snapshot.recommend(**dict(target, k=100))
+    assert snapshot.size == len(ranked) == 41
+    assert min(activity_id for activity_id, _ in ranked) > 20
+
+
+def test_recommend_rejects_non_positive_k(database):
+    """
+    Test that k below 1 is refused by the command line and by the snapshot.
+
+    :param database: A Database object holding activities with varied attributes.
+    :type database: Database
+    """
+    for value in ("0", "-2", "two"):
+        with pytest.raises(SystemExit):
+            build_parser().parse_args(["recommend", "-k", value])
+    assert build_parser().parse_args(["recommend", "-k", "3"]).k == 3
+
+    with pytest.raises(ValueError, match="k must be a positive"):
+        ActivitySnapshot(database).recommend(budget=0.5, k=0)
+
+
+def test_recommend_command_prints_ranked_activities(database, capsys):
+    """
+    Test that the recommend command prints the k best activities with their distance.
+
+    :param database: A Database object holding activities with varied attributes.
+    :type database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    args = argparse.Namespace(participants=1, budget=0.0, accessibility=0.0, type="education", type_weight=0.5, k=3)
+
+    RecommendCommand(database, args).execute()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[0].split()[0] == "0.000"
+    assert "activity='Activity 0'" in lines[0]
+    assert get_snapshot(database) is get_snapshot(database)
@@ -0,0 +1,103 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+from database import Database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Wall-clock budgets in seconds for a full interpreter start; override on slow machines
+LIST_BUDGET = float(os.environ.get("STARTUP_BUDGET_LIST", "0.5"))
+NEW_BUDGET = float(os.environ.get("STARTUP_BUDGET_NEW", "1.5"))
+
+# Runs the CLI like `python main.py <args>` and reports which heavy modules were imported
+RUN_CLI = (
+    "import runpy, sys\n"
+    "sys.path.insert(0, {root!r})\n"
+    "sys.argv = ['main.py'] + sys.argv[1:]\n"
+    "runpy.run_path({main!r}, run_name='__main__')\n"
+    "print('loaded:', ','.join(m for m in ('sqlalchemy', 'requests') if m in sys.modules))\n"
+)
+
+# Builds everything `new` needs before its first HTTP request
+BUILD_NEW = (
+    "import sys\n"
+    "sys.path.insert(0, {root!r})\n"
+    "import main\n"
+    "main.build_api()\n"
+    "main.LazyDatabase('activities.db').save_activity\n"
+)
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    """
+    Fixture to create a working directory holding an initialized activities.db.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: Path of the working directory.
+    :rtype: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'))
+    database.save_activity({"activity": "Startup", "type": "test", "key": "1"})
+    database.engine.dispose()
+    return tmp_path
+
+
+def run_python(code, cwd, *args):
+    """
+    Run a Python snippet in a fresh interpreter and time it.
+
+    :param code: Source code to run
+    :type code: str
+    :param cwd: Working directory
+    :type cwd: pathlib.Path
+    :return: Elapsed seconds and standard output
+    :rtype: tuple
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code, *args], cwd=cwd, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, result.stdout
+
+
+def test_list_does_not_import_heavy_dependencies(workdir):
+    """
+    Test that listing an initialized database imports neither SQLAlchemy nor requests.
+
+    :param workdir: Working directory holding an initialized activities.db.
+    :type workdir: pathlib.Path
+    """
+    _, output = run_python(RUN_CLI.format(root=ROOT, main=os.path.join(ROOT, "main.py")), workdir, "list")
+
+    assert "activity='Startup'" in output
+    assert output.splitlines()[-1] == "loaded: "
+
+
+def test_list_startup_budget(workdir):
+    """
+    Test that the list command stays within its start-up budget.
+
+    :param workdir: Working directory holding an initialized activities.db.
+    :type workdir: pathlib.Path
+    """
+    code = RUN_CLI.format(root=ROOT, main=os.path.join(ROOT, "main.py"))
+    elapsed = statistics.median(run_python(code, workdir, "list")[0] for _ in range(3))
+
+    assert elapsed < LIST_BUDGET
+
+
+def test_new_startup_budget(workdir):
+    """
+    Test that building the API and database for the new command stays within its start-up budget.
+
+    :param workdir: Working directory holding an initialized activities.db.
+    :type workdir: pathlib.Path
+    """
+    code = BUILD_NEW.format(root=ROOT)
+    elapsed = statistics.median(run_python(code, workdir)[0] for _ in range(3))
+
+    assert elapsed < NEW_BUDGET
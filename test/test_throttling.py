@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+from throttling import RequestCoalescer, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    """
+    Test that the bucket lets a burst through and then enforces the sustained rate.
+    """
+    bucket = TokenBucket(rate=20, burst=3)
+
+    started = time.perf_counter()
+    for _ in range(3):
+        bucket.acquire()
+    burst_elapsed = time.perf_counter() - started
+    for _ in range(4):
+        bucket.acquire()
+    total_elapsed = time.perf_counter() - started
+
+    assert burst_elapsed < 0.05
+    assert total_elapsed >= 4 / 20 - 0.02
+    assert bucket.stats()["acquired"] == 7
+
+
+def test_token_bucket_pause_delays_next_acquire():
+    """
+    Test that pausing the bucket, as done on Retry-After, delays the next request.
+    """
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(0.2)
+
+    assert bucket.acquire() >= 0.19
+    assert bucket.stats()["waits"] == 1
+
+
+def test_coalescer_shares_result_and_exception():
+    """
+    Test that followers receive the leader's result, and that errors propagate to everyone.
+    """
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    results = []
+
+    def slow_call():
+        release.wait(1)
+        return {"key": "1"}
+
+    threads = [threading.Thread(target=lambda: results.append(coalescer.run("same", slow_call))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"key": "1"}] * 4
+    assert coalescer.stats() == {"sent": 1, "coalesced": 3}
+
+    with pytest.raises(RuntimeError):
+        coalescer.run("failing", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
@@ -0,0 +1,132 @@
+import argparse
+import json
+
+import pytest
+from command import NewCommand
+from database import Database
+from models import QuarantinedActivity
+from sqlalchemy import select
+from validation import validate_activity
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Fixture to create a Database object for testing.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    :return: A Database object for testing.
+    :rtype: Database
+    """
+    return Database(str(tmp_path / 'activities.db'))
+
+
+def quarantined(database):
+    """
+    Read the quarantine table.
+
+    :param database: A Database object.
+    :type database: Database
+    :return: Reasons and decoded payloads, oldest first
+    :rtype: list of tuple
+    """
+    table = QuarantinedActivity.__table__
+    with database.engine.connect() as connection:
+        rows = connection.execute(select(table.c.reason, table.c.payload).order_by(table.c.id))
+        return [(reason, json.loads(payload)) for reason, payload in rows]
+
+
+def test_validate_activity_coerces_types_and_drops_unknown_fields():
+    """
+    Test that numeric strings, whole floats and numeric keys are normalized to the column types.
+    """
+    row, reason = validate_activity({"activity": "Bake bread", "type": "cooking", "participants": "2",
+                                     "price": "0.25", "link": None, "key": 4286250, "accessibility": 1,
+                                     "kidFriendly": True})
+
+    assert reason is None
+    assert row == {"activity": "Bake bread", "type": "cooking", "participants": 2, "price": 0.25, "link": None,
+                   "key": "4286250", "accessibility": 1.0}
+    assert validate_activity({"activity": "Nap", "participants": 3.0, "price": ""})[0]["participants"] == 3
+
+
+@pytest.mark.parametrize("payload, reason", [
+    (None, "expected an object, got NoneType"),
+    ({"error": "No activity found with the specified parameters"},
+     "error payload: No activity found with the specified parameters"),
+    ({"type": "music"}, "missing 'activity'"),
+    ({"activity": "Sing", "price": "free"}, "'price' must be a number, got 'free'"),
+    ({"activity": "Sing", "participants": 1.5}, "'participants' must be a whole number, got 1.5"),
+    ({"activity": "Sing", "participants": True}, "'participants' must be a number, got bool"),
+    ({"activity": "Sing", "accessibility": float("nan")}, "'accessibility' out of range: nan"),
+    ({"activity": "Sing", "price": -0.5}, "'price' out of range: -0.5"),
+    ({"activity": "Sing", "link": ["https://example.com"]}, "'link' must be a string, got list"),
+])
+def test_validate_activity_rejects_invalid_payloads(payload, reason):
+    """
+    Test that invalid payloads are rejected with the reason.
+
+    :param payload: Payload to validate
+    :type payload: object
+    :param reason: Expected reason
+    :type reason: str
+    """
+    assert validate_activity(payload) == (None, reason)
+
+
+def test_save_activity_quarantines_instead_of_raising(database):
+    """
+    Test that None and error payloads end up in the quarantine table and nothing is saved.
+
+    :param database: A Database object for testing.
+    :type database: Database
+    """
+    assert not database.save_activity(None)
+    assert not database.save_activity({"error": "No activity found with the specified parameters"})
+    assert database.save_activity({"activity": "Read", "participants": "1", "key": "1"})
+
+    assert database.count_activities() == 1
+    assert database.get_latest_records()[0].participants == 1
+    assert quarantined(database) == [
+        ("expected an object, got NoneType", None),
+        ("error payload: No activity found with the specified parameters",
+         {"error": "No activity found with the specified parameters"})]
+    assert database.quarantined == 2
+
+
+def test_bulk_save_keeps_going_past_invalid_records(database):
+    """
+    Test that a bad record does not abort a bulk save and is quarantined with its batch.
+
+    :param database: A Database object for testing.
+    :type database: Database
+    """
+    activities = [{"activity": f"Activity {i}", "key": str(i), "price": "oops" if i % 4 == 3 else i / 100}
+                  for i in range(10)]
+
+    saved = database.bulk_save_activities(activities, batch_size=3)
+
+    assert saved == 8
+    assert database.count_activities() == 8
+    assert [payload["key"] for _, payload in quarantined(database)] == ["3", "7"]
+
+
+def test_new_command_reports_quarantined_activity(database, capsys):
+    """
+    Test that the new command reports an invalid response instead of crashing.
+
+    :param database: A Database object for testing.
+    :type database: Database
+    :param capsys: Pytest capsys fixture for capturing stdout and stderr.
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    class ErrorApi:
+        def get_random_activity(self, filters=None):
+            return {"error": "No activity found with the specified parameters"}
+
+    NewCommand(ErrorApi(), database, argparse.Namespace(count=1)).execute()
+
+    assert "quarantine" in capsys.readouterr().out
+    assert database.count_activities() == 0
+    assert database.count_quarantined() == 1
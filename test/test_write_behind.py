@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+from database import Database
+from write_behind import WriteBehindBuffer
+
+
+def make_activity(number):
+    """
+    Build a test activity with a unique key.
+
+    :param number: Activity number
+    :type number: int
+    :return: Activity data
+    :rtype: dict
+    """
+    return {"activity": f"Buffered {number}", "type": "test", "participants": 1, "price": 0.1,
+            "key": str(number), "accessibility": 0.1}
+
+
+def test_write_behind_database_flushes_in_batches(tmp_path):
+    """
+    Test that buffered saves are written in batches and visible after flush.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'), write_behind=True, flush_size=10, flush_interval=5)
+    for number in range(25):
+        database.save_activity(make_activity(number))
+    database.flush()
+
+    stats = database.buffer_stats()
+    assert stats["flushed_rows"] == 25
+    assert stats["flushes"] == 3
+    assert stats["buffered"] == 0
+    assert database.get_latest_activities(limit=1)[0].activity == "Buffered 24"
+    database.close()
+
+
+def test_write_behind_flushes_after_interval(tmp_path):
+    """
+    Test that a partial batch is written once the flush interval has elapsed.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    database = Database(str(tmp_path / 'activities.db'), write_behind=True, flush_size=100, flush_interval=0.1)
+    database.save_activity(make_activity(1))
+    time.sleep(0.5)
+
+    assert [activity.key for activity in database.get_latest_activities()] == ["1"]
+    database.close()
+
+
+def test_close_writes_remaining_activities(tmp_path):
+    """
+    Test that closing the database drains the buffer and rejects further saves.
+
+    :param tmp_path: Pytest temporary directory fixture.
+    :type tmp_path: pathlib.Path
+    """
+    db_name = str(tmp_path / 'activities.db')
+    database = Database(db_name, write_behind=True, flush_size=1000, flush_interval=60)
+    for number in range(50):
+        database.save_activity(make_activity(number))
+    database.close()
+
+    assert len(Database(db_name).get_latest_activities(limit=100)) == 50
+    with pytest.raises(RuntimeError):
+        database.save_activity(make_activity(51))
+
+
+def test_buffer_reports_write_errors_on_flush():
+    """
+    Test that a failed background write is raised by the next flush.
+    """
+    def failing_write(batch):
+        raise ValueError("disk full")
+
+    buffer = WriteBehindBuffer(failing_write, flush_interval=0.05)
+    buffer.put(make_activity(1))
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.stats()["failed_rows"] == 1
+    buffer.close()
+
+
+def test_full_buffer_applies_backpressure():
+    """
+    Test that put blocks while the bounded buffer is full.
+    """
+    release = threading.Event()
+    buffer = WriteBehindBuffer(lambda batch: release.wait(2), max_size=2, flush_size=1, flush_interval=0.01)
+    for number in range(3):
+        buffer.put(make_activity(number))
+
+    blocked = threading.Thread(target=buffer.put, args=(make_activity(3),))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(2)
+    assert not blocked.is_alive()
+    buffer.close()
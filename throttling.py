@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """
+        Initialize a thread-safe token-bucket rate limiter.
+
+        Each acquire reserves a token, so concurrent callers are spaced out at ``rate`` per
+        second after an initial burst of up to ``burst`` requests.
+
+        :param rate: Sustained number of requests per second
+        :type rate: float
+        :param burst: Maximum number of requests allowed back to back, max(1, rate) if None
+        :type burst: float or None
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _refill(self, now):
+        """
+        Add the tokens accumulated since the last update.
+
+        :param now: Current monotonic time
+        :type now: float
+        """
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def acquire(self):
+        """
+        Block until the caller may send a request.
+
+        :return: Seconds spent waiting
+        :rtype: float
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            # While paused, updated lies in the future and no tokens accrue until then
+            wait = max(0.0, self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+        waited = 0.0
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            # A pause requested while sleeping also applies to reservations already handed out
+            wait = max(0.0, self.paused_until - time.monotonic())
+
+        with self.lock:
+            self.acquired += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += waited
+        return waited
+
+    def pause(self, seconds):
+        """
+        Stop handing out tokens for a while, e.g. when the server answers with Retry-After.
+
+        :param seconds: Number of seconds to pause
+        :type seconds: float
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.tokens = min(self.tokens, 0.0)
+                self.updated = max(self.updated, until)
+
+    def stats(self):
+        """
+        Get the wait-time metrics.
+
+        :return: Dictionary with acquired tokens, waits and total and mean wait time in seconds
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "mean_wait": self.wait_time / self.acquired if self.acquired else 0.0,
+            }
+
+
+class RequestCoalescer:
+    def __init__(self):
+        """
+        Initialize a coalescer that lets concurrent identical requests share one in-flight call.
+        """
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def request_key(url, params=None):
+        """
+        Build a key identifying identical requests.
+
+        :param url: Request URL
+        :type url: str
+        :param params: Query parameters
+        :type params: dict or None
+        :return: Hashable request key
+        :rtype: str
+        """
+        return json.dumps([url, params or {}], sort_keys=True, default=str)
+
+    def run(self, key, function):
+        """
+        Call ``function`` unless an identical call is already in flight, then share its result.
+
+        :param key: Request key
+        :type key: str
+        :param function: Zero-argument callable performing the request
+        :type function: callable
+        :return: Result of the shared call
+        :rtype: object
+        """
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self):
+        """
+        Get the coalescing metrics.
+
+        :return: Dictionary with requests sent and requests served by another in-flight call
+        :rtype: dict
+        """
+        with self.lock:
+            return {"sent": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,150 @@
+import json
+import sys
+from collections import namedtuple
+
+# How a column is validated: its Python type, whether a record without it is rejected, and the
+# inclusive bounds of numeric values; numbers must be finite even without bounds
+FieldRule = namedtuple("FieldRule", ("kind", "required", "minimum", "maximum"))
+
+ACTIVITY_RULES = {
+    "activity": FieldRule(str, True, None, None),
+    "type": FieldRule(str, False, None, None),
+    "participants": FieldRule(int, False, 0, None),
+    "price": FieldRule(float, False, 0.0, None),
+    "link": FieldRule(str, False, None, None),
+    "key": FieldRule(str, False, None, None),
+    "accessibility": FieldRule(float, False, 0.0, None),
+}
+
+
+def _parse_number(name, value, kind):
+    """
+    Convert a value that is not already of the column's numeric type.
+
+    :param name: Column name, for error messages
+    :type name: str
+    :param value: Value to convert
+    :type value: object
+    :param kind: int or float
+    :type kind: type
+    :return: Converted value, None for an empty string
+    :rtype: int or float or None
+    :raises ValueError: If the value is not a number of the expected kind
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            value = int(value) if kind is int and value.lstrip("+-").isdigit() else float(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be a number, got {value!r}") from None
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{name}' must be a number, got {type(value).__name__}")
+
+    if kind is int:
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(f"'{name}' must be a whole number, got {value!r}")
+            value = int(value)
+        return value
+    return float(value)
+
+
+def compile_field(name, rule):
+    """
+    Build the converter of one column, specialized for its type and bounds.
+
+    Values already of the right type take a single type check; anything else is coerced,
+    e.g. numeric strings to numbers and numeric keys to strings.
+
+    :param name: Column name
+    :type name: str
+    :param rule: Validation rule of the column
+    :type rule: FieldRule
+    :return: Callable returning the normalized value
+    :rtype: callable
+    :raises ValueError: From the callable, if the value cannot be normalized
+    """
+    kind, required, minimum, maximum = rule
+
+    def missing():
+        if required:
+            raise ValueError(f"missing '{name}'")
+        return None
+
+    if kind is str:
+        def convert(value):
+            if type(value) is str:
+                return value if value or not required else missing()
+            if value is None:
+                return missing()
+            if type(value) in (int, float):
+                # The API has been seen to return numeric keys
+                return str(value)
+            raise ValueError(f"'{name}' must be a string, got {type(value).__name__}")
+        return convert
+
+    low = -sys.float_info.max if minimum is None else minimum
+    high = sys.float_info.max if maximum is None else maximum
+
+    def convert(value):
+        if type(value) is not kind:
+            if value is None:
+                return missing()
+            value = _parse_number(name, value, kind)
+            if value is None:
+                return missing()
+        # NaN fails both comparisons and infinities are beyond the largest float
+        if not low <= value <= high:
+            raise ValueError(f"'{name}' out of range: {value!r}")
+        return value
+    return convert
+
+
+def compile_validator(rules=None):
+    """
+    Build a validator that turns a raw payload into a row of the activities table.
+
+    The per-column converters are built once, so validating a record is a loop over
+    specialized callables with no rule lookups. Fields outside the rules are dropped.
+
+    :param rules: Validation rule per column, ACTIVITY_RULES by default
+    :type rules: dict or None
+    :return: Callable taking a payload and returning ``(row, None)`` for a valid record or
+        ``(None, reason)`` for an invalid one
+    :rtype: callable
+    """
+    converters = tuple((name, compile_field(name, rule)) for name, rule in (rules or ACTIVITY_RULES).items())
+
+    def validate(payload):
+        if not isinstance(payload, dict):
+            return None, f"expected an object, got {type(payload).__name__}"
+        if "error" in payload:
+            return None, f"error payload: {payload['error']}"
+        row = {}
+        try:
+            for name, convert in converters:
+                row[name] = convert(payload.get(name))
+        except (ValueError, OverflowError) as error:
+            return None, str(error)
+        return row, None
+
+    return validate
+
+
+validate_activity = compile_validator()
+
+
+def quarantine_row(payload, reason):
+    """
+    Build the row recording a rejected payload in the quarantine table.
+
+    :param payload: Payload as received
+    :type payload: object
+    :param reason: Why the payload was rejected
+    :type reason: str
+    :return: Row values keyed by column name
+    :rtype: dict
+    """
+    return {"payload": json.dumps(payload, default=repr), "reason": reason}
@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+
+# Queued to cut the current batch short so that flush() does not wait for the interval
+_FLUSH = object()
+
+
+class WriteBehindBuffer:
+    def __init__(self, write_batch, max_size=10000, flush_size=500, flush_interval=0.5):
+        """
+        Initialize a bounded buffer flushed to the database by a background thread.
+
+        A batch is written once it reaches ``flush_size`` rows or its oldest row has waited
+        ``flush_interval`` seconds. When the buffer is full, ``put`` blocks until the writer
+        catches up.
+
+        :param write_batch: Callable writing a list of activity dictionaries in one transaction
+        :type write_batch: callable
+        :param max_size: Maximum number of activities waiting to be written
+        :type max_size: int
+        :param flush_size: Number of activities written per transaction
+        :type flush_size: int
+        :param flush_interval: Maximum seconds an activity waits before being written
+        :type flush_interval: float
+        """
+        self.write_batch = write_batch
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_size)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.error = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.flush_time = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_latency = 0.0
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def put(self, activity_data):
+        """
+        Queue an activity for writing.
+
+        :param activity_data: Activity data to be saved
+        :type activity_data: dict
+        :raises RuntimeError: If the buffer has been closed
+        """
+        if self.closed:
+            raise RuntimeError("Write-behind buffer is closed")
+        self.queue.put((time.monotonic(), activity_data))
+
+    def _collect(self):
+        """
+        Take the next batch from the queue, waiting at most the flush interval for it to fill.
+
+        :return: Enqueue times and activity data of the batch
+        :rtype: list of tuple
+        """
+        try:
+            item = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if item is _FLUSH:
+            self.queue.task_done()
+            return []
+
+        batch = [item]
+        deadline = item[0] + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FLUSH:
+                self.queue.task_done()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """
+        Write batches until the buffer is closed and drained.
+        """
+        while not (self.closed and self.queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+            started = time.monotonic()
+            try:
+                self.write_batch([activity_data for _, activity_data in batch])
+            except Exception as error:
+                with self.lock:
+                    self.error = error
+                    self.failed_rows += len(batch)
+            else:
+                finished = time.monotonic()
+                with self.lock:
+                    self.flushes += 1
+                    self.flushed_rows += len(batch)
+                    self.last_flush_seconds = finished - started
+                    self.flush_time += self.last_flush_seconds
+                    self.max_latency = max(self.max_latency, finished - batch[0][0])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _raise_pending_error(self):
+        """
+        Re-raise a write error from the background thread in the caller.
+        """
+        with self.lock:
+            error, self.error = self.error, None
+        if error is not None:
+            raise RuntimeError("Write-behind flush failed") from error
+
+    def flush(self):
+        """
+        Block until every queued activity has been written.
+
+        :raises RuntimeError: If a background write failed since the last flush
+        """
+        if self.thread.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        """
+        Write the remaining activities and stop the background thread.
+
+        :raises RuntimeError: If a background write failed since the last flush
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread.is_alive():
+            self.queue.put(_FLUSH)
+            self.thread.join()
+        self._raise_pending_error()
+
+    def stats(self):
+        """
+        Get the buffer metrics.
+
+        :return: Dictionary with buffered rows, flush counts and flush and end-to-end latencies
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "buffered": self.queue.qsize(),
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+                "failed_rows": self.failed_rows,
+                "last_flush_seconds": self.last_flush_seconds,
+                "mean_flush_seconds": self.flush_time / self.flushes if self.flushes else 0.0,
+                "max_latency_seconds": self.max_latency,
+            }